@@ -1,24 +1,26 @@
+import multiprocessing
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from glob import glob
 from time import time
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import uproot
 import yaml
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from sklearn.utils import shuffle
-from tqdm import tqdm
 from utils_argparser import argparser_preprocessing
+from utils_preprocessing import (
+    PID_VARS,
+    TRUE_VARS,
+    apply_scaler,
+    process_file,
+    reco_variables,
+)
 
-ECAL_W = 8000
-ECAL_H = 6500
-MAX_OVX = 50
-MAX_OVY = 50
-MAX_OVZ = 150
-MAX_MATCH_DISTANCE = 0.01
+from calotron.utils.preprocessing import mergeScalers
 
+MAX_MATCH_DISTANCE = 0.01
 PADDING_VALUE = 0.0
 MAX_INPUT_PHOTONS = 96
 MAX_OUTPUT_CLUSTERS = 96
@@ -44,6 +46,7 @@ else:
 
 max_files = int(args.max_files)
 chunk_size = int(args.chunk_size)
+num_workers = int(args.num_workers) if args.num_workers else None
 
 indices = np.random.permutation(len(data_fnames))
 data_fnames = data_fnames[indices][:max_files]
@@ -55,143 +58,96 @@ export_data_dir = config_dir["data_dir"]
 images_dir = config_dir["images_dir"]
 models_dir = config_dir["models_dir"]
 
-# +------------------+
-# |   Data loading   |
-# +------------------+
-
-start = time()
-photon_list = list()
-cluster_list = list()
-
-for fname in data_fnames:
-    with uproot.open(fname) as file:
-        photon_list.append(
-            file["CaloTupler/calo_true"]
-            .arrays(library="pd")
-            .query("pz > 750 and abs(ovx) < 50 and abs(ovy) < 50 and abs(ovz) < 150")
-        )
-        cluster_list.append(
-            file["CaloTupler/neutral_protos"].arrays(library="pd").query("E > 1500")
-        )
-
-print(f"[INFO] Data correctly loaded in {time()-start:.2f} s")
-
-photon_df = pd.concat(photon_list, ignore_index=True).dropna()
-photon_df = shuffle(photon_df).reset_index(drop=True)[:chunk_size]
-print(f"[INFO] DataFrame of {len(photon_df)} generated photons correctly created")
-
-cluster_df = pd.concat(cluster_list, ignore_index=True).dropna()
-cluster_df = shuffle(cluster_df).reset_index(drop=True)[:chunk_size]
-print(f"[INFO] DataFrame of {len(cluster_df)} reconstructed clusters correctly created")
-
-# +----------------------+
-# |   Photon DataFrame   |
-# +----------------------+
-
-photon_df["x"] = photon_df["ecal_x"]
-photon_df["y"] = photon_df["ecal_y"]
-photon_df["p"] = np.linalg.norm(photon_df[["px", "py", "pz"]], axis=1)
-photon_df["E"] = photon_df["p"]
-photon_df["logE"] = np.log(photon_df.E)
-photon_df["tx"] = photon_df.px / photon_df.pz
-photon_df["ty"] = photon_df.py / photon_df.pz
-photon_df["NotPadding"] = 1.0
-
-true_vars = ["x", "y", "logE", "tx", "ty", "ovx", "ovy", "ovz"]
-true_vars += ["NotPadding"]
+true_vars = TRUE_VARS
+reco_vars = reco_variables(args.demo)
 
-if args.verbose:
-    print(photon_df[true_vars].describe())
-
-# +---------------------------+
-# |   Photons preprocessing   |
-# +---------------------------+
-
-p_photon_df = photon_df.copy()
+max_input_photons = MAX_INPUT_PHOTONS_DEMO if args.demo else MAX_INPUT_PHOTONS
+max_output_clusters = MAX_OUTPUT_CLUSTERS_DEMO if args.demo else MAX_OUTPUT_CLUSTERS
 
-photon_scaler_logE = MinMaxScaler()
+# +------------------------------+
+# |   Data processing per file   |
+# +------------------------------+
 
+# Each worker reads one file, builds its padded events and computes the
+# matching weights, returning its partially fitted scalers to be merged;
+# workers are forked before TensorFlow is loaded (see `calotron.data`
+# import below), since forking a process running TF threads may deadlock
 start = time()
-p_photon_df["x"] = p_photon_df.x / ECAL_W * 2
-p_photon_df["y"] = p_photon_df.y / ECAL_H * 2
-p_photon_df["logE"] = photon_scaler_logE.fit_transform(np.c_[p_photon_df.logE])
-p_photon_df["ovx"] = p_photon_df.ovx / MAX_OVX
-p_photon_df["ovy"] = p_photon_df.ovy / MAX_OVY
-p_photon_df["ovz"] = p_photon_df.ovz / MAX_OVZ
-print(f"[INFO] Generated photons preprocessing completed in {time()-start:.2f} s")
-
-if args.verbose:
-    print(p_photon_df[true_vars].describe())
-
-# +-----------------------+
-# |   Cluster DataFrame   |
-# +-----------------------+
-
-cluster_df["logE"] = np.log(cluster_df.E)
-cluster_df["NotPadding"] = 1.0
+seeds = np.random.randint(0, 2**31 - 1, size=len(data_fnames))
+with ProcessPoolExecutor(
+    max_workers=num_workers, mp_context=multiprocessing.get_context("fork")
+) as executor:
+    results = list(
+        executor.map(
+            partial(
+                process_file,
+                demo=args.demo,
+                max_input_photons=max_input_photons,
+                max_output_clusters=max_output_clusters,
+                max_match_distance=MAX_MATCH_DISTANCE,
+                padding_value=PADDING_VALUE,
+            ),
+            data_fnames,
+            seeds,
+        )
+    )
 
-reco_vars = ["x", "y", "logE"]
+# TensorFlow loaded only once the worker processes are done
+from calotron.data import writeRaggedDataset, writeTFRecords  # noqa: E402
 
+# Scalers fitted on all the selected rows, padded events possibly limited
+photon_scaler_logE = mergeScalers([res["photon_scaler_logE"] for res in results])
+cluster_scaler_logE = mergeScalers([res["cluster_scaler_logE"] for res in results])
 if not args.demo:
-    bool_vars = ["PhotonFromMergedPi0", "Pi0Merged", "Photon"]
-    pid_vars = ["PhotonID", "IsNotE", "IsNotH"]
-    reco_vars += bool_vars + pid_vars
-reco_vars += ["NotPadding"]
-
-if args.verbose:
-    print(cluster_df[reco_vars].describe())
+    cluster_scaler_pid = mergeScalers([res["cluster_scaler_pid"] for res in results])
 
-# +----------------------------+
-# |   Clusters preprocessing   |
-# +----------------------------+
+results = [res for res in results if len(res["photon"]) > 0]
+if chunk_size > 0:
+    for res in results:
+        for key in ["photon", "cluster", "photon_lengths", "cluster_lengths", "weight"]:
+            res[key] = res[key][:chunk_size]
+        chunk_size -= len(res["photon"])
+    results = [res for res in results if len(res["photon"]) > 0]
 
-p_cluster_df = cluster_df.copy()
+nEvents = sum([len(res["photon"]) for res in results])
+print(
+    f"[INFO] {nEvents} events from {len(results)} files "
+    f"correctly built in {time()-start:.2f} s"
+)
 
-cluster_scaler_logE = MinMaxScaler()
-cluster_scaler_pid = StandardScaler()
+# +--------------------------+
+# |   Events preprocessing   |
+# +--------------------------+
 
 start = time()
-p_cluster_df["x"] = p_cluster_df.x / ECAL_W * 2
-p_cluster_df["y"] = p_cluster_df.y / ECAL_H * 2
-p_cluster_df["logE"] = cluster_scaler_logE.fit_transform(np.c_[p_cluster_df.logE])
-if not args.demo:
-    p_cluster_df[pid_vars] = cluster_scaler_pid.fit_transform(
-        cluster_df[pid_vars].values
-    )
-print(f"[INFO] Reconstructed clusters preprocessing completed in {time()-start:.2f} s")
+for res in results:
+    apply_scaler(res["photon"], photon_scaler_logE, [true_vars.index("logE")])
+    apply_scaler(res["cluster"], cluster_scaler_logE, [reco_vars.index("logE")])
+    if not args.demo:
+        pid_columns = [reco_vars.index(var) for var in PID_VARS]
+        apply_scaler(res["cluster"], cluster_scaler_pid, pid_columns)
+print(f"[INFO] Events preprocessing completed in {time()-start:.2f} s")
+
+pad_photons = np.concatenate([res["photon"] for res in results])
+pad_clusters = np.concatenate([res["cluster"] for res in results])
+photon_lengths = np.concatenate([res["photon_lengths"] for res in results])
+cluster_lengths = np.concatenate([res["cluster_lengths"] for res in results])
+match_weights = np.concatenate([res["weight"] for res in results])
 
 if args.verbose:
-    print(p_cluster_df[reco_vars].describe())
-
-# +--------------------------------+
-# |   Data processing per events   |
-# +--------------------------------+
+    photon_mask = pad_photons[:, :, -1] > 0.0
+    cluster_mask = pad_clusters[:, :, -1] > 0.0
+    print(pd.DataFrame(pad_photons[photon_mask], columns=true_vars).describe())
+    print(pd.DataFrame(pad_clusters[cluster_mask], columns=reco_vars).describe())
 
-true_photons = list()
-reco_clusters = list()
-
-events = np.unique(p_cluster_df.evtNumber)
-nEvents = len(events)
-
-for iEvent, event in tqdm(enumerate(events), total=nEvents, desc="Processing events"):
-    true = (
-        p_photon_df[p_photon_df.evtNumber == event]
-        .query("mcID == 22")  # photons
-        .sort_values("p", ascending=False)
-    )
-    reco = p_cluster_df[p_cluster_df.evtNumber == event].sort_values(
-        "E", ascending=False
-    )
-    true_photons.append(true[true_vars].values)
-    reco_clusters.append(reco[reco_vars].values)
 
 # +-------------------+
 # |   Event example   |
 # +-------------------+
 
 event_number = 42
-photon = np.array(true_photons[event_number])
-cluster = np.array(reco_clusters[event_number])
+photon = pad_photons[event_number, : photon_lengths[event_number]]
+cluster = pad_clusters[event_number, : cluster_lengths[event_number]]
 
 plt.figure(figsize=(8, 6), dpi=300)
 plt.xlabel("$x$ position", fontsize=12)
@@ -229,13 +185,13 @@ plt.xlabel("Event multipilcity", fontsize=12)
 plt.ylabel("Number of events", fontsize=12)
 bins = np.linspace(0, 150, 51)
 plt.hist(
-    np.array([len(photon) for photon in true_photons]),
+    photon_lengths,
     bins=bins,
     color="#3288bd",
     label="Generated photons",
 )
 plt.hist(
-    np.array([len(cluster) for cluster in reco_clusters]),
+    cluster_lengths,
     bins=bins,
     histtype="step",
     color="#fc8d59",
@@ -246,28 +202,6 @@ plt.legend(loc="upper right", fontsize=10)
 plt.savefig(fname=f"{images_dir}/evt-multi-hist-{args.data_sample}.png")
 plt.close()
 
-# +------------------------------+
-# |   Training set preparation   |
-# +------------------------------+
-
-max_input_photons = MAX_INPUT_PHOTONS_DEMO if args.demo else MAX_INPUT_PHOTONS
-max_output_clusters = MAX_OUTPUT_CLUSTERS_DEMO if args.demo else MAX_OUTPUT_CLUSTERS
-
-pad_photons = PADDING_VALUE * np.ones(
-    shape=(nEvents, max_input_photons, len(true_vars))
-)
-pad_clusters = PADDING_VALUE * np.ones(
-    shape=(nEvents, max_output_clusters, len(reco_vars))
-)
-
-for iRow, photon in enumerate(true_photons):
-    photons_trunkated = photon[:max_input_photons]
-    pad_photons[iRow, : len(photons_trunkated)] = photons_trunkated
-
-for iRow, cluster in enumerate(reco_clusters):
-    clusters_trunkated = cluster[:max_output_clusters]
-    pad_clusters[iRow, : len(clusters_trunkated)] = clusters_trunkated
-
 # +--------------------------+
 # |   Calorimeter deposits   |
 # +--------------------------+
@@ -338,21 +272,6 @@ img_name = "energy-seq-demo" if args.demo else "energy-seq"
 plt.savefig(fname=f"{images_dir}/{img_name}-{args.data_sample}.png")
 plt.close()
 
-# +----------------------+
-# |   Matching weights   |
-# +----------------------+
-
-photons_xy = np.tile(pad_photons[:, None, :, :2], (1, pad_clusters.shape[1], 1, 1))
-clusters_xy = np.tile(pad_clusters[:, :, None, :2], (1, 1, pad_photons.shape[1], 1))
-
-pairwise_distance = np.linalg.norm(clusters_xy - photons_xy, axis=-1)
-min_pairwise_distance = np.min(pairwise_distance, axis=-1)
-
-match_weights = MAX_MATCH_DISTANCE / np.maximum(
-    min_pairwise_distance, MAX_MATCH_DISTANCE
-)
-match_weights *= pad_clusters[:, :, -1]  # NotPadding boolean
-
 # +---------------------------+
 # |   Reduced event example   |
 # +---------------------------+
@@ -411,20 +330,52 @@ plt.close()
 # |   Training data export   |
 # +--------------------------+
 
+# One ragged (unpadded) shard per input file, memory-mappable by the loader
 export_data_fname = f"calotron-{args.data_sample}data"
 if args.demo:
     export_data_fname += "-demo"
-npz_fname = f"{export_data_dir}/{export_data_fname}.npz"
-np.savez(
-    file=npz_fname,
-    photon=pad_photons[:, :, :-1],  # avoid NotPadding boolean
-    cluster=pad_clusters[:, :, :-1],  # avoid NotPadding boolean
-    weight=match_weights,
-)
+for i, res in enumerate(results):
+    writeRaggedDataset(
+        export_dir=f"{export_data_dir}/{export_data_fname}-{i:03d}",
+        padded={
+            "photon": res["photon"][:, :, :-1],  # avoid NotPadding boolean
+            "cluster": res["cluster"][:, :, :-1],  # avoid NotPadding boolean
+            "weight": res["weight"],
+        },
+        lengths={
+            "photon": res["photon_lengths"],
+            "cluster": res["cluster_lengths"],
+            "weight": res["cluster_lengths"],
+        },
+    )
 print(
-    f"[INFO] Training data of {len(pad_photons)} instances correctly saved to {npz_fname}"
+    f"[INFO] Training data of {nEvents} instances correctly saved "
+    f"to {len(results)} shards {export_data_dir}/{export_data_fname}-*"
 )
 
+# Compressed TFRecord shards, readable in parallel from shared storage
+if int(args.tfrecord_shards) > 0:
+    start = time()
+    tfrecord_dir = f"{export_data_dir}/{export_data_fname}-tfrecords"
+    writeTFRecords(
+        export_dir=tfrecord_dir,
+        padded={
+            "photon": pad_photons[:, :, :-1],  # avoid NotPadding boolean
+            "cluster": pad_clusters[:, :, :-1],  # avoid NotPadding boolean
+            "weight": match_weights,
+        },
+        lengths={
+            "photon": photon_lengths,
+            "cluster": cluster_lengths,
+            "weight": cluster_lengths,
+        },
+        num_shards=int(args.tfrecord_shards),
+    )
+    print(
+        f"[INFO] Training data correctly saved to {args.tfrecord_shards} "
+        f"TFRecord shards in {tfrecord_dir} in {time()-start:.2f} s"
+    )
+
 # +---------------------------------+
 # |   Preprocessing models export   |
 # +---------------------------------+
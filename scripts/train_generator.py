@@ -1,18 +1,19 @@
 import os
 import socket
 from datetime import datetime
+from glob import glob
 
 import numpy as np
 import tensorflow as tf
 import yaml
 from html_reports import Report
-from sklearn.utils import shuffle
 from tensorflow import keras
 from utils_argparser import argparser_training
 from utils_training import prepare_training_plots, prepare_validation_plots
 
 import calotron
 from calotron.callbacks.schedulers import LearnRateExpDecay
+from calotron.data import InputStallMonitor, RaggedDataset, makePipeline
 from calotron.models.transformers import GigaGenerator
 from calotron.simulators import ExportSimulator, Simulator
 from calotron.utils.reports import getSummaryHTML, initHPSingleton
@@ -46,61 +47,72 @@ reports_dir = config_dir["reports_dir"]
 
 chunk_size = int(args.chunk_size)
 train_ratio = float(args.train_ratio)
+seed = int(args.seed)
 
 # +------------------+
 # |   Data loading   |
 # +------------------+
 
-npzfile = np.load(f"{data_dir}/calotron-{args.data_sample}data-demo.npz")
+data_dirs = sorted(glob(f"{data_dir}/calotron-{args.data_sample}data-demo-*"))
+dataset = RaggedDataset(data_dirs, dtype=DTYPE)  # memory-mapped, padded per batch
 
-photon = npzfile["photon"].astype(DTYPE)[:chunk_size]
-cluster = npzfile["cluster"].astype(DTYPE)[:chunk_size]
-weight = npzfile["weight"].astype(DTYPE)[:chunk_size]
-
-print(f"[INFO] Generated photons - shape: {photon.shape}")
-print(f"[INFO] Reconstructed clusters - shape: {cluster.shape}")
-print(f"[INFO] Matching weights - shape: {weight.shape}")
-
-if not args.weights:
-    weight = np.ones_like(weight)
+photon_shape = dataset.padded_shape("photon")
+cluster_shape = dataset.padded_shape("cluster")
+print(f"[INFO] Generated photons - shape: {(len(dataset), *photon_shape)}")
+print(f"[INFO] Reconstructed clusters - shape: {(len(dataset), *cluster_shape)}")
+print(
+    "[INFO] Matching weights - shape: "
+    f"{(len(dataset), *dataset.padded_shape('weight'))}"
+)
 
-photon, cluster, weight = shuffle(photon, cluster, weight)
+# Seeded split, so that the validation events are reproducible
+indices = np.random.default_rng(seed).permutation(len(dataset))[:chunk_size]
 
-chunk_size = hp.get("chunk_size", photon.shape[0])
+chunk_size = hp.get("chunk_size", len(indices))
 train_size = hp.get("train_size", int(train_ratio * chunk_size))
 
 # +-------------------------+
 # |   Dataset preparation   |
 # +-------------------------+
 
-photon_train = photon[:train_size]
-cluster_train = cluster[:train_size]
-weight_train = weight[:train_size]
-train_ds = (
-    tf.data.Dataset.from_tensor_slices(
-        ((photon_train, cluster_train), cluster_train, weight_train)
-    )
-    .batch(hp.get("batch_size", BATCHSIZE), drop_remainder=True)
-    .cache()
-    .prefetch(tf.data.AUTOTUNE)
+# Training events reshuffled every epoch through a seeded index permutation
+stall_monitor = InputStallMonitor()
+train_indices = indices[:train_size]
+
+
+def train_map(photon, cluster, weight):
+    weight = weight if args.weights else tf.ones_like(weight)
+    return (photon, cluster), cluster, weight
+
+
+train_ds = makePipeline(
+    dataset,
+    batch_size=hp.get("batch_size", BATCHSIZE),
+    training=True,
+    map_fn=train_map,
+    seed=seed,
+    features=["photon", "cluster", "weight"],
+    indices=train_indices,
+    monitor=stall_monitor,
 )
 
+sample = dataset.get_batch(train_indices[:BATCHSIZE], features=["photon", "cluster"])
+photon_sample, cluster_sample = sample["photon"], sample["cluster"]
+
+val_indices = indices[train_size:] if train_ratio != 1.0 else train_indices
+val = dataset.get_batch(val_indices)
+photon_val, cluster_val, weight_val = val["photon"], val["cluster"], val["weight"]
+if not args.weights:
+    weight_val = np.ones_like(weight_val)
+
 if train_ratio != 1.0:
-    photon_val = photon[train_size:]
-    cluster_val = cluster[train_size:]
-    weight_val = weight[train_size:]
-    val_ds = (
-        tf.data.Dataset.from_tensor_slices(
-            ((photon_val, cluster_val), cluster_val, weight_val)
-        )
-        .batch(BATCHSIZE, drop_remainder=True)
-        .cache()
-        .prefetch(tf.data.AUTOTUNE)
+    val_ds = makePipeline(
+        (photon_val, cluster_val, weight_val),
+        batch_size=hp.get("val_batch_size", hp.get("batch_size", BATCHSIZE)),
+        training=False,
+        map_fn=lambda photon, cluster, weight: ((photon, cluster), cluster, weight),
     )
 else:
-    photon_val = photon_train
-    cluster_val = cluster_train
-    weight_val = weight_train
     val_ds = None
 
 # +------------------------+
@@ -108,7 +120,7 @@ else:
 # +------------------------+
 
 model = GigaGenerator(
-    output_depth=hp.get("output_depth", cluster.shape[2]),
+    output_depth=hp.get("output_depth", cluster_shape[1]),
     encoder_depth=hp.get("encoder_depth", 32),
     mapping_latent_dim=hp.get("mapping_latent_dim", 64),
     synthesis_depth=hp.get("synthesis_depth", 32),
@@ -120,7 +132,7 @@ model = GigaGenerator(
     dropout_rate=hp.get("dropout_rate", 0.1),
     seq_ord_latent_dim=hp.get("seq_ord_latent_dim", 64),
     seq_ord_max_length=hp.get(
-        "seq_ord_max_length", max(photon.shape[1], cluster.shape[1])
+        "seq_ord_max_length", max(photon_shape[0], cluster_shape[0])
     ),
     seq_ord_normalization=hp.get("seq_ord_normalization", 10_000),
     enable_res_smoothing=hp.get("enable_res_smoothing", True),
@@ -131,7 +143,7 @@ model = GigaGenerator(
     dtype=DTYPE,
 )
 
-output = model((photon[:BATCHSIZE], cluster[:BATCHSIZE]))
+output = model((photon_sample, cluster_sample))
 model.summary()
 
 # +----------------------+
@@ -156,7 +168,7 @@ model.compile(loss=loss, optimizer=opt, weighted_metrics=metrics)
 # |   Callbacks definition   |
 # +--------------------------+
 
-callbacks = list()
+callbacks = [stall_monitor]
 
 lr_sched = LearnRateExpDecay(
     model.optimizer,
@@ -184,22 +196,28 @@ stop = datetime.now()
 duration = str(stop - start).split(".")[0].split(":")  # [HH, MM, SS]
 duration = f"{duration[0]}h {duration[1]}min {duration[2]}s"
 print(f"[INFO] Model training completed in {duration}")
+print(
+    "[INFO] Input pipeline stalls: "
+    f"{sum(stall_monitor.stall_times):.2f} s over the training "
+    f"({100 * np.mean(stall_monitor.stall_fractions):.1f}% per epoch on average)"
+)
 
 # +---------------------+
 # |   Model inference   |
 # +---------------------+
 
-start_token = model.get_start_token(cluster_train)
+start_token = model.get_start_token(cluster_sample)
 start_token = np.mean(start_token, axis=0)
 
 sim = Simulator(model, start_token=start_token)
-exp_sim = ExportSimulator(sim, max_length=cluster.shape[1])
-
-dataset = (
-    tf.data.Dataset.from_tensor_slices(photon_val)
-    .batch(BATCHSIZE, drop_remainder=True)
-    .cache()
-    .prefetch(tf.data.AUTOTUNE)
+exp_sim = ExportSimulator(sim, max_length=cluster_shape[0])
+
+dataset = makePipeline(
+    photon_val,
+    batch_size=BATCHSIZE,
+    training=False,
+    deterministic=True,  # outputs aligned with the validation events
+    drop_remainder=True,
 )
 
 output, attn_weights = [exp_out.numpy() for exp_out in exp_sim(dataset)]
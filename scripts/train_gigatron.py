@@ -1,18 +1,19 @@
 import os
 import socket
 from datetime import datetime
+from glob import glob
 
 import numpy as np
 import tensorflow as tf
 import yaml
 from html_reports import Report
-from sklearn.utils import shuffle
 from tensorflow import keras
 from utils_argparser import argparser_training
 from utils_training import prepare_training_plots, prepare_validation_plots
 
 import calotron
 from calotron.callbacks.schedulers import LearnRateExpDecay
+from calotron.data import InputStallMonitor, RaggedDataset, makePipeline
 from calotron.losses import GeomReinfMSE
 from calotron.models import Calotron
 from calotron.models.discriminators import GigaDiscriminator
@@ -50,125 +51,164 @@ reports_dir = config_dir["reports_dir"]
 
 chunk_size = int(args.chunk_size)
 train_ratio = float(args.train_ratio)
+seed = int(args.seed)
+
+# +---------------------------+
+# |   Distribution strategy   |
+# +---------------------------+
+
+if "TF_CONFIG" in os.environ:
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()  # multiple workers
+else:
+    strategy = tf.distribute.MirroredStrategy()  # multiple local devices
+print(f"[INFO] Replicas in sync: {strategy.num_replicas_in_sync}")
 
 # +------------------+
 # |   Data loading   |
 # +------------------+
 
-npzfile = np.load(f"{data_dir}/calotron-{args.data_sample}data-demo.npz")
+data_dirs = sorted(glob(f"{data_dir}/calotron-{args.data_sample}data-demo-*"))
+dataset = RaggedDataset(data_dirs, dtype=DTYPE)  # memory-mapped, padded per batch
 
-photon = npzfile["photon"].astype(DTYPE)[:chunk_size]
-cluster = npzfile["cluster"].astype(DTYPE)[:chunk_size]
-weight = npzfile["weight"].astype(DTYPE)[:chunk_size]
-
-print(f"[INFO] Generated photons - shape: {photon.shape}")
-print(f"[INFO] Reconstructed clusters - shape: {cluster.shape}")
-print(f"[INFO] Matching weights - shape: {weight.shape}")
-
-if not args.weights:
-    weight = np.ones_like(weight)
+photon_shape = dataset.padded_shape("photon")
+cluster_shape = dataset.padded_shape("cluster")
+print(f"[INFO] Generated photons - shape: {(len(dataset), *photon_shape)}")
+print(f"[INFO] Reconstructed clusters - shape: {(len(dataset), *cluster_shape)}")
+print(
+    "[INFO] Matching weights - shape: "
+    f"{(len(dataset), *dataset.padded_shape('weight'))}"
+)
 
-photon, cluster, weight = shuffle(photon, cluster, weight)
+# Seeded split, so that every worker holds out the same validation events
+indices = np.random.default_rng(seed).permutation(len(dataset))[:chunk_size]
 
-chunk_size = hp.get("chunk_size", photon.shape[0])
+chunk_size = hp.get("chunk_size", len(indices))
 train_size = hp.get("train_size", int(train_ratio * chunk_size))
 
 # +-------------------------+
 # |   Dataset preparation   |
 # +-------------------------+
 
-photon_train = photon[:train_size]
-cluster_train = cluster[:train_size]
-weight_train = weight[:train_size]
-train_ds = (
-    tf.data.Dataset.from_tensor_slices((photon_train, cluster_train, weight_train))
-    .batch(hp.get("batch_size", BATCHSIZE), drop_remainder=True)
-    .cache()
-    .prefetch(tf.data.AUTOTUNE)
-)
+# Training events reshuffled every epoch through a seeded index permutation,
+# and sharded explicitly so that each worker reads its own subset of events
+num_local_replicas = len(strategy.extended.worker_devices)
+stall_monitor = InputStallMonitor(batches_per_step=num_local_replicas)
+train_indices = indices[:train_size]
+batch_size = hp.get("batch_size", BATCHSIZE)
+
+
+def train_map(photon, cluster, weight):
+    weight = weight if args.weights else tf.ones_like(weight)
+    return photon, cluster, weight
+
+
+def train_fn(input_context):
+    shard = train_indices[
+        input_context.input_pipeline_id :: input_context.num_input_pipelines
+    ]
+    train_ds = makePipeline(
+        dataset,
+        batch_size=input_context.get_per_replica_batch_size(batch_size),
+        training=True,
+        map_fn=train_map,
+        seed=seed,
+        features=["photon", "cluster", "weight"],
+        indices=shard,
+        monitor=stall_monitor,
+    )
+    return train_ds.repeat()  # epochs defined by `steps_per_epoch`
+
+
+train_ds = strategy.distribute_datasets_from_function(train_fn)
+steps_per_epoch = hp.get("steps_per_epoch", len(train_indices) // batch_size)
+
+sample = dataset.get_batch(train_indices[:BATCHSIZE], features=["photon", "cluster"])
+photon_sample, cluster_sample = sample["photon"], sample["cluster"]
+
+val_indices = indices[train_size:] if train_ratio != 1.0 else train_indices
+val = dataset.get_batch(val_indices)
+photon_val, cluster_val, weight_val = val["photon"], val["cluster"], val["weight"]
+if not args.weights:
+    weight_val = np.ones_like(weight_val)
 
 if train_ratio != 1.0:
-    photon_val = photon[train_size:]
-    cluster_val = cluster[train_size:]
-    weight_val = weight[train_size:]
-    val_ds = (
-        tf.data.Dataset.from_tensor_slices((photon_val, cluster_val, weight_val))
-        .batch(BATCHSIZE, drop_remainder=True)
-        .cache()
-        .prefetch(tf.data.AUTOTUNE)
+    val_ds = makePipeline(
+        (photon_val, cluster_val, weight_val),
+        batch_size=hp.get("val_batch_size", hp.get("batch_size", BATCHSIZE)),
+        training=False,
+        map_fn=None,
     )
 else:
-    photon_val = photon_train
-    cluster_val = cluster_train
-    weight_val = weight_train
     val_ds = None
 
 # +------------------------+
 # |   Model construction   |
 # +------------------------+
 
-transformer = GigaGenerator(
-    output_depth=hp.get("t_output_depth", cluster.shape[2]),
-    encoder_depth=hp.get("t_encoder_depth", 32),
-    mapping_latent_dim=hp.get("mapping_latent_dim", 64),
-    synthesis_depth=hp.get("t_synthesis_depth", 32),
-    num_layers=hp.get("t_num_layers", 5),
-    num_heads=hp.get("t_num_heads", 4),
-    key_dim=hp.get("t_key_dim", 64),
-    admin_res_scale=hp.get("t_admin_res_scale", "O(n)"),
-    mlp_units=hp.get("t_mlp_units", 128),
-    dropout_rate=hp.get("t_dropout_rate", 0.1),
-    seq_ord_latent_dim=hp.get("t_seq_ord_latent_dim", 64),
-    seq_ord_max_length=hp.get(
-        "t_seq_ord_max_length", max(photon.shape[1], cluster.shape[1])
-    ),
-    seq_ord_normalization=hp.get("t_seq_ord_normalization", 10_000),
-    enable_res_smoothing=hp.get("t_enable_res_smoothing", True),
-    output_activations=hp.get("t_output_activations", ["tanh", "tanh", "sigmoid"]),
-    start_token_initializer=hp.get("t_start_toke_initializer", "ones"),
-    pretrained_encoder_dir=hp.get("t_pretrained_encoder_dir", None),
-    additional_encoder_layers=hp.get("t_additional_encoder_layers", None),
-    dtype=DTYPE,
-)
+with strategy.scope():
+    transformer = GigaGenerator(
+        output_depth=hp.get("t_output_depth", cluster_shape[1]),
+        encoder_depth=hp.get("t_encoder_depth", 32),
+        mapping_latent_dim=hp.get("mapping_latent_dim", 64),
+        synthesis_depth=hp.get("t_synthesis_depth", 32),
+        num_layers=hp.get("t_num_layers", 5),
+        num_heads=hp.get("t_num_heads", 4),
+        key_dim=hp.get("t_key_dim", 64),
+        admin_res_scale=hp.get("t_admin_res_scale", "O(n)"),
+        mlp_units=hp.get("t_mlp_units", 128),
+        dropout_rate=hp.get("t_dropout_rate", 0.1),
+        seq_ord_latent_dim=hp.get("t_seq_ord_latent_dim", 64),
+        seq_ord_max_length=hp.get(
+            "t_seq_ord_max_length", max(photon_shape[0], cluster_shape[0])
+        ),
+        seq_ord_normalization=hp.get("t_seq_ord_normalization", 10_000),
+        enable_res_smoothing=hp.get("t_enable_res_smoothing", True),
+        output_activations=hp.get("t_output_activations", ["tanh", "tanh", "sigmoid"]),
+        start_token_initializer=hp.get("t_start_toke_initializer", "ones"),
+        pretrained_encoder_dir=hp.get("t_pretrained_encoder_dir", None),
+        additional_encoder_layers=hp.get("t_additional_encoder_layers", None),
+        dtype=DTYPE,
+    )
 
-d_activation = "sigmoid" if args.adv_metric == "bce" else None
-
-discriminator = GigaDiscriminator(
-    output_units=hp.get("d_output_units", 1),
-    encoder_depth=hp.get("d_encoder_depth", 16),
-    decoder_depth=hp.get("d_decoder_depth", 16),
-    num_layers=hp.get("d_num_layers", 4),
-    num_heads=hp.get("d_num_heads", 4),
-    key_dim=hp.get("d_key_dim", 64),
-    admin_res_scale=hp.get("d_admin_res_scale", "O(n)"),
-    mlp_units=hp.get("d_mlp_units", 128),
-    dropout_rate=hp.get("d_dropout_rate", 0.1),
-    seq_ord_latent_dim=hp.get("d_seq_ord_latent_dim", 64),
-    seq_ord_max_length=hp.get(
-        "t_seq_ord_max_length", max(photon.shape[1], cluster.shape[1])
-    ),
-    seq_ord_normalization=hp.get("d_seq_ord_normalization", 10_000),
-    enable_res_smoothing=hp.get("d_enable_res_smoothing", True),
-    output_activation=hp.get("d_output_activation", d_activation),
-    pretrained_encoder_dir=hp.get("d_pretrained_encoder_dir", None),
-    additional_encoder_layers=hp.get("d_additional_encoder_layers", None),
-    dtype=DTYPE,
-)
+    d_activation = "sigmoid" if args.adv_metric == "bce" else None
+
+    discriminator = GigaDiscriminator(
+        output_units=hp.get("d_output_units", 1),
+        encoder_depth=hp.get("d_encoder_depth", 16),
+        decoder_depth=hp.get("d_decoder_depth", 16),
+        num_layers=hp.get("d_num_layers", 4),
+        num_heads=hp.get("d_num_heads", 4),
+        key_dim=hp.get("d_key_dim", 64),
+        admin_res_scale=hp.get("d_admin_res_scale", "O(n)"),
+        mlp_units=hp.get("d_mlp_units", 128),
+        dropout_rate=hp.get("d_dropout_rate", 0.1),
+        seq_ord_latent_dim=hp.get("d_seq_ord_latent_dim", 64),
+        seq_ord_max_length=hp.get(
+            "t_seq_ord_max_length", max(photon_shape[0], cluster_shape[0])
+        ),
+        seq_ord_normalization=hp.get("d_seq_ord_normalization", 10_000),
+        enable_res_smoothing=hp.get("d_enable_res_smoothing", True),
+        output_activation=hp.get("d_output_activation", d_activation),
+        pretrained_encoder_dir=hp.get("d_pretrained_encoder_dir", None),
+        additional_encoder_layers=hp.get("d_additional_encoder_layers", None),
+        dtype=DTYPE,
+    )
 
-model = Calotron(transformer=transformer, discriminator=discriminator)
+    model = Calotron(transformer=transformer, discriminator=discriminator)
 
-output = model((photon[:BATCHSIZE], cluster[:BATCHSIZE]))
+    output = model((photon_sample, cluster_sample))
 model.summary()
 
 # +----------------------+
 # |   Optimizers setup   |
 # +----------------------+
 
-t_opt = keras.optimizers.RMSprop(hp.get("t_lr0", 1e-4))
-hp.get("t_optimizer", t_opt.name)
+with strategy.scope():
+    t_opt = keras.optimizers.RMSprop(hp.get("t_lr0", 1e-4))
+    hp.get("t_optimizer", t_opt.name)
 
-d_opt = keras.optimizers.RMSprop(hp.get("d_lr0", 1e-4))
-hp.get("d_optimizer", d_opt.name)
+    d_opt = keras.optimizers.RMSprop(hp.get("d_lr0", 1e-4))
+    hp.get("d_optimizer", d_opt.name)
 
 # +----------------------------+
 # |   Training configuration   |
@@ -178,42 +218,54 @@ adv_metric = (
     "binary-crossentropy" if args.adv_metric == "bce" else "wasserstein-distance"
 )
 
-loss = GeomReinfMSE(
-    rho=hp.get("loss_rho", 0.05),
-    alpha=hp.get("loss_alpha", ALPHA),
-    adversarial_metric=hp.get("loss_adversarial_metric", adv_metric),
-    bce_options=hp.get(
-        "loss_bce_options",
-        {"injected_noise_stddev": 0.02, "from_logits": False, "label_smoothing": 0.1},
-    ),
-    wass_options=hp.get(
-        "loss_wass_options",
-        {
-            "lipschitz_regularizer": "alp",
-            "lipschitz_penalty": 100.0,
-            "lipschitz_penalty_strategy": "one-sided",
-        },
-    ),
-    warmup_energy=hp.get("warmup_energy", 1e-8),
-)
+with strategy.scope():
+    loss = GeomReinfMSE(
+        rho=hp.get("loss_rho", 0.05),
+        alpha=hp.get("loss_alpha", ALPHA),
+        adversarial_metric=hp.get("loss_adversarial_metric", adv_metric),
+        bce_options=hp.get(
+            "loss_bce_options",
+            {
+                "injected_noise_stddev": 0.02,
+                "from_logits": False,
+                "label_smoothing": 0.1,
+            },
+        ),
+        wass_options=hp.get(
+            "loss_wass_options",
+            {
+                "lipschitz_regularizer": "alp",
+                "lipschitz_penalty": 100.0,
+                "lipschitz_penalty_strategy": "one-sided",
+                "lipschitz_penalty_interval": 1,
+            },
+        ),
+        warmup_energy=hp.get("warmup_energy", 1e-8),
+    )
 hp.get("loss", loss.name)
 
 metrics = ["accuracy", "bce"] if args.adv_metric == "bce" else ["wass_dist"]
 
-model.compile(
-    loss=loss,
-    metrics=hp.get("metrics", metrics),
-    transformer_optimizer=t_opt,
-    discriminator_optimizer=d_opt,
-    transformer_upds_per_batch=hp.get("transformer_upds_per_batch", 1),
-    discriminator_upds_per_batch=hp.get("discriminator_upds_per_batch", 1),
-)
+with strategy.scope():
+    model.compile(
+        loss=loss,
+        metrics=hp.get("metrics", metrics),
+        transformer_optimizer=t_opt,
+        discriminator_optimizer=d_opt,
+        transformer_upds_per_batch=hp.get("transformer_upds_per_batch", 1),
+        discriminator_upds_per_batch=hp.get("discriminator_upds_per_batch", 1),
+        transformer_accum_steps=hp.get("transformer_accum_steps", 1),
+        discriminator_accum_steps=hp.get("discriminator_accum_steps", 1),
+        reuse_generated_batch=hp.get("reuse_generated_batch", False),
+        replay_buffer_size=hp.get("replay_buffer_size", 0),
+        replay_ratio=hp.get("replay_ratio", 0.25),
+    )
 
 # +--------------------------+
 # |   Callbacks definition   |
 # +--------------------------+
 
-callbacks = list()
+callbacks = [stall_monitor]
 
 t_lr_sched = LearnRateExpDecay(
     model.transformer_optimizer,
@@ -245,6 +297,7 @@ start = datetime.now()
 train = model.fit(
     train_ds,
     epochs=hp.get("epochs", EPOCHS),
+    steps_per_epoch=steps_per_epoch,
     validation_data=val_ds,
     callbacks=callbacks,
 )
@@ -253,22 +306,28 @@ stop = datetime.now()
 duration = str(stop - start).split(".")[0].split(":")  # [HH, MM, SS]
 duration = f"{duration[0]}h {duration[1]}min {duration[2]}s"
 print(f"[INFO] Model training completed in {duration}")
+print(
+    "[INFO] Input pipeline stalls: "
+    f"{sum(stall_monitor.stall_times):.2f} s over the training "
+    f"({100 * np.mean(stall_monitor.stall_fractions):.1f}% per epoch on average)"
+)
 
 # +---------------------+
 # |   Model inference   |
 # +---------------------+
 
-start_token = model.get_start_token(cluster_train)
+start_token = model.get_start_token(cluster_sample)
 start_token = np.mean(start_token, axis=0)
 
 sim = Simulator(model.transformer, start_token=start_token)
-exp_sim = ExportSimulator(sim, max_length=cluster.shape[1])
-
-dataset = (
-    tf.data.Dataset.from_tensor_slices(photon_val)
-    .batch(BATCHSIZE, drop_remainder=True)
-    .cache()
-    .prefetch(tf.data.AUTOTUNE)
+exp_sim = ExportSimulator(sim, max_length=cluster_shape[0])
+
+dataset = makePipeline(
+    photon_val,
+    batch_size=BATCHSIZE,
+    training=False,
+    deterministic=True,  # outputs aligned with the validation events
+    drop_remainder=True,
 )
 
 output, attn_weights = [exp_out.numpy() for exp_out in exp_sim(dataset)]
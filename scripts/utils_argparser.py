@@ -24,6 +24,23 @@ def argparser_preprocessing(description=None) -> ArgumentParser:
         default=-1,
         help="maximum number of instancens downloaded from the overall files (default: -1)",
     )
+    parser.add_argument(
+        "-W",
+        "--num_workers",
+        default=None,
+        help=(
+            "number of processes used to prepare the files in parallel "
+            "(default: number of CPUs)"
+        ),
+    )
+    parser.add_argument(
+        "--tfrecord_shards",
+        default=0,
+        help=(
+            "number of compressed TFRecord shards additionally exported, "
+            "none if 0 (default: 0)"
+        ),
+    )
     parser.add_argument(
         "-D",
         "--data_sample",
@@ -70,6 +87,14 @@ def argparser_training(model, adv_learning=True, description=None) -> ArgumentPa
         default=0.7,
         help="fraction of instances to be used for training (default: 0.7)",
     )
+    parser.add_argument(
+        "--seed",
+        default=42,
+        help=(
+            "seed of the train/validation split and of the event order, "
+            "shared by all the workers (default: 42)"
+        ),
+    )
     parser.add_argument(
         "-D",
         "--data_sample",
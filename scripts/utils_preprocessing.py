@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from calotron.utils.preprocessing import (
+    buildEvents,
+    computeMatchWeights,
+    readRootChunks,
+)
+
+ECAL_W = 8000
+ECAL_H = 6500
+MAX_OVX = 50
+MAX_OVY = 50
+MAX_OVZ = 150
+
+TRUE_VARS = ["x", "y", "logE", "tx", "ty", "ovx", "ovy", "ovz"]
+TRUE_VARS += ["NotPadding"]
+BOOL_VARS = ["PhotonFromMergedPi0", "Pi0Merged", "Photon"]
+PID_VARS = ["PhotonID", "IsNotE", "IsNotH"]
+
+PHOTON_BRANCHES = ["evtNumber", "mcID", "ecal_x", "ecal_y", "px", "py", "pz"]
+PHOTON_BRANCHES += ["ovx", "ovy", "ovz"]
+PHOTON_CUT = "pz > 750 and abs(ovx) < 50 and abs(ovy) < 50 and abs(ovz) < 150"
+CLUSTER_BRANCHES = ["evtNumber", "x", "y", "E"]
+CLUSTER_CUT = "E > 1500"
+
+
+def reco_variables(demo=False) -> list:
+    reco_vars = ["x", "y", "logE"]
+    if not demo:
+        reco_vars += BOOL_VARS + PID_VARS
+    reco_vars += ["NotPadding"]
+    return reco_vars
+
+
+def process_file(
+    fname,
+    demo=False,
+    max_input_photons=96,
+    max_output_clusters=96,
+    max_match_distance=0.01,
+    padding_value=0.0,
+    seed=None,
+) -> dict:
+    reco_vars = reco_variables(demo)
+    cluster_branches = CLUSTER_BRANCHES + ([] if demo else BOOL_VARS + PID_VARS)
+
+    # Scalers partially fitted on this file only, merged afterwards
+    photon_scaler_logE = MinMaxScaler()
+    cluster_scaler_logE = MinMaxScaler()
+    cluster_scaler_pid = StandardScaler()
+
+    photon_list = list()
+    for chunk in readRootChunks(
+        fname, "CaloTupler/calo_true", branches=PHOTON_BRANCHES, cut=PHOTON_CUT
+    ):
+        chunk["x"] = chunk["ecal_x"] / ECAL_W * 2
+        chunk["y"] = chunk["ecal_y"] / ECAL_H * 2
+        chunk["p"] = np.linalg.norm(chunk[["px", "py", "pz"]], axis=1)
+        chunk["logE"] = np.log(chunk.p)
+        chunk["tx"] = chunk.px / chunk.pz
+        chunk["ty"] = chunk.py / chunk.pz
+        chunk["ovx"] = chunk.ovx / MAX_OVX
+        chunk["ovy"] = chunk.ovy / MAX_OVY
+        chunk["ovz"] = chunk.ovz / MAX_OVZ
+        chunk["NotPadding"] = 1.0
+        photon_scaler_logE.partial_fit(np.c_[chunk.logE])
+        photon_list.append(chunk[["evtNumber", "mcID", "p"] + TRUE_VARS])
+
+    cluster_list = list()
+    for chunk in readRootChunks(
+        fname,
+        "CaloTupler/neutral_protos",
+        branches=cluster_branches,
+        cut=CLUSTER_CUT,
+    ):
+        chunk["x"] = chunk.x / ECAL_W * 2
+        chunk["y"] = chunk.y / ECAL_H * 2
+        chunk["logE"] = np.log(chunk.E)
+        chunk["NotPadding"] = 1.0
+        cluster_scaler_logE.partial_fit(np.c_[chunk.logE])
+        if not demo:
+            cluster_scaler_pid.partial_fit(chunk[PID_VARS].values)
+        cluster_list.append(chunk[["evtNumber", "E"] + reco_vars])
+
+    result = {
+        "photon_scaler_logE": photon_scaler_logE,
+        "cluster_scaler_logE": cluster_scaler_logE,
+        "cluster_scaler_pid": cluster_scaler_pid,
+    }
+    if len(photon_list) == 0 or len(cluster_list) == 0:
+        result["photon"] = np.zeros((0, max_input_photons, len(TRUE_VARS)))
+        result["cluster"] = np.zeros((0, max_output_clusters, len(reco_vars)))
+        result["photon_lengths"] = np.zeros(0, dtype=np.int64)
+        result["cluster_lengths"] = np.zeros(0, dtype=np.int64)
+        result["weight"] = np.zeros((0, max_output_clusters))
+        return result
+
+    photon_df = pd.concat(photon_list, ignore_index=True)
+    cluster_df = pd.concat(cluster_list, ignore_index=True)
+
+    # Events of this file (the ones with clusters) in random order
+    events = np.unique(cluster_df.evtNumber)
+    events = np.random.default_rng(seed).permutation(events)
+
+    true_df = photon_df.query("mcID == 22")  # photons
+    _, pad_photons, photon_lengths = buildEvents(
+        data=true_df[TRUE_VARS].values.astype(np.float64),
+        event_ids=true_df.evtNumber.values,
+        sort_keys=true_df.p.values,
+        max_length=max_input_photons,
+        events=events,
+        padding_value=padding_value,
+    )
+    _, pad_clusters, cluster_lengths = buildEvents(
+        data=cluster_df[reco_vars].values.astype(np.float64),
+        event_ids=cluster_df.evtNumber.values,
+        sort_keys=cluster_df.E.values,
+        max_length=max_output_clusters,
+        events=events,
+        padding_value=padding_value,
+    )
+
+    # Positions don't depend on the fitted scalers, so matching runs here
+    match_weights = computeMatchWeights(
+        photons_xy=pad_photons[:, :, :2],
+        clusters_xy=pad_clusters[:, :, :2],
+        cluster_mask=pad_clusters[:, :, -1],  # NotPadding boolean
+        max_match_distance=max_match_distance,
+        num_workers=1,  # parallelism already over files
+    )
+
+    result["photon"] = pad_photons
+    result["cluster"] = pad_clusters
+    result["photon_lengths"] = photon_lengths
+    result["cluster_lengths"] = cluster_lengths
+    result["weight"] = match_weights
+    return result
+
+
+def apply_scaler(padded, scaler, columns) -> None:
+    # Only non-padded entries (NotPadding boolean as last column) are scaled
+    evt, pos = np.nonzero(padded[:, :, -1] > 0.0)
+    if len(evt) == 0:
+        return
+    columns = np.asarray(columns)[None, :]
+    evt, pos = evt[:, None], pos[:, None]
+    padded[evt, pos, columns] = scaler.transform(padded[evt, pos, columns])
@@ -0,0 +1,141 @@
+import numpy as np
+from tensorflow import keras
+
+
+class AdvAdaptiveUpdates(keras.callbacks.Callback):
+    def __init__(
+        self,
+        d_loss_bounds,
+        min_upds=0,
+        max_upds=5,
+        check_every=100,
+        warmup_steps=0,
+        verbose=False,
+    ) -> None:
+        super().__init__()
+        self._name = "AdvAdaptiveUpdates"
+
+        # Discriminator loss bounds
+        assert isinstance(d_loss_bounds, (list, tuple, np.ndarray))
+        assert len(d_loss_bounds) == 2
+        assert d_loss_bounds[0] < d_loss_bounds[1]
+        self._d_loss_bounds = [float(b) for b in d_loss_bounds]
+
+        # Discriminator updates range
+        assert isinstance(min_upds, (int, float))
+        assert min_upds >= 0
+        self._min_upds = int(min_upds)
+        assert isinstance(max_upds, (int, float))
+        assert max_upds >= max(self._min_upds, 1)
+        self._max_upds = int(max_upds)
+
+        # Check frequency (in batches)
+        assert isinstance(check_every, (int, float))
+        assert check_every >= 1
+        self._check_every = int(check_every)
+
+        # Reconstruction-only warm-up (in batches)
+        assert isinstance(warmup_steps, (int, float))
+        assert warmup_steps >= 0
+        self._warmup_steps = int(warmup_steps)
+
+        # Verbose
+        assert isinstance(verbose, bool)
+        self._verbose = verbose
+
+    def on_train_begin(self, logs=None) -> None:
+        if not hasattr(self.model, "set_adversarial_schedule"):
+            raise TypeError(
+                "`AdvAdaptiveUpdates` requires a calotron's `Calotron` model, "
+                f"instead {type(self.model)} passed"
+            )
+        self._d_loss = [m for m in self.model.metrics if m.name == "d_loss"][0]
+        self._init_upds = self.model.discriminator_upds_per_batch
+        self._upds = min(max(self._init_upds, self._min_upds), self._max_upds)
+        self._window = self._read_d_loss()
+        self._step = -1
+        if self._warmup_steps > 0:
+            self.model.set_adversarial_schedule(
+                discriminator_upds_per_batch=0, adversarial_loss=False
+            )
+        else:
+            self.model.set_adversarial_schedule(
+                discriminator_upds_per_batch=self._upds
+            )
+
+    def _read_d_loss(self) -> tuple:
+        return float(self._d_loss.total.numpy()), float(self._d_loss.count.numpy())
+
+    def on_batch_end(self, batch, logs=None) -> None:
+        self._step += 1
+        num_steps = self._step + 1 - self._warmup_steps
+        if num_steps == 0:
+            self.model.set_adversarial_schedule(
+                discriminator_upds_per_batch=self._upds, adversarial_loss=True
+            )
+            self._window = self._read_d_loss()
+        elif num_steps > 0 and num_steps % self._check_every == 0:
+            self._upds = self._scheduled_upds(self._upds)
+            self.model.set_adversarial_schedule(
+                discriminator_upds_per_batch=self._upds
+            )
+
+        logs = logs or {}
+        if self._verbose:
+            logs["d_upds"] = self.model.discriminator_upds_per_batch
+
+    def _scheduled_upds(self, upds) -> int:
+        # Windowed mean from the running metric (reset at each epoch)
+        total, count = self._read_d_loss()
+        prev_total, prev_count = self._window
+        if count < prev_count:
+            prev_total, prev_count = 0.0, 0.0
+        self._window = (total, count)
+
+        if count == prev_count:
+            # No discriminator update in the window: probe it again
+            return max(upds, 1)
+        d_loss = (total - prev_total) / (count - prev_count)
+        if d_loss < self._d_loss_bounds[0]:
+            upds -= 1  # discriminator winning, its updates are skipped
+        elif d_loss > self._d_loss_bounds[1]:
+            upds += 1  # discriminator losing, more updates needed
+        return min(max(upds, self._min_upds), self._max_upds)
+
+    def on_epoch_end(self, epoch, logs=None) -> None:
+        logs = logs or {}
+        if self._verbose:
+            logs["d_upds"] = self.model.discriminator_upds_per_batch
+
+    def on_train_end(self, logs=None) -> None:
+        self.model.set_adversarial_schedule(
+            discriminator_upds_per_batch=self._init_upds, adversarial_loss=True
+        )
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def d_loss_bounds(self) -> list:
+        return self._d_loss_bounds
+
+    @property
+    def min_upds(self) -> int:
+        return self._min_upds
+
+    @property
+    def max_upds(self) -> int:
+        return self._max_upds
+
+    @property
+    def check_every(self) -> int:
+        return self._check_every
+
+    @property
+    def warmup_steps(self) -> int:
+        return self._warmup_steps
+
+    @property
+    def verbose(self) -> bool:
+        return self._verbose
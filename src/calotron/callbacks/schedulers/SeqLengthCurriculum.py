@@ -0,0 +1,88 @@
+import numpy as np
+from tensorflow import keras
+
+
+class SeqLengthCurriculum(keras.callbacks.Callback):
+    def __init__(
+        self, boundaries, source_lengths=None, target_lengths=None, verbose=False
+    ) -> None:
+        super().__init__()
+        self._name = "SeqLengthCurriculum"
+
+        # Boundaries (in epochs)
+        assert isinstance(boundaries, (list, tuple, np.ndarray))
+        assert len(boundaries) >= 1
+        self._boundaries = [0] + [int(b) for b in boundaries]
+
+        # Sequence lengths per stage (None means full length)
+        if source_lengths is None and target_lengths is None:
+            raise ValueError(
+                "At least one between `source_lengths` and "
+                "`target_lengths` should be passed"
+            )
+        self._source_lengths = self._check_lengths(source_lengths, len(boundaries))
+        self._target_lengths = self._check_lengths(target_lengths, len(boundaries))
+
+        # Verbose
+        assert isinstance(verbose, bool)
+        self._verbose = verbose
+
+    @staticmethod
+    def _check_lengths(lengths, num_boundaries) -> list:
+        if lengths is None:
+            return [None] * (num_boundaries + 1)
+        assert isinstance(lengths, (list, tuple, np.ndarray))
+        assert len(lengths) == num_boundaries + 1
+        return [int(length) if length is not None else None for length in lengths]
+
+    def _stage(self, epoch) -> int:
+        for i in range(len(self._boundaries) - 1):
+            if (epoch >= self._boundaries[i]) and (epoch < self._boundaries[i + 1]):
+                return i
+        return len(self._boundaries) - 1
+
+    def on_epoch_begin(self, epoch, logs=None) -> None:
+        if not hasattr(self.model, "set_max_lengths"):
+            raise TypeError(
+                "`SeqLengthCurriculum` requires a model implementing "
+                f"`set_max_lengths()`, instead {type(self.model)} passed"
+            )
+        stage = self._stage(epoch)
+        self.model.set_max_lengths(
+            source_length=self._source_lengths[stage],
+            target_length=self._target_lengths[stage],
+        )
+
+    def on_train_end(self, logs=None) -> None:
+        self.model.set_max_lengths(source_length=None, target_length=None)
+
+    def on_epoch_end(self, epoch, logs=None) -> None:
+        logs = logs or {}
+        if self._verbose:
+            stage = self._stage(epoch)
+            for key, lengths in zip(
+                ["source_length", "target_length"],
+                [self._source_lengths, self._target_lengths],
+            ):
+                if lengths[stage] is not None:
+                    logs[key] = lengths[stage]
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def boundaries(self) -> list:
+        return self._boundaries
+
+    @property
+    def source_lengths(self) -> list:
+        return self._source_lengths
+
+    @property
+    def target_lengths(self) -> list:
+        return self._target_lengths
+
+    @property
+    def verbose(self) -> bool:
+        return self._verbose
@@ -1,3 +1,4 @@
+from .AdvAdaptiveUpdates import AdvAdaptiveUpdates
 from .AdvExpDamping import AdvExpDamping
 from .AdvLinearDamping import AdvLinearDamping
 from .AdvPiecewiseConstDamping import AdvPiecewiseConstDamping
@@ -7,3 +8,4 @@ from .LearnRateExpDecay import LearnRateExpDecay
 from .LearnRateInvTimeDecay import LearnRateInvTimeDecay
 from .LearnRatePiecewiseConstDecay import LearnRatePiecewiseConstDecay
 from .LearnRatePolynomialDecay import LearnRatePolynomialDecay
+from .SeqLengthCurriculum import SeqLengthCurriculum
@@ -0,0 +1,106 @@
+from collections import deque
+from time import perf_counter
+
+import tensorflow as tf
+from tensorflow import keras
+
+
+class InputStallMonitor(keras.callbacks.Callback):
+    def __init__(self, batches_per_step=1) -> None:
+        super().__init__()
+        self._name = "InputStallMonitor"
+
+        # Batches consumed per step (e.g. one per local replica when the
+        # dataset is distributed with `distribute_datasets_from_function`)
+        assert isinstance(batches_per_step, (int, float))
+        assert batches_per_step >= 1
+        self._batches_per_step = int(batches_per_step)
+
+        self._stamps = deque()
+        self._batch_begin = None
+        self._epoch_begin = None
+        self._epoch_steps = 0
+        self._epoch_stall = 0.0
+        self._epoch_excluded = 0.0
+        self._traced = False
+        self._stall_times = list()
+        self._stall_fractions = list()
+
+    def instrument(self, dataset) -> tf.data.Dataset:
+        assert isinstance(dataset, tf.data.Dataset)
+
+        # Zip pulls the request stamp before asking the pipeline for the
+        # batch, so the two stamps enclose the time blocked in `next()`
+        requests = tf.data.Dataset.from_tensors(0).repeat()
+        requests = requests.map(
+            lambda _: tf.py_function(perf_counter, inp=[], Tout=tf.float64)
+        )
+
+        def stamp(request, element):
+            t = tf.py_function(self._record, inp=[request], Tout=tf.float64)
+            with tf.control_dependencies([t]):
+                element = tf.nest.map_structure(tf.identity, element)
+            return element
+
+        return tf.data.Dataset.zip((requests, dataset)).map(stamp)
+
+    def _record(self, request) -> float:
+        now = perf_counter()
+        self._stamps.append((float(request), now))
+        return now
+
+    def on_train_begin(self, logs=None) -> None:
+        self._stamps.clear()
+        self._traced = False
+
+    def on_epoch_begin(self, epoch, logs=None) -> None:
+        # Stamps not cleared, since batches may be prefetched to the
+        # devices (e.g. by MirroredStrategy) before the epoch begins
+        self._epoch_steps = 0
+        self._epoch_stall = 0.0
+        self._epoch_excluded = 0.0
+        self._epoch_begin = perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None) -> None:
+        self._batch_begin = perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None) -> None:
+        # Stamps attributed in order to the steps that consume them, and
+        # only the time blocked after the step began counts as stall
+        num_batches = (batch + 1 - self._epoch_steps) * self._batches_per_step
+        self._epoch_steps = batch + 1
+        stall = 0.0
+        for _ in range(min(num_batches, len(self._stamps))):
+            request, delivery = self._stamps.popleft()
+            stall += max(delivery - max(request, self._batch_begin), 0.0)
+
+        # First step excluded, as it's dominated by the function tracing
+        if not self._traced:
+            self._traced = True
+            self._epoch_excluded += perf_counter() - self._batch_begin
+        else:
+            self._epoch_stall += stall
+
+    def on_epoch_end(self, epoch, logs=None) -> None:
+        logs = logs if logs is not None else {}
+        epoch_time = perf_counter() - self._epoch_begin - self._epoch_excluded
+        self._stall_times.append(self._epoch_stall)
+        self._stall_fractions.append(self._epoch_stall / max(epoch_time, 1e-12))
+        logs["data_stall"] = self._stall_times[-1]
+        logs["data_stall_frac"] = self._stall_fractions[-1]
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def batches_per_step(self) -> int:
+        return self._batches_per_step
+
+    @property
+    def stall_times(self) -> list:
+        return self._stall_times
+
+    @property
+    def stall_fractions(self) -> list:
+        return self._stall_fractions
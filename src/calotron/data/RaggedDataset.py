@@ -0,0 +1,216 @@
+import json
+
+import numpy as np
+import tensorflow as tf
+
+from calotron.data.writeRaggedDataset import RAGGED_FORMAT, RAGGED_VERSION
+
+
+class RaggedDataset:
+    def __init__(
+        self, data_dirs, features=None, dtype=None, padding_value=0.0, mmap_mode="r"
+    ) -> None:
+        # Data directories (one per shard)
+        if isinstance(data_dirs, str):
+            data_dirs = [data_dirs]
+        assert isinstance(data_dirs, (list, tuple))
+        assert len(data_dirs) >= 1
+        self._data_dirs = list(data_dirs)
+
+        schemas = list()
+        for data_dir in self._data_dirs:
+            with open(f"{data_dir}/schema.json") as file:
+                schema = json.load(file)
+            if (schema.get("format") != RAGGED_FORMAT) or (
+                schema.get("version") != RAGGED_VERSION
+            ):
+                raise ValueError(
+                    f"`{data_dir}` doesn't contain a dataset in the "
+                    f"'{RAGGED_FORMAT}' format (version {RAGGED_VERSION})"
+                )
+            schemas.append(schema)
+
+        # Features
+        if features is None:
+            features = list(schemas[0]["features"].keys())
+        elif isinstance(features, str):
+            features = [features]
+        assert isinstance(features, (list, tuple))
+        for name in features:
+            for data_dir, schema in zip(self._data_dirs, schemas):
+                if name not in schema["features"]:
+                    raise ValueError(f"`{data_dir}` has no `{name}` feature")
+        self._features = list(features)
+
+        # Output dtype and padding value
+        self._dtype = dtype
+        assert isinstance(padding_value, (int, float))
+        self._padding_value = float(padding_value)
+
+        # Padded shapes shared by all the shards
+        self._padded_shapes = dict()
+        self._dtypes = dict()
+        for name in self._features:
+            inner_shapes = {tuple(s["features"][name]["inner_shape"]) for s in schemas}
+            if len(inner_shapes) > 1:
+                raise ValueError(f"Inconsistent shapes of `{name}` across the shards")
+            max_length = max([s["features"][name]["max_length"] for s in schemas])
+            self._padded_shapes[name] = (max_length, *inner_shapes.pop())
+            self._dtypes[name] = np.dtype(
+                dtype if dtype is not None else schemas[0]["features"][name]["dtype"]
+            )
+
+        # Values memory-mapped, only the (small) offsets loaded in memory
+        self._values = [
+            {
+                name: np.load(f"{data_dir}/{name}_values.npy", mmap_mode=mmap_mode)
+                for name in self._features
+            }
+            for data_dir in self._data_dirs
+        ]
+        self._offsets = [
+            {name: np.load(f"{data_dir}/{name}_offsets.npy") for name in self._features}
+            for data_dir in self._data_dirs
+        ]
+        num_events = [s["num_events"] for s in schemas]
+        self._shard_starts = np.r_[0, np.cumsum(num_events)].astype(np.int64)
+
+    def __len__(self) -> int:
+        return int(self._shard_starts[-1])
+
+    def lengths(self, feature) -> np.ndarray:
+        self._check_feature(feature)
+        return np.concatenate([np.diff(off[feature]) for off in self._offsets])
+
+    def padded_shape(self, feature) -> tuple:
+        self._check_feature(feature)
+        return self._padded_shapes[feature]
+
+    def get_batch(self, indices, features=None) -> dict:
+        features = self._check_features(features)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if len(indices) > 0:
+            assert (indices.min() >= 0) and (indices.max() < len(self))
+
+        batch = {
+            name: np.full(
+                shape=(len(indices), *self._padded_shapes[name]),
+                fill_value=self._padding_value,
+                dtype=self._dtypes[name],
+            )
+            for name in features
+        }
+
+        # Events gathered shard by shard and scattered into the padded arrays
+        shards = np.searchsorted(self._shard_starts, indices, side="right") - 1
+        for shard in np.unique(shards):
+            sel = np.flatnonzero(shards == shard)
+            local = indices[sel] - self._shard_starts[shard]
+            for name in features:
+                offsets = self._offsets[shard][name]
+                starts = offsets[local]
+                lengths = offsets[local + 1] - starts
+                evt = np.repeat(sel, lengths)
+                pos = np.arange(lengths.sum()) - np.repeat(
+                    np.cumsum(lengths) - lengths, lengths
+                )
+                rows = np.repeat(starts, lengths) + pos
+                batch[name][evt, pos] = self._values[shard][name][rows]
+        return batch
+
+    def batches(
+        self,
+        batch_size,
+        features=None,
+        indices=None,
+        shuffle=True,
+        seed=None,
+        drop_remainder=False,
+    ):
+        features = self._check_features(features)
+        assert isinstance(batch_size, (int, float))
+        assert batch_size >= 1
+        batch_size = int(batch_size)
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices, dtype=np.int64)
+
+        # Shuffling through an index permutation, the data are never copied
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+        stop = len(indices)
+        if drop_remainder:
+            stop -= len(indices) % batch_size
+        for start in range(0, stop, batch_size):
+            batch = self.get_batch(indices[start : start + batch_size], features)
+            yield tuple(batch[name] for name in features)
+
+    def to_tf_dataset(
+        self,
+        batch_size,
+        features=None,
+        indices=None,
+        shuffle=True,
+        seed=None,
+        drop_remainder=False,
+    ) -> tf.data.Dataset:
+        features = self._check_features(features)
+        rng = np.random.default_rng(seed)
+
+        # A new permutation each time the dataset is iterated (i.e. per epoch)
+        def generator():
+            yield from self.batches(
+                batch_size=batch_size,
+                features=features,
+                indices=indices,
+                shuffle=shuffle,
+                seed=rng.integers(2**31 - 1) if shuffle else None,
+                drop_remainder=drop_remainder,
+            )
+
+        batch_dim = int(batch_size) if drop_remainder else None
+        signature = tuple(
+            tf.TensorSpec(
+                shape=(batch_dim, *self._padded_shapes[name]),
+                dtype=tf.as_dtype(self._dtypes[name]),
+            )
+            for name in features
+        )
+        dataset = tf.data.Dataset.from_generator(generator, output_signature=signature)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def _check_feature(self, feature) -> None:
+        if feature not in self._features:
+            raise ValueError(
+                f"`feature` should be selected in {self._features}, "
+                f"instead '{feature}' passed"
+            )
+
+    def _check_features(self, features) -> list:
+        if features is None:
+            return self._features
+        if isinstance(features, str):
+            features = [features]
+        for name in features:
+            self._check_feature(name)
+        return list(features)
+
+    @property
+    def data_dirs(self) -> list:
+        return self._data_dirs
+
+    @property
+    def features(self) -> list:
+        return self._features
+
+    @property
+    def num_events(self) -> int:
+        return len(self)
+
+    @property
+    def dtype(self):  # TODO: add Union[str, None]
+        return self._dtype
+
+    @property
+    def padding_value(self) -> float:
+        return self._padding_value
@@ -0,0 +1,6 @@
+from .InputStallMonitor import InputStallMonitor
+from .RaggedDataset import RaggedDataset
+from .makePipeline import makePipeline
+from .readTFRecords import readTFRecords
+from .writeRaggedDataset import writeRaggedDataset
+from .writeTFRecords import writeTFRecords
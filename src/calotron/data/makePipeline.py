@@ -0,0 +1,89 @@
+import tensorflow as tf
+
+from calotron.data.RaggedDataset import RaggedDataset
+
+SHUFFLE_BUFFER = 10_000
+
+
+def makePipeline(
+    data,
+    batch_size,
+    training=True,
+    shuffle_buffer=None,
+    cache_file=None,
+    map_fn=None,
+    deterministic=False,
+    seed=None,
+    drop_remainder=None,
+    features=None,
+    indices=None,
+    monitor=None,
+) -> tf.data.Dataset:
+    assert isinstance(batch_size, (int, float))
+    assert batch_size >= 1
+    batch_size = int(batch_size)
+    assert isinstance(training, bool)
+    assert isinstance(deterministic, bool)
+    if drop_remainder is None:
+        drop_remainder = training  # full batches only for the gradient steps
+    assert isinstance(drop_remainder, bool)
+
+    if isinstance(data, RaggedDataset):
+        # Events fully reshuffled per epoch through an index permutation, and
+        # read from memory-mapped files, so neither buffer nor cache applies
+        if shuffle_buffer is not None:
+            raise ValueError(
+                "`shuffle_buffer` can't be set for a `RaggedDataset`, "
+                "whose events are fully reshuffled at each epoch"
+            )
+        if cache_file is not None:
+            raise ValueError(
+                "`cache_file` can't be set for a `RaggedDataset`, "
+                "whose events are already read from memory-mapped files"
+            )
+        dataset = data.to_tf_dataset(
+            batch_size=batch_size,
+            features=features,
+            indices=indices,
+            shuffle=training,
+            seed=seed,
+            drop_remainder=drop_remainder,
+        )
+    else:
+        if isinstance(data, tf.data.Dataset):
+            dataset = data  # unbatched elements
+        else:
+            dataset = tf.data.Dataset.from_tensor_slices(data)
+
+        # Cached before shuffling, so that each epoch sees a new order
+        if cache_file is not None:
+            assert isinstance(cache_file, str)
+            dataset = dataset.cache(cache_file)  # "" caches in memory
+        if shuffle_buffer is None:
+            shuffle_buffer = SHUFFLE_BUFFER
+        if training and shuffle_buffer:
+            assert isinstance(shuffle_buffer, (int, float))
+            assert shuffle_buffer >= 1
+            dataset = dataset.shuffle(
+                int(shuffle_buffer), seed=seed, reshuffle_each_iteration=True
+            )
+        dataset = dataset.batch(
+            batch_size,
+            drop_remainder=drop_remainder,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=deterministic,
+        )
+
+    # Per-batch transformations (e.g. weighting and masking) run in parallel
+    if map_fn is not None:
+        dataset = dataset.map(
+            map_fn, num_parallel_calls=tf.data.AUTOTUNE, deterministic=deterministic
+        )
+
+    options = tf.data.Options()
+    options.deterministic = deterministic
+    dataset = dataset.with_options(options)
+    dataset = dataset.prefetch(tf.data.AUTOTUNE)
+    if monitor is not None:
+        dataset = monitor.instrument(dataset)
+    return dataset
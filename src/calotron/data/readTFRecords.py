@@ -0,0 +1,102 @@
+import json
+
+import tensorflow as tf
+
+from calotron.data.writeTFRecords import TFRECORD_FORMAT, TFRECORD_VERSION
+
+
+def readTFRecords(
+    data_dir,
+    batch_size,
+    features=None,
+    shuffle=True,
+    shuffle_buffer=1024,
+    seed=None,
+    deterministic=True,
+    num_parallel_calls=tf.data.AUTOTUNE,
+    cycle_length=None,
+    padding_value=0.0,
+    drop_remainder=False,
+    dtype=None,
+) -> tf.data.Dataset:
+    assert isinstance(data_dir, str)
+    with open(f"{data_dir}/schema.json") as file:
+        schema = json.load(file)
+    if (schema.get("format") != TFRECORD_FORMAT) or (
+        schema.get("version") != TFRECORD_VERSION
+    ):
+        raise ValueError(
+            f"`{data_dir}` doesn't contain a dataset in the "
+            f"'{TFRECORD_FORMAT}' format (version {TFRECORD_VERSION})"
+        )
+
+    # Features (a single name gives plain tensors, e.g. for the simulators)
+    if features is None:
+        features = list(schema["features"].keys())
+    single_feature = isinstance(features, str)
+    if single_feature:
+        features = [features]
+    assert isinstance(features, (list, tuple))
+    for name in features:
+        if name not in schema["features"]:
+            raise ValueError(
+                f"`features` should be selected in {list(schema['features'])}, "
+                f"instead '{name}' passed"
+            )
+
+    assert isinstance(batch_size, (int, float))
+    assert batch_size >= 1
+    batch_size = int(batch_size)
+    assert isinstance(shuffle_buffer, (int, float))
+    assert shuffle_buffer >= 1
+    shuffle_buffer = int(shuffle_buffer)
+    assert isinstance(deterministic, bool)
+    assert isinstance(padding_value, (int, float))
+
+    # Shards read in parallel, each one shuffled with a bounded buffer
+    fnames = [f"{data_dir}/{fname}" for fname in schema["shards"]]
+    dataset = tf.data.Dataset.from_tensor_slices(fnames)
+    if shuffle:
+        dataset = dataset.shuffle(len(fnames), seed=seed)
+
+    def read_shard(fname):
+        shard = tf.data.TFRecordDataset(
+            fname, compression_type=schema["compression"]
+        )
+        if shuffle:
+            shard = shard.shuffle(shuffle_buffer, seed=seed)
+        return shard
+
+    dataset = dataset.interleave(
+        read_shard,
+        cycle_length=cycle_length,
+        num_parallel_calls=num_parallel_calls,
+        deterministic=deterministic,
+    )
+
+    # Records parsed per batch and padded to the schema max lengths
+    spec = dict()
+    for name in features:
+        spec[f"{name}/values"] = tf.io.RaggedFeature(dtype=tf.float32)
+        spec[f"{name}/length"] = tf.io.FixedLenFeature([], dtype=tf.int64)
+
+    def parse_batch(serialized):
+        parsed = tf.io.parse_example(serialized, spec)
+        outputs = list()
+        for name in features:
+            inner_shape = schema["features"][name]["inner_shape"]
+            max_length = schema["features"][name]["max_length"]
+            values = parsed[f"{name}/values"].flat_values
+            values = tf.reshape(values, [-1, *inner_shape])
+            ragged = tf.RaggedTensor.from_row_lengths(values, parsed[f"{name}/length"])
+            padded = ragged.to_tensor(
+                default_value=padding_value, shape=[None, max_length, *inner_shape]
+            )
+            outputs.append(padded if dtype is None else tf.cast(padded, dtype=dtype))
+        return outputs[0] if single_feature else tuple(outputs)
+
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+    dataset = dataset.map(
+        parse_batch, num_parallel_calls=num_parallel_calls, deterministic=deterministic
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,44 @@
+import json
+import os
+
+import numpy as np
+
+RAGGED_FORMAT = "calotron-ragged"
+RAGGED_VERSION = 1
+
+
+def writeRaggedDataset(export_dir, padded, lengths, dtype=None) -> dict:
+    assert isinstance(export_dir, str)
+    assert isinstance(padded, dict) and len(padded) >= 1
+    assert isinstance(lengths, dict)
+    os.makedirs(export_dir, exist_ok=True)
+
+    num_events = None
+    schema = {"format": RAGGED_FORMAT, "version": RAGGED_VERSION, "features": {}}
+    for name, array in padded.items():
+        array = np.asarray(array) if dtype is None else np.asarray(array, dtype=dtype)
+        assert array.ndim >= 2
+        if num_events is None:
+            num_events = len(array)
+        assert len(array) == num_events
+        if name not in lengths:
+            raise ValueError(f"No lengths passed for the `{name}` feature")
+        feat_lengths = np.minimum(np.asarray(lengths[name]), array.shape[1])
+        assert len(feat_lengths) == num_events
+
+        # Non-padded entries stored contiguously, event boundaries as offsets
+        mask = np.arange(array.shape[1])[None, :] < feat_lengths[:, None]
+        offsets = np.r_[0, np.cumsum(feat_lengths)].astype(np.int64)
+        np.save(f"{export_dir}/{name}_values.npy", np.ascontiguousarray(array[mask]))
+        np.save(f"{export_dir}/{name}_offsets.npy", offsets)
+        schema["features"][name] = {
+            "dtype": array.dtype.name,
+            "inner_shape": [int(dim) for dim in array.shape[2:]],
+            "max_length": int(array.shape[1]),
+        }
+    schema["num_events"] = int(num_events)
+
+    # Schema written last, so its presence marks a complete shard
+    with open(f"{export_dir}/schema.json", "w") as file:
+        json.dump(schema, file, indent=2)
+    return schema
@@ -0,0 +1,101 @@
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+
+TFRECORD_FORMAT = "calotron-tfrecord"
+TFRECORD_VERSION = 1
+COMPRESSION_TYPES = ["GZIP", "ZLIB", ""]
+
+
+def writeTFRecords(
+    export_dir, padded, lengths, num_shards=8, compression="GZIP", prefix="events"
+) -> dict:
+    """Export padded events as sharded, compressed TFRecord files.
+
+    Events are serialized one `tf.train.Example` at a time in Python, which
+    costs tens of microseconds per event: fine for a one-off export, while
+    `writeRaggedDataset` is much faster to write and to read back.
+    """
+    assert isinstance(export_dir, str)
+    assert isinstance(padded, dict) and len(padded) >= 1
+    assert isinstance(lengths, dict)
+    assert isinstance(num_shards, (int, float))
+    assert num_shards >= 1
+    assert isinstance(compression, str)
+    if compression not in COMPRESSION_TYPES:
+        raise ValueError(
+            "`compression` should be selected "
+            f"in {COMPRESSION_TYPES}, instead "
+            f"'{compression}' passed"
+        )
+    assert isinstance(prefix, str)
+    os.makedirs(export_dir, exist_ok=True)
+
+    arrays = dict()
+    feat_lengths = dict()
+    schema = {
+        "format": TFRECORD_FORMAT,
+        "version": TFRECORD_VERSION,
+        "compression": compression,
+        "features": {},
+    }
+    for name, array in padded.items():
+        arrays[name] = np.asarray(array, dtype=np.float32)  # FloatList precision
+        assert arrays[name].ndim >= 2
+        assert len(arrays[name]) == len(arrays[next(iter(padded))])
+        if name not in lengths:
+            raise ValueError(f"No lengths passed for the `{name}` feature")
+        feat_lengths[name] = np.minimum(
+            np.asarray(lengths[name]), arrays[name].shape[1]
+        )
+        assert len(feat_lengths[name]) == len(arrays[name])
+        schema["features"][name] = {
+            "dtype": "float32",
+            "inner_shape": [int(dim) for dim in arrays[name].shape[2:]],
+            "max_length": int(arrays[name].shape[1]),
+        }
+    num_events = len(arrays[next(iter(padded))])
+    num_shards = max(min(int(num_shards), num_events), 1)
+
+    # Non-padded entries flattened at once, so that the per-event
+    # loop below only slices contiguous buffers
+    values, offsets = dict(), dict()
+    for name, array in arrays.items():
+        mask = np.arange(array.shape[1])[None, :] < feat_lengths[name][:, None]
+        values[name] = array[mask].reshape(-1)
+        inner_size = int(np.prod(array.shape[2:]))
+        offsets[name] = np.r_[0, np.cumsum(feat_lengths[name]) * inner_size]
+
+    # Contiguous blocks of events, one compressed file per shard
+    options = tf.io.TFRecordOptions(compression_type=compression)
+    shards, shard_sizes = list(), list()
+    for i, events in enumerate(np.array_split(np.arange(num_events), num_shards)):
+        fname = f"{prefix}-{i:05d}-of-{num_shards:05d}.tfrecord"
+        with tf.io.TFRecordWriter(f"{export_dir}/{fname}", options=options) as writer:
+            for evt in events:
+                feature = dict()
+                for name in arrays:
+                    length = int(feat_lengths[name][evt])
+                    start, stop = offsets[name][evt], offsets[name][evt + 1]
+                    feature[f"{name}/values"] = tf.train.Feature(
+                        float_list=tf.train.FloatList(value=values[name][start:stop])
+                    )
+                    feature[f"{name}/length"] = tf.train.Feature(
+                        int64_list=tf.train.Int64List(value=[length])
+                    )
+                example = tf.train.Example(
+                    features=tf.train.Features(feature=feature)
+                )
+                writer.write(example.SerializeToString())
+        shards.append(fname)
+        shard_sizes.append(int(len(events)))
+    schema["num_events"] = int(num_events)
+    schema["shards"] = shards
+    schema["shard_sizes"] = shard_sizes
+
+    # Schema written last, so its presence marks a complete export
+    with open(f"{export_dir}/schema.json", "w") as file:
+        json.dump(schema, file, indent=2)
+    return schema
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+
+from calotron.layers import AdminResidual
+from calotron.layers.Attention import BaseAttention
+from calotron.layers.MultilayerPerceptron import MultilayerPerceptron
+from calotron.models.discriminators import Discriminator
+from calotron.models.transformers import Transformer
+
+FINETUNING_COMPONENTS = ["adapters", "omegas", "output"]
+
+
+class FineTuner:
+    def __init__(
+        self, model, trainable_components=["adapters"], adapter_units=16
+    ) -> None:
+        # Model
+        if not isinstance(model, (Transformer, Discriminator)):
+            raise TypeError(
+                "`model` should be a calotron's `Transformer` or "
+                f"`Discriminator`, instead {type(model)} passed"
+            )
+        self._model = model
+
+        # Trainable components
+        if isinstance(trainable_components, str):
+            trainable_components = [trainable_components]
+        assert isinstance(trainable_components, (list, tuple))
+        assert len(trainable_components) >= 1
+        for component in trainable_components:
+            if component not in FINETUNING_COMPONENTS:
+                raise ValueError(
+                    "`trainable_components` should be selected "
+                    f"in {FINETUNING_COMPONENTS}, instead "
+                    f"'{component}' passed"
+                )
+        self._trainable_components = list(trainable_components)
+
+        # Adapter units
+        assert isinstance(adapter_units, (int, float))
+        assert adapter_units >= 1
+        self._adapter_units = int(adapter_units)
+
+        self._prepared = False
+
+    def warm_start(self, export_dir) -> None:
+        if not os.path.exists(export_dir):
+            raise ValueError(
+                f"The directory passed for the model ({export_dir}) doesn't exist"
+            )
+        if self._prepared:
+            raise RuntimeError("`warm_start()` should be called before `prepare()`")
+
+        # Variables of a SavedModel are stored as a TensorFlow checkpoint
+        if os.path.isdir(export_dir):
+            filepath = os.path.join(export_dir, "variables", "variables")
+        else:
+            filepath = export_dir
+        status = self._model.load_weights(filepath)
+        if status is not None:
+            status.expect_partial()  # optimizer slots and traces skipped
+
+    def prepare(self):  # TODO: add Union[Transformer, Discriminator]
+        if self._prepared:
+            return self._model
+
+        # Layers owning variables frozen (containers left trainable,
+        # otherwise their sublayers could not be re-enabled)
+        for layer in self._model._flatten_layers(include_self=False):
+            if layer._trainable_weights or isinstance(layer, AdminResidual):
+                layer.trainable = False
+
+        if "adapters" in self._trainable_components:
+            for layer in self._model._flatten_layers(include_self=False):
+                if isinstance(layer, (BaseAttention, MultilayerPerceptron)):
+                    layer.add_adapter(adapter_units=self._adapter_units)
+
+        if "omegas" in self._trainable_components:
+            for layer in self._model._flatten_layers(include_self=False):
+                if isinstance(layer, AdminResidual):
+                    # Omegas fixed by "O(n)" scale released in place
+                    layer._omega_trainable = True
+                    layer.trainable = True
+
+        if "output" in self._trainable_components:
+            for layer_name in ["_output_layer", "_seq"]:
+                layer = getattr(self._model, layer_name, None)
+                if layer is not None:
+                    layer.trainable = True
+
+        self._prepared = True
+        return self._model
+
+    @property
+    def model(self):  # TODO: add Union[Transformer, Discriminator]
+        return self._model
+
+    @property
+    def trainable_components(self) -> list:
+        return self._trainable_components
+
+    @property
+    def adapter_units(self) -> int:
+        return self._adapter_units
+
+    @property
+    def num_trainable_params(self) -> int:
+        return int(
+            np.sum([np.prod(var.shape) for var in self._model.trainable_variables])
+        )
@@ -0,0 +1 @@
+from .FineTuner import FineTuner
@@ -0,0 +1,56 @@
+import tensorflow as tf
+from tensorflow import keras
+
+
+class Adapter(keras.layers.Layer):
+    def __init__(self, embed_dim, adapter_units=16, name=None, dtype=None) -> None:
+        super().__init__(name=name, dtype=dtype)
+
+        # Embedding dimension
+        assert isinstance(embed_dim, (int, float))
+        assert embed_dim >= 1
+        self._embed_dim = int(embed_dim)
+
+        # Adapter (bottleneck) units
+        assert isinstance(adapter_units, (int, float))
+        assert adapter_units >= 1
+        self._adapter_units = int(adapter_units)
+
+        self._down = keras.layers.Dense(
+            units=self._adapter_units,
+            activation="relu",
+            kernel_initializer="he_normal",
+            bias_initializer="zeros",
+            name=f"{name}_down" if name else None,
+            dtype=self.dtype_policy,
+        )
+        # Zero-initialized up-projection (the adapter starts as identity)
+        self._up = keras.layers.Dense(
+            units=self._embed_dim,
+            activation=None,
+            kernel_initializer="zeros",
+            bias_initializer="zeros",
+            name=f"{name}_up" if name else None,
+            dtype=self.dtype_policy,
+        )
+        self._add = keras.layers.Add(
+            name=f"{name}_add" if name else None, dtype=self.dtype_policy
+        )
+
+    def build(self, input_shape) -> None:
+        input_shape = tf.TensorShape(input_shape)
+        self._down.build(input_shape)
+        self._up.build(input_shape[:-1].concatenate([self._adapter_units]))
+        super().build(input_shape)
+
+    def call(self, x) -> tf.Tensor:
+        out = self._add([x, self._up(self._down(x))])
+        return out
+
+    @property
+    def embed_dim(self) -> int:
+        return self._embed_dim
+
+    @property
+    def adapter_units(self) -> int:
+        return self._adapter_units
@@ -37,10 +37,15 @@ class AdminResidual(keras.layers.Layer):
             )
         self._output_change_scale = output_change_scale
 
-        self._omega = self._compute_init_value()
-        self._add = keras.layers.Add(name="admin_add" if name else None)
+        # Omegas fixed by the "O(n)" scale are still trainable variables,
+        # only excluded from the trainable weights (see `omega_trainable`),
+        # so that fine-tuning can release them without changing the layout
+        self._omega, self._omega_trainable = self._compute_init_value()
+        self._add = keras.layers.Add(
+            name="admin_add" if name else None, dtype=self.dtype_policy
+        )
 
-    def _compute_init_value(self) -> tf.Variable:
+    def _compute_init_value(self) -> tuple:
         if self._output_change_scale == "O(n)":
             omega_value = 1.0
             trainable = False
@@ -53,14 +58,38 @@ class AdminResidual(keras.layers.Layer):
             omega_value = self._num_res_layers
             trainable = True
         omega = tf.ones(shape=(self._embed_dim)) * omega_value**0.5
-        return tf.Variable(omega, trainable=trainable, dtype=self.dtype)
+        return tf.Variable(omega, trainable=True, dtype=self.dtype), trainable
 
     def call(self, inputs) -> tf.Tensor:
         x, f_x = inputs
-        x *= tf.tile(self._omega[None, None, :], (tf.shape(x)[0], tf.shape(x)[1], 1))
+        omega = tf.cast(self._omega, dtype=x.dtype)
+        x *= tf.tile(omega[None, None, :], (tf.shape(x)[0], tf.shape(x)[1], 1))
         out = self._add([x, f_x])
         return out
 
+    def skip(self, x) -> tf.Tensor:
+        # Output of a block whose residual branch is dropped (f(x) = 0)
+        omega = tf.cast(self._omega, dtype=x.dtype)
+        return x * omega[None, None, :]
+
+    @property
+    def trainable_weights(self) -> list:
+        weights = super().trainable_weights
+        if self._omega_trainable:
+            return weights
+        return [w for w in weights if w is not self._omega]
+
+    @property
+    def non_trainable_weights(self) -> list:
+        weights = super().non_trainable_weights
+        if self.trainable and not self._omega_trainable:
+            return [self._omega] + weights
+        return weights
+
+    @property
+    def omega_trainable(self) -> bool:
+        return self._omega_trainable
+
     @property
     def embed_dim(self) -> int:
         return self._embed_dim
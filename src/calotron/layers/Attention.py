@@ -1,6 +1,7 @@
 import tensorflow as tf
 from tensorflow import keras
 
+from calotron.layers.Adapter import Adapter
 from calotron.layers.AdminResidual import AdminResidual
 
 LN_EPSILON = 0.001
@@ -49,21 +50,36 @@ class BaseAttention(keras.layers.Layer):
             kernel_initializer="he_normal",
             bias_initializer="zeros",
             name=f"{prefix}_mha_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
         self._res = AdminResidual(
             embed_dim=embed_dim,
             num_res_layers=num_res_layers,
             output_change_scale=admin_res_scale,
             name=f"{prefix}_res_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
         self._ln = keras.layers.LayerNormalization(
             axis=-1,
             epsilon=LN_EPSILON,
             name=f"{prefix}_ln_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
+        self._prefix, self._suffix = prefix, suffix
+        self._adapter = None
+
+    def add_adapter(self, adapter_units=16) -> None:
+        self._adapter = Adapter(
+            embed_dim=self.embed_dim,
+            adapter_units=adapter_units,
+            name=f"{self._prefix}_adapter_{self._suffix}" if self._prefix else None,
+            dtype=self.dtype_policy,
+        )
+        # Variables created now, outside any traced or recomputed call
+        self._adapter.build((None, None, self.embed_dim))
+
+    def skip(self, x) -> tf.Tensor:
+        return self._ln(self._res.skip(x))
 
     @property
     def num_heads(self) -> int:
@@ -89,6 +105,12 @@ class BaseAttention(keras.layers.Layer):
     def dropout_rate(self) -> float:
         return self._dropout_rate
 
+    @property
+    def adapter_units(self):  # TODO: add Union[int, None]
+        if self._adapter is not None:
+            return self._adapter.adapter_units
+        return None
+
 
 class CrossAttention(BaseAttention):
     def call(self, x, condition, attention_mask=None) -> tf.Tensor:
@@ -100,6 +122,8 @@ class CrossAttention(BaseAttention):
             return_attention_scores=True,
         )
         self._attn_scores = scores
+        if self._adapter is not None:
+            f_x = self._adapter(f_x)
         res = self._res([x, f_x])
         out = self._ln(res)
         return out
@@ -114,6 +138,8 @@ class SelfAttention(BaseAttention):
             attention_mask=attention_mask,
             use_causal_mask=use_causal_mask,
         )
+        if self._adapter is not None:
+            f_x = self._adapter(f_x)
         res = self._res([x, f_x])
         out = self._ln(res)
         return out
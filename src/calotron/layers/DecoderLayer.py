@@ -37,7 +37,7 @@ class DecoderLayer(keras.layers.Layer):
             admin_res_scale=admin_res_scale,
             dropout_rate=dropout_rate,
             name=f"{prefix}_self_attn_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Multi-head cross-attention
@@ -49,7 +49,7 @@ class DecoderLayer(keras.layers.Layer):
             admin_res_scale=admin_res_scale,
             dropout_rate=dropout_rate,
             name=f"{prefix}_cross_attn_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Multilayer perceptron
@@ -60,20 +60,25 @@ class DecoderLayer(keras.layers.Layer):
             admin_res_scale=admin_res_scale,
             dropout_rate=dropout_rate,
             name=f"{prefix}_mlp_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
     def call(
-        self, x, condition, self_attn_mask=None, cross_attn_mask=None
+        self, x, condition, self_attn_mask=None, cross_attn_mask=None, recompute=False
     ) -> tf.Tensor:
         f_x = self._self_attn(
             x, attention_mask=self_attn_mask, use_causal_mask=self._autoregressive_mode
         )
         f_x = self._cross_attn(f_x, condition, attention_mask=cross_attn_mask)
         self._attn_scores = self._cross_attn._attn_scores
-        out = self._mlp(f_x)
+        out = self._mlp(f_x, recompute=recompute)
         return out
 
+    def skip(self, x, condition) -> tf.Tensor:
+        # Residual path only, used when the layer is dropped
+        out = self._cross_attn.skip(self._self_attn.skip(x))
+        return self._mlp.skip(out)
+
     @property
     def output_depth(self) -> int:
         return self._mlp.output_units
@@ -34,7 +34,7 @@ class EncoderLayer(keras.layers.Layer):
             admin_res_scale=admin_res_scale,
             dropout_rate=dropout_rate,
             name=f"{prefix}_self_attn_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Multilayer perceptron
@@ -45,14 +45,18 @@ class EncoderLayer(keras.layers.Layer):
             admin_res_scale=admin_res_scale,
             dropout_rate=dropout_rate,
             name=f"{prefix}_mlp_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
-    def call(self, x, self_attn_mask=None) -> tf.Tensor:
+    def call(self, x, self_attn_mask=None, recompute=False) -> tf.Tensor:
         f_x = self._self_attn(x, attention_mask=self_attn_mask, use_causal_mask=False)
-        out = self._mlp(f_x)
+        out = self._mlp(f_x, recompute=recompute)
         return out
 
+    def skip(self, x) -> tf.Tensor:
+        # Residual path only, used when the layer is dropped
+        return self._mlp.skip(self._self_attn.skip(x))
+
     @property
     def output_depth(self) -> int:
         return self._mlp.output_units
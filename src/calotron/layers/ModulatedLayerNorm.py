@@ -7,24 +7,29 @@ class ModulatedLayerNorm(keras.layers.Layer):
         super().__init__(name=name, dtype=dtype)
 
         # Standard LayerNormalization
-        self._ln = keras.layers.LayerNormalization(axis=axis, epsilon=epsilon)
+        self._ln = keras.layers.LayerNormalization(
+            axis=axis, epsilon=epsilon, dtype=self.dtype_policy
+        )
 
         # Affine transformation parameters
         self._gamma = tf.Variable(
-            tf.random.normal(shape=(), mean=0.0, stddev=1.0),
+            tf.random.normal(shape=(), mean=0.0, stddev=1.0, dtype=self.dtype),
             trainable=True,
             dtype=self.dtype,
         )
         self._beta = tf.Variable(
-            tf.random.normal(shape=(), mean=0.0, stddev=1.0),
+            tf.random.normal(shape=(), mean=0.0, stddev=1.0, dtype=self.dtype),
             trainable=True,
             dtype=self.dtype,
         )
 
     def call(self, x, w) -> tf.Tensor:
         out = self._ln(x)
+        w = tf.cast(w, dtype=out.dtype)
         w = tf.tile(w[:, None, :], (1, tf.shape(x)[1], 1))
-        return (self._gamma * w + 1.0) * out + self._beta * w
+        gamma = tf.cast(self._gamma, dtype=out.dtype)
+        beta = tf.cast(self._beta, dtype=out.dtype)
+        return (gamma * w + 1.0) * out + beta * w
 
     @property
     def axis(self) -> int:
@@ -1,6 +1,7 @@
 import tensorflow as tf
 from tensorflow import keras
 
+from calotron.layers.Adapter import Adapter
 from calotron.layers.AdminResidual import AdminResidual
 
 LN_EPSILON = 0.001
@@ -48,7 +49,7 @@ class MultilayerPerceptron(keras.layers.Layer):
                     kernel_initializer="he_normal",
                     bias_initializer="zeros",
                     name=f"{prefix}_dense_in_{suffix}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dense(
                     units=self._output_units,
@@ -56,12 +57,12 @@ class MultilayerPerceptron(keras.layers.Layer):
                     kernel_initializer="he_normal",
                     bias_initializer="zeros",
                     name=f"{prefix}_dense_out_{suffix}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dropout(
                     rate=self._dropout_rate,
                     name=f"{prefix}_dropout_{suffix}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
             ],
             name=f"{prefix}_seq_{suffix}" if name else None,
@@ -71,21 +72,49 @@ class MultilayerPerceptron(keras.layers.Layer):
             num_res_layers=num_res_layers,
             output_change_scale=admin_res_scale,
             name=f"{prefix}_res_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
         self._ln = keras.layers.LayerNormalization(
             axis=-1,
             epsilon=LN_EPSILON,
             name=f"{prefix}_ln_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
+        self._prefix, self._suffix = prefix, suffix
+        self._adapter = None
 
-    def call(self, x) -> tf.Tensor:
-        f_x = self._seq(x)
+    def add_adapter(self, adapter_units=16) -> None:
+        self._adapter = Adapter(
+            embed_dim=self._output_units,
+            adapter_units=adapter_units,
+            name=f"{self._prefix}_adapter_{self._suffix}" if self._prefix else None,
+            dtype=self.dtype_policy,
+        )
+        # Variables created now, outside any traced or recomputed call
+        self._adapter.build((None, None, self._output_units))
+
+    def call(self, x, recompute=False) -> tf.Tensor:
+        if recompute:
+            # Hidden activations recomputed in the backward pass, dropout
+            # applied outside to keep the mask sampled in the forward pass
+            f_x = tf.recompute_grad(self._dense_block)(x)
+            f_x = self._seq.layers[-1](f_x)
+        else:
+            f_x = self._seq(x)
+        if self._adapter is not None:
+            f_x = self._adapter(f_x)
         res = self._res([x, f_x])
         out = self._ln(res)
         return out
 
+    def _dense_block(self, x) -> tf.Tensor:
+        for layer in self._seq.layers[:-1]:
+            x = layer(x)
+        return x
+
+    def skip(self, x) -> tf.Tensor:
+        return self._ln(self._res.skip(x))
+
     @property
     def output_units(self) -> int:
         return self._output_units
@@ -105,3 +134,9 @@ class MultilayerPerceptron(keras.layers.Layer):
     @property
     def dropout_rate(self) -> float:
         return self._dropout_rate
+
+    @property
+    def adapter_units(self):  # TODO: add Union[int, None]
+        if self._adapter is not None:
+            return self._adapter.adapter_units
+        return None
@@ -42,7 +42,7 @@ class SeqOrderEmbedding(keras.layers.Layer):
             length=self._max_length,
             depth=self._latent_dim,
             normalization=self._normalization,
-            dtype=self.dtype,
+            dtype=self.compute_dtype,
         )
 
         # Embedding layer
@@ -54,24 +54,28 @@ class SeqOrderEmbedding(keras.layers.Layer):
                     kernel_initializer="he_uniform",
                     bias_initializer="zeros",
                     name=f"{prefix}_seq_ord_dense" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dropout(
                     rate=self._dropout_rate,
                     name=f"{prefix}_dropout" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
             ]
         )
 
         # Add layer
-        self._add = keras.layers.Add()
+        self._add = keras.layers.Add(dtype=self.dtype_policy)
 
-    def call(self, x) -> tf.Tensor:
-        seq_order = tf.tile(
-            self._seq_ord_encoding[None, : tf.shape(x)[1], :],
-            multiples=(tf.shape(x)[0], 1, 1),
-        )
+    def call(self, x, positions=None) -> tf.Tensor:
+        if positions is not None:
+            # Original positions of the tokens surviving a pruning
+            seq_order = tf.gather(self._seq_ord_encoding, positions)
+        else:
+            seq_order = tf.tile(
+                self._seq_ord_encoding[None, : tf.shape(x)[1], :],
+                multiples=(tf.shape(x)[0], 1, 1),
+            )
         emb_output = self._embedding(x)
         output = self._add([emb_output, seq_order])
         return output
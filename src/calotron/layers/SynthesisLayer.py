@@ -53,12 +53,12 @@ class SynthesisLayer(keras.layers.Layer):
             axis=-1,
             epsilon=LN_EPSILON,
             name=f"{prefix}_ln_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Addition layer
         self._res = keras.layers.Add(
-            name=f"{prefix}_res_{suffix}" if name else None, dtype=self.dtype
+            name=f"{prefix}_res_{suffix}" if name else None, dtype=self.dtype_policy
         )
 
         # Multi-head self-attention
@@ -70,7 +70,7 @@ class SynthesisLayer(keras.layers.Layer):
             kernel_initializer="he_normal",
             bias_initializer="zeros",
             name=f"{prefix}_self_attn_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Multi-head cross-attention
@@ -82,7 +82,7 @@ class SynthesisLayer(keras.layers.Layer):
             kernel_initializer="he_normal",
             bias_initializer="zeros",
             name=f"{prefix}_cross_attn_{suffix}" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Multilayer perceptron layers
@@ -93,21 +93,21 @@ class SynthesisLayer(keras.layers.Layer):
                     activation="relu",
                     kernel_initializer="he_normal",
                     bias_initializer="zeros",
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dense(
                     units=self._output_depth,
                     activation=None,
                     kernel_initializer="he_normal",
                     bias_initializer="zeros",
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
-                keras.layers.Dropout(rate=self._dropout_rate, dtype=self.dtype),
+                keras.layers.Dropout(rate=self._dropout_rate, dtype=self.dtype_policy),
             ],
             name=f"{prefix}_mlp_{suffix}" if name else None,
         )
 
-    def call(self, x, w, condition) -> tf.Tensor:
+    def call(self, x, w, condition, recompute=False) -> tf.Tensor:
         # Self attn block
         norm_x = self._ln(x, w)
         f_x = self._self_attn(
@@ -129,10 +129,25 @@ class SynthesisLayer(keras.layers.Layer):
 
         # MLP block
         norm_x = self._ln(x, w)
-        f_x = self._mlp(norm_x)
+        if recompute:
+            # Hidden activations recomputed in the backward pass, dropout
+            # applied outside to keep the mask sampled in the forward pass
+            f_x = tf.recompute_grad(self._dense_block)(norm_x)
+            f_x = self._mlp.layers[-1](f_x)
+        else:
+            f_x = self._mlp(norm_x)
         x = self._res([x, f_x])
         return x
 
+    def _dense_block(self, x) -> tf.Tensor:
+        for layer in self._mlp.layers[:-1]:
+            x = layer(x)
+        return x
+
+    def skip(self, x, w, condition) -> tf.Tensor:
+        # Plain residual connections, so the dropped layer is the identity
+        return tf.identity(x)
+
     @property
     def output_depth(self) -> int:
         return self._output_depth
@@ -1,3 +1,4 @@
+from .Adapter import Adapter
 from .AdminResidual import AdminResidual
 from .Attention import CrossAttention, SelfAttention
 from .DecoderLayer import DecoderLayer
@@ -3,6 +3,7 @@ import tensorflow as tf
 from calotron.losses.BaseLoss import BaseLoss
 from calotron.losses.BinaryCrossentropy import BinaryCrossentropy
 from calotron.losses.WassersteinDistance import WassersteinDistance
+from calotron.utils.training import replicaSum
 
 ADV_METRICS = ["binary-crossentropy", "wasserstein-distance"]
 
@@ -70,6 +71,7 @@ class AdvLoss(BaseLoss):
         target,
         sample_weight=None,
         training=True,
+        adversarial=True,
     ) -> tf.Tensor:
         raise NotImplementedError(
             "Only `AdvLoss` subclasses have the "
@@ -78,8 +80,11 @@ class AdvLoss(BaseLoss):
 
     @staticmethod
     def _compute_mixed_loss(main_loss, adv_loss, alpha=0.5) -> tf.Tensor:
-        main_scale = tf.math.round(tf.math.log(tf.abs(main_loss)) / tf.math.log(10.0))
-        adv_scale = tf.math.round(tf.math.log(tf.abs(adv_loss)) / tf.math.log(10.0))
+        # Scales computed from global losses to be equal across replicas
+        main_global = replicaSum(tf.stop_gradient(main_loss))
+        adv_global = replicaSum(tf.stop_gradient(adv_loss))
+        main_scale = tf.math.round(tf.math.log(tf.abs(main_global)) / tf.math.log(10.0))
+        adv_scale = tf.math.round(tf.math.log(tf.abs(adv_global)) / tf.math.log(10.0))
         scale = tf.stop_gradient(10 ** (main_scale - adv_scale))
         tot_loss = (1 - alpha) * main_loss + alpha * scale * adv_loss
         return tot_loss
@@ -92,6 +97,7 @@ class AdvLoss(BaseLoss):
         target,
         sample_weight=None,
         training=True,
+        transformer_output=None,
     ) -> tf.Tensor:
         adv_loss = self._adv_loss.discriminator_loss(
             transformer=transformer,
@@ -100,9 +106,13 @@ class AdvLoss(BaseLoss):
             target=target,
             sample_weight=sample_weight,
             training=training,
+            transformer_output=transformer_output,
         )
         return adv_loss
 
+    def on_discriminator_update(self) -> None:
+        self._adv_loss.on_discriminator_update()
+
     @property
     def alpha(self) -> float:
         return self._alpha
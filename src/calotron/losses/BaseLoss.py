@@ -1,5 +1,7 @@
 import tensorflow as tf
 
+from calotron.utils.training import replicaSum
+
 
 class BaseLoss:
     def __init__(self, name="loss") -> None:
@@ -15,23 +17,50 @@ class BaseLoss:
         warmup_energy=0.0,
         inj_noise_std=0.0,
         sample_weight=None,
+        transformer_output=None,
+        source_memory=None,
+        source_shuffle=False,
         training_transformer=False,
         training_discriminator=False,
         return_transformer_output=False,
     ) -> tuple:
-        output = transformer((source, target), training=training_transformer)
+        if transformer_output is None:
+            output = transformer((source, target), training=training_transformer)
+        else:
+            output = transformer_output  # e.g. generated once for many updates
+        output = tf.cast(output, dtype=target.dtype)
 
         if sample_weight is None:
-            sample_weight = tf.ones(shape=tf.shape(target)[:2])
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
         mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
         evt_weights = tf.reduce_mean(sample_weight, axis=-1)
 
         energy_mask = tf.cast(target[:, :, 2] >= warmup_energy, dtype=target.dtype)
         mask *= energy_mask
 
+        # Source encoded once and shared by all the populations
+        if source_memory is None:
+            source_memory = discriminator.encode_source(
+                source, training=training_discriminator
+            )
+
         source_concat = tf.concat([source, source], axis=0)
         target_concat = tf.concat([target, output], axis=0)
         mask_concat = tf.concat([mask, mask], axis=0)
+        if source_memory is not None:
+            memory_concat = tf.concat([source_memory, source_memory], axis=0)
+        else:
+            memory_concat = None
+        if source_shuffle:
+            # Real targets paired with mismatched conditions
+            perm = tf.random.shuffle(tf.range(tf.shape(source)[0]))
+            source_concat = tf.concat([source_concat, tf.gather(source, perm)], 0)
+            target_concat = tf.concat([target_concat, target], axis=0)
+            mask_concat = tf.concat([mask_concat, mask], axis=0)
+            if memory_concat is not None:
+                memory_concat = tf.concat(
+                    [memory_concat, tf.gather(source_memory, perm)], axis=0
+                )
 
         if inj_noise_std > 0.0:
             rnd_noise = tf.random.normal(
@@ -50,14 +79,25 @@ class BaseLoss:
                 ),
             ),
             padding_mask=mask_concat,
+            source_memory=memory_concat,
             training=training_discriminator,
         )
-        y_true, y_pred = tf.split(d_out, 2, axis=0)
+        d_out = tf.cast(d_out, dtype=target.dtype)
+        y_out = tf.split(d_out, 3 if source_shuffle else 2, axis=0)
 
         if return_transformer_output:
-            return y_true, y_pred, evt_weights, mask, output
+            return (*y_out, evt_weights, mask, output)
         else:
-            return y_true, y_pred, evt_weights, mask
+            return (*y_out, evt_weights, mask)
+
+    def _weighted_mean(self, values, weights=None, norm=None) -> tf.Tensor:
+        if weights is None:
+            weights = tf.ones_like(values)
+        # Normalization over the global batch, since the gradients
+        # computed by each replica are summed before being applied
+        if norm is None:
+            norm = replicaSum(tf.stop_gradient(tf.reduce_sum(weights)))
+        return tf.reduce_sum(weights * values) / norm
 
     def transformer_loss(
         self,
@@ -81,12 +121,18 @@ class BaseLoss:
         target,
         sample_weight=None,
         training=True,
+        transformer_output=None,
     ) -> tf.Tensor:
         raise NotImplementedError(
             "Only `BaseLoss` subclasses have the "
             "`discriminator_loss()` method implemented."
         )
 
+    def on_discriminator_update(self) -> None:
+        # Called once per discriminator optimizer step, after the
+        # (possibly accumulated) gradients are applied
+        pass
+
     @property
     def name(self) -> str:
         return self._name
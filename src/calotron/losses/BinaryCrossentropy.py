@@ -65,7 +65,7 @@ class BinaryCrossentropy(BaseLoss):
 
         # Adversarial loss
         adv_loss = self._loss(tf.ones_like(y_pred), y_pred)
-        adv_loss = tf.reduce_sum(evt_weights * adv_loss) / tf.reduce_sum(evt_weights)
+        adv_loss = self._weighted_mean(adv_loss, evt_weights)
         return adv_loss
 
     def discriminator_loss(
@@ -76,8 +76,9 @@ class BinaryCrossentropy(BaseLoss):
         target,
         sample_weight=None,
         training=True,
+        transformer_output=None,
     ) -> tf.Tensor:
-        y_true, y_pred, evt_weights, mask = self._perform_classification(
+        y_out = self._perform_classification(
             source=source,
             target=target,
             transformer=transformer,
@@ -85,28 +86,29 @@ class BinaryCrossentropy(BaseLoss):
             warmup_energy=self._warmup_energy,
             inj_noise_std=self._inj_noise_std,
             sample_weight=sample_weight,
-            training_transformer=training,
-            training_discriminator=False,
+            transformer_output=transformer_output,
+            source_shuffle=discriminator.condition_aware,
+            training_transformer=False,
+            training_discriminator=training,
             return_transformer_output=False,
         )
+        y_true, y_pred = y_out[:2]
+        evt_weights = y_out[-2]
 
         # Real target loss
         real_loss = self._loss(tf.ones_like(y_true), y_true)
-        real_loss = tf.reduce_sum(evt_weights * real_loss) / tf.reduce_sum(evt_weights)
+        real_loss = self._weighted_mean(real_loss, evt_weights)
 
         # Fake target loss
         fake_loss = self._loss(tf.zeros_like(y_pred), y_pred)
-        fake_loss = tf.reduce_sum(evt_weights * fake_loss) / tf.reduce_sum(evt_weights)
+        fake_loss = self._weighted_mean(fake_loss, evt_weights)
 
         if discriminator.condition_aware:
-            source_shuffle = tf.random.shuffle(source)
-            y_pred = discriminator(
-                (source_shuffle, target), padding_mask=mask, training=training
-            )
+            y_source = y_out[2]
 
             # Fake source loss
-            source_loss = self._loss(tf.zeros_like(y_pred), y_pred)
-            source_loss = tf.reduce_mean(source_loss)
+            source_loss = self._loss(tf.zeros_like(y_source), y_source)
+            source_loss = self._weighted_mean(source_loss)
 
             return (real_loss + fake_loss + source_loss) / 3.0
         else:
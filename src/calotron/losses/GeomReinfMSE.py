@@ -44,11 +44,12 @@ class GeomReinfMSE(MSE):
         target,
         sample_weight=None,
         training=True,
+        adversarial=True,
     ) -> tf.Tensor:
         output = transformer((source, target), training=training)
 
         if sample_weight is None:
-            sample_weight = tf.ones(shape=tf.shape(target)[:2])
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
         mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
 
         energy_mask = tf.cast(
@@ -66,16 +67,18 @@ class GeomReinfMSE(MSE):
         # Geometric loss
         num_target_points = tf.reduce_sum(mask, axis=-1)
         num_geom_matches = tf.reduce_sum(geom_matches, axis=-1)
-        geom_loss = tf.reduce_mean(
+        geom_loss = self._weighted_mean(
             tf.abs(num_target_points - num_geom_matches) / num_target_points
         )
 
         # MSE loss
         mse_loss = self._mse_loss(target, output)
         mse_loss *= mask
-        mse_loss = tf.reduce_sum(sample_weight * mse_loss) / tf.reduce_sum(
-            sample_weight
-        )
+        mse_loss = self._weighted_mean(mse_loss, sample_weight)
+
+        # Reconstruction-only loss (discriminator not evaluated)
+        if not adversarial:
+            return geom_loss + mse_loss
 
         # Adversarial loss
         adv_loss = self._adv_loss.transformer_loss(
@@ -50,11 +50,12 @@ class Huber(AdvLoss):
         target,
         sample_weight=None,
         training=True,
+        adversarial=True,
     ) -> tf.Tensor:
         output = transformer((source, target), training=training)
 
         if sample_weight is None:
-            sample_weight = tf.ones(shape=tf.shape(target)[:2])
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
         mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
 
         energy_mask = tf.cast(
@@ -65,9 +66,11 @@ class Huber(AdvLoss):
         # Huber loss
         huber_loss = self._huber_loss(target, output)
         huber_loss *= mask
-        huber_loss = tf.reduce_sum(sample_weight * huber_loss) / tf.reduce_sum(
-            sample_weight
-        )
+        huber_loss = self._weighted_mean(huber_loss, sample_weight)
+
+        # Reconstruction-only loss (discriminator not evaluated)
+        if not adversarial:
+            return huber_loss
 
         # Adversarial loss
         adv_loss = self._adv_loss.transformer_loss(
@@ -51,6 +51,7 @@ class JSDivergence(BaseLoss):
         target,
         sample_weight=None,
         training=True,
+        transformer_output=None,
     ) -> tf.Tensor:
         y_true, y_pred, evt_weights, _ = self._perform_classification(
             source=source,
@@ -60,6 +61,7 @@ class JSDivergence(BaseLoss):
             warmup_energy=self._warmup_energy,
             inj_noise_std=0.0,
             sample_weight=sample_weight,
+            transformer_output=transformer_output,
             training_transformer=False,
             training_discriminator=training,
             return_transformer_output=False,
@@ -73,12 +75,7 @@ class JSDivergence(BaseLoss):
         js_loss = 0.5 * (
             self._kl_div(y_true, y_interp) + self._kl_div(y_pred, y_interp)
         )
-        if sample_weight is not None:
-            js_loss = tf.reduce_sum(sample_weight * js_loss) / tf.reduce_sum(
-                sample_weight
-            )
-        else:
-            js_loss = tf.reduce_mean(js_loss)
+        js_loss = self._weighted_mean(js_loss, sample_weight)
         return js_loss
 
     @property
@@ -39,7 +39,7 @@ class KLDivergence(BaseLoss):
         )
 
         kl_loss = self._loss(y_true, y_pred)
-        kl_loss = tf.reduce_sum(evt_weights * kl_loss) / tf.reduce_sum(evt_weights)
+        kl_loss = self._weighted_mean(kl_loss, evt_weights)
         return kl_loss  # divergence minimization
 
     def discriminator_loss(
@@ -50,6 +50,7 @@ class KLDivergence(BaseLoss):
         target,
         sample_weight=None,
         training=True,
+        transformer_output=None,
     ) -> tf.Tensor:
         y_true, y_pred, evt_weights, _ = self._perform_classification(
             source=source,
@@ -59,13 +60,14 @@ class KLDivergence(BaseLoss):
             warmup_energy=self._warmup_energy,
             inj_noise_std=0.0,
             sample_weight=sample_weight,
+            transformer_output=transformer_output,
             training_transformer=False,
             training_discriminator=training,
             return_transformer_output=False,
         )
 
         kl_loss = self._loss(y_true, y_pred)
-        kl_loss = tf.reduce_sum(evt_weights * kl_loss) / tf.reduce_sum(evt_weights)
+        kl_loss = self._weighted_mean(kl_loss, evt_weights)
         return -kl_loss  # divergence maximization
 
     @property
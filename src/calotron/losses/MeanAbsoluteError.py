@@ -44,11 +44,12 @@ class MeanAbsoluteError(AdvLoss):
         target,
         sample_weight=None,
         training=True,
+        adversarial=True,
     ) -> tf.Tensor:
         output = transformer((source, target), training=training)
 
         if sample_weight is None:
-            sample_weight = tf.ones(shape=tf.shape(target)[:2])
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
         mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
 
         energy_mask = tf.cast(
@@ -59,9 +60,11 @@ class MeanAbsoluteError(AdvLoss):
         # MAE loss
         mae_loss = self._mae_loss(target, output)
         mae_loss *= mask
-        mae_loss = tf.reduce_sum(sample_weight * mae_loss) / tf.reduce_sum(
-            sample_weight
-        )
+        mae_loss = self._weighted_mean(mae_loss, sample_weight)
+
+        # Reconstruction-only loss (discriminator not evaluated)
+        if not adversarial:
+            return mae_loss
 
         # Adversarial loss
         adv_loss = self._adv_loss.transformer_loss(
@@ -44,11 +44,12 @@ class MeanSquaredError(AdvLoss):
         target,
         sample_weight=None,
         training=True,
+        adversarial=True,
     ) -> tf.Tensor:
         output = transformer((source, target), training=training)
 
         if sample_weight is None:
-            sample_weight = tf.ones(shape=tf.shape(target)[:2])
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
         mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
 
         energy_mask = tf.cast(
@@ -59,9 +60,11 @@ class MeanSquaredError(AdvLoss):
         # MSE loss
         mse_loss = self._mse_loss(target, output)
         mse_loss *= mask
-        mse_loss = tf.reduce_sum(sample_weight * mse_loss) / tf.reduce_sum(
-            sample_weight
-        )
+        mse_loss = self._weighted_mean(mse_loss, sample_weight)
+
+        # Reconstruction-only loss (discriminator not evaluated)
+        if not adversarial:
+            return mse_loss
 
         # Adversarial loss
         adv_loss = self._adv_loss.transformer_loss(
@@ -1,6 +1,7 @@
 import tensorflow as tf
 
 from calotron.losses.BaseLoss import BaseLoss
+from calotron.utils.training import replicaSum
 
 LIPSCHITZ_REGULARIZERS = ["gp", "alp"]
 PENALTY_STRATEGIES = ["two-sided", "one-sided"]
@@ -18,6 +19,8 @@ class WassersteinDistance(BaseLoss):
         lipschitz_regularizer="alp",
         lipschitz_penalty=100.0,
         lipschitz_penalty_strategy="one-sided",
+        virtual_direction_upds=VIRTUAL_DIR_UPDS,
+        lipschitz_penalty_interval=1,
         warmup_energy=1e-8,
         name="wass_dist_loss",
     ) -> None:
@@ -53,6 +56,27 @@ class WassersteinDistance(BaseLoss):
             )
         self._lipschitz_penalty_strategy = lipschitz_penalty_strategy
 
+        # Virtual adversarial direction updates (random direction if 0)
+        assert isinstance(virtual_direction_upds, (int, float))
+        assert virtual_direction_upds >= 0
+        self._virtual_direction_upds = int(virtual_direction_upds)
+
+        # Lazy regularization interval (penalty computed every k steps)
+        assert isinstance(lipschitz_penalty_interval, (int, float))
+        assert lipschitz_penalty_interval >= 1
+        self._lipschitz_penalty_interval = int(lipschitz_penalty_interval)
+        if self._lipschitz_penalty_interval > 1:
+            self._lipschitz_step = tf.Variable(
+                0,
+                dtype=tf.int64,
+                trainable=False,
+                synchronization=tf.VariableSynchronization.ON_READ,
+                aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA,
+                name="lipschitz_step",
+            )
+        else:
+            self._lipschitz_step = None
+
     def transformer_loss(
         self,
         transformer,
@@ -75,12 +99,8 @@ class WassersteinDistance(BaseLoss):
             return_transformer_output=False,
         )
 
-        real_critic = tf.reduce_sum(evt_weights[:, None] * y_true) / tf.reduce_sum(
-            evt_weights
-        )
-        fake_critic = tf.reduce_sum(evt_weights[:, None] * y_pred) / tf.reduce_sum(
-            evt_weights
-        )
+        real_critic = self._weighted_mean(y_true, evt_weights[:, None])
+        fake_critic = self._weighted_mean(y_pred, evt_weights[:, None])
         return tf.stop_gradient(real_critic) - fake_critic
 
     def discriminator_loss(
@@ -91,8 +111,12 @@ class WassersteinDistance(BaseLoss):
         target,
         sample_weight=None,
         training=True,
+        transformer_output=None,
     ) -> tf.Tensor:
-        y_true, y_pred, evt_weights, mask, output = self._perform_classification(
+        # Source encoded once for all the discriminator passes
+        memory = discriminator.encode_source(source, training=training)
+
+        y_out = self._perform_classification(
             source=source,
             target=target,
             transformer=transformer,
@@ -100,149 +124,270 @@ class WassersteinDistance(BaseLoss):
             warmup_energy=self._warmup_energy,
             inj_noise_std=0.0,
             sample_weight=sample_weight,
+            transformer_output=transformer_output,
+            source_memory=memory,
+            source_shuffle=discriminator.condition_aware,
             training_transformer=False,
             training_discriminator=training,
             return_transformer_output=True,
         )
+        y_true, y_pred = y_out[:2]
+        evt_weights, mask, output = y_out[-3:]
 
-        real_critic = tf.reduce_sum(evt_weights[:, None] * y_true) / tf.reduce_sum(
-            evt_weights
-        )
-        fake_critic = tf.reduce_sum(evt_weights[:, None] * y_pred) / tf.reduce_sum(
-            evt_weights
-        )
+        real_critic = self._weighted_mean(y_true, evt_weights[:, None])
+        fake_critic = self._weighted_mean(y_pred, evt_weights[:, None])
+        sample_true = (source, target, mask, y_true)
+        sample_pred = (source, output, mask, y_pred)
 
         if discriminator.condition_aware:
-            source_shuffle = tf.random.shuffle(source)
-            y_source = discriminator(
-                (source_shuffle, target), padding_mask=mask, training=training
-            )
-            source_critic = tf.reduce_mean(y_source)
-
+            source_critic = self._weighted_mean(y_out[2])
             loss = ((fake_critic - real_critic) + (source_critic - real_critic)) / 2.0
         else:
             loss = fake_critic - real_critic
 
-        reg = self._lipschitz_regularization(
-            sample_true=(source, target, mask, y_true),
-            sample_pred=(source, output, mask, y_pred),
-            discriminator=discriminator,
-            training_discriminator=training,
-        )
+        # Lazy regularization computes the penalty every few steps only
+        if training and (self._lipschitz_penalty_interval > 1):
+            reg = self._lazy_lipschitz_regularization(
+                sample_true=sample_true,
+                sample_pred=sample_pred,
+                discriminator=discriminator,
+                training_discriminator=training,
+                source_memory=memory,
+            )
+        elif self._lipschitz_regularizer == "alp":
+            sample_hat = self._virtual_adversarial_sample(
+                sample_true=sample_true,
+                sample_pred=sample_pred,
+                discriminator=discriminator,
+                training_discriminator=training,
+                source_memory=memory,
+            )
+            d_hat = self._classify_sample(discriminator, sample_hat, training)
+            alp_mean = self._adversarial_lipschitz_term(
+                d_out=tf.concat([y_true, y_pred], axis=0),
+                d_hat=d_hat,
+                target=tf.concat([target, output], axis=0),
+                target_hat=sample_hat[1],
+            )
+            reg = self._lipschitz_penalty_from_mean(alp_mean)
+        else:
+            gp_mean = self._gradient_penalty_term(
+                sample_true=sample_true,
+                sample_pred=sample_pred,
+                discriminator=discriminator,
+                training_discriminator=training,
+                source_memory=memory,
+            )
+            reg = self._lipschitz_penalty_from_mean(gp_mean)
         return loss + reg
 
-    def _lipschitz_regularization(
-        self, sample_true, sample_pred, discriminator, training_discriminator=True
+    def on_discriminator_update(self) -> None:
+        if self._lipschitz_step is not None:
+            self._lipschitz_step.assign_add(1)
+
+    @staticmethod
+    def _classify_sample(discriminator, sample, training=True) -> tf.Tensor:
+        source, target, mask, memory = sample
+        d_out = discriminator(
+            (source, target),
+            padding_mask=mask,
+            source_memory=memory,
+            training=training,
+        )
+        return tf.cast(d_out, dtype=target.dtype)
+
+    def _lazy_lipschitz_regularization(
+        self,
+        sample_true,
+        sample_pred,
+        discriminator,
+        training_discriminator=True,
+        source_memory=None,
     ) -> tf.Tensor:
-        source_true, target_true, mask_true, y_true = sample_true
-        source_pred, target_pred, mask_pred, y_pred = sample_pred
+        _, target_true, _, y_true = sample_true
+        # Step advanced once per discriminator update, so all the
+        # micro-batches of an accumulated update share the same decision
+        step = self._lipschitz_step.read_value()
+        apply_reg = tf.equal(step % self._lipschitz_penalty_interval, 0)
 
-        if self._lipschitz_regularizer == "gp":
-            target_concat = tf.concat([target_true, target_pred], axis=0)
+        # Normalizations involve all the replicas, so are kept out of tf.cond
+        if self._lipschitz_regularizer == "alp":
+            num_terms = 2 * tf.size(y_true)
+        else:
+            num_terms = tf.reduce_prod(tf.shape(target_true)[:2])
+        norm = replicaSum(tf.cast(num_terms, dtype=target_true.dtype))
 
-            with tf.GradientTape() as tape:
-                # Compute interpolated points
-                eps = tf.tile(
-                    tf.random.uniform(
-                        shape=(tf.shape(target_true)[0], tf.shape(target_true)[1]),
-                        minval=0.0,
-                        maxval=1.0,
-                        dtype=target_true.dtype,
-                    )[:, :, None],
-                    (1, 1, tf.shape(target_true)[2]),
+        def penalty_fn():
+            if self._lipschitz_regularizer == "alp":
+                sample_hat = self._virtual_adversarial_sample(
+                    sample_true=sample_true,
+                    sample_pred=sample_pred,
+                    discriminator=discriminator,
+                    training_discriminator=training_discriminator,
+                    source_memory=source_memory,
                 )
-                target_hat = tf.clip_by_value(
-                    target_pred + eps * (target_true - target_pred),
-                    clip_value_min=tf.reduce_min(target_concat, axis=[0, 1]),
-                    clip_value_max=tf.reduce_max(target_concat, axis=[0, 1]),
+                d_hat = self._classify_sample(
+                    discriminator, sample_hat, training_discriminator
                 )
-                tape.watch(target_hat)
-
-                # Value of the discriminator on interpolated points
-                y_hat = discriminator(
-                    (source_pred, target_hat),
-                    padding_mask=mask_pred,
-                    training=training_discriminator,
+                return self._adversarial_lipschitz_term(
+                    d_out=tf.concat([sample_true[3], sample_pred[3]], axis=0),
+                    d_hat=d_hat,
+                    target=tf.concat([sample_true[1], sample_pred[1]], axis=0),
+                    target_hat=sample_hat[1],
+                    norm=norm,
                 )
-                grad = tape.gradient(y_hat, target_hat) + EPSILON  # non-zero gradient
-                norm = tf.norm(grad, axis=-1)
+            return self._gradient_penalty_term(
+                sample_true=sample_true,
+                sample_pred=sample_pred,
+                discriminator=discriminator,
+                training_discriminator=training_discriminator,
+                source_memory=source_memory,
+                norm=norm,
+            )
 
-            if self._lipschitz_penalty_strategy == "two-sided":
-                gp_term = (norm - LIPSCHITZ_CONSTANT) ** 2
-            else:
-                gp_term = (tf.maximum(0.0, norm - LIPSCHITZ_CONSTANT)) ** 2
-            return self._lipschitz_penalty * tf.reduce_mean(gp_term)
+        penalty_mean = tf.cond(
+            apply_reg, penalty_fn, lambda: tf.zeros((), dtype=target_true.dtype)
+        )
+        # Scaled to preserve the effective strength of the penalty
+        interval = float(self._lipschitz_penalty_interval)
+        return interval * self._lipschitz_penalty_from_mean(penalty_mean)
 
-        else:
-            source_concat = tf.concat([source_true, source_pred], axis=0)
-            target_concat = tf.concat([target_true, target_pred], axis=0)
-            mask_concat = tf.concat([mask_true, mask_pred], axis=0)
-            d_out = tf.concat([y_true, y_pred], axis=0)
-
-            # Initial virtual adversarial direction
-            adv_dir = tf.random.uniform(
-                shape=(
-                    2 * tf.shape(target_true)[0],
-                    tf.shape(target_true)[1],
-                    tf.shape(target_true)[2],
-                ),
-                minval=-1.0,
-                maxval=1.0,
-                dtype=target_true.dtype,
-            )
-            adv_dir /= tf.norm(adv_dir, axis=[1, 2], keepdims=True)
-
-            for _ in range(VIRTUAL_DIR_UPDS):
-                with tf.GradientTape() as tape:
-                    tape.watch(adv_dir)
-                    target_hat = tf.clip_by_value(
-                        target_concat + FIXED_XI * adv_dir,
-                        clip_value_min=tf.reduce_min(target_concat, axis=[0, 1]),
-                        clip_value_max=tf.reduce_max(target_concat, axis=[0, 1]),
-                    )
-                    d_hat = discriminator(
-                        (source_concat, target_hat),
-                        padding_mask=mask_concat,
-                        training=training_discriminator,
-                    )
-                    y_diff = tf.reduce_mean(tf.abs(d_out - d_hat))
-                    grad = tape.gradient(y_diff, adv_dir) + EPSILON  # non-zero gradient
-                    adv_dir = grad / tf.norm(grad, axis=[1, 2], keepdims=True)
-
-            # Virtual adversarial direction
-            xi = tf.random.uniform(
-                shape=(2 * tf.shape(target_true)[0],),
-                minval=SAMPLED_XI_MIN,
-                maxval=SAMPLED_XI_MAX,
-                dtype=target_true.dtype,
-            )
-            xi = tf.tile(
-                xi[:, None, None],
-                (1, tf.shape(target_true)[1], tf.shape(target_true)[2]),
+    def _lipschitz_penalty_from_mean(self, penalty_mean) -> tf.Tensor:
+        if self._lipschitz_regularizer == "alp":
+            # The squared global mean is split among replicas so that
+            # both the summed values and the summed gradients are exact
+            alp_global = replicaSum(tf.stop_gradient(penalty_mean))
+            alp_reg = alp_global * (2.0 * penalty_mean - tf.stop_gradient(penalty_mean))
+            return self._lipschitz_penalty * alp_reg
+        return self._lipschitz_penalty * penalty_mean
+
+    def _gradient_penalty_term(
+        self,
+        sample_true,
+        sample_pred,
+        discriminator,
+        training_discriminator=True,
+        source_memory=None,
+        norm=None,
+    ) -> tf.Tensor:
+        _, target_true, _, _ = sample_true
+        source_pred, target_pred, mask_pred, _ = sample_pred
+        target_concat = tf.concat([target_true, target_pred], axis=0)
+
+        with tf.GradientTape() as tape:
+            # Compute interpolated points
+            eps = tf.tile(
+                tf.random.uniform(
+                    shape=(tf.shape(target_true)[0], tf.shape(target_true)[1]),
+                    minval=0.0,
+                    maxval=1.0,
+                    dtype=target_true.dtype,
+                )[:, :, None],
+                (1, 1, tf.shape(target_true)[2]),
             )
             target_hat = tf.clip_by_value(
-                target_concat + xi * adv_dir,
+                target_pred + eps * (target_true - target_pred),
                 clip_value_min=tf.reduce_min(target_concat, axis=[0, 1]),
                 clip_value_max=tf.reduce_max(target_concat, axis=[0, 1]),
             )
-            d_hat = discriminator(
-                (source_concat, target_hat),
-                padding_mask=mask_concat,
+            tape.watch(target_hat)
+
+            # Value of the discriminator on interpolated points
+            y_hat = discriminator(
+                (source_pred, target_hat),
+                padding_mask=mask_pred,
+                source_memory=source_memory,
                 training=training_discriminator,
             )
-            y_diff = tf.abs(d_out - d_hat)
-            x_diff = tf.norm(
-                tf.abs(target_concat - target_hat) + EPSILON,  # non-zero difference
-                axis=[1, 2],
-                keepdims=True,
-            )
+            grad = tape.gradient(y_hat, target_hat) + EPSILON  # non-zero gradient
+            grad_norm = tf.norm(grad, axis=-1)
+
+        if self._lipschitz_penalty_strategy == "two-sided":
+            gp_term = (grad_norm - LIPSCHITZ_CONSTANT) ** 2
+        else:
+            gp_term = (tf.maximum(0.0, grad_norm - LIPSCHITZ_CONSTANT)) ** 2
+        return self._weighted_mean(gp_term, norm=norm)
 
-            K = y_diff / x_diff  # lipschitz constant
-            if self._lipschitz_penalty_strategy == "two-sided":
-                alp_term = tf.abs(K - LIPSCHITZ_CONSTANT)
-            else:
-                alp_term = tf.maximum(0.0, K - LIPSCHITZ_CONSTANT)
-            return self._lipschitz_penalty * tf.reduce_mean(alp_term) ** 2
+    def _virtual_adversarial_sample(
+        self,
+        sample_true,
+        sample_pred,
+        discriminator,
+        training_discriminator=True,
+        source_memory=None,
+    ) -> tuple:
+        source_true, target_true, mask_true, y_true = sample_true
+        source_pred, target_pred, mask_pred, y_pred = sample_pred
+
+        source_concat = tf.concat([source_true, source_pred], axis=0)
+        target_concat = tf.concat([target_true, target_pred], axis=0)
+        mask_concat = tf.concat([mask_true, mask_pred], axis=0)
+        if source_memory is not None:
+            memory_concat = tf.concat([source_memory, source_memory], axis=0)
+        else:
+            memory_concat = None
+        d_out = tf.stop_gradient(tf.concat([y_true, y_pred], axis=0))
+        clip_min = tf.reduce_min(target_concat, axis=[0, 1])
+        clip_max = tf.reduce_max(target_concat, axis=[0, 1])
+
+        # Initial virtual adversarial direction (random if never refined)
+        adv_dir = tf.random.uniform(
+            shape=tf.shape(target_concat),
+            minval=-1.0,
+            maxval=1.0,
+            dtype=target_true.dtype,
+        )
+        adv_dir /= tf.norm(adv_dir, axis=[1, 2], keepdims=True)
+
+        for _ in range(self._virtual_direction_upds):
+            with tf.GradientTape() as tape:
+                tape.watch(adv_dir)
+                target_hat = tf.clip_by_value(
+                    target_concat + FIXED_XI * adv_dir,
+                    clip_value_min=clip_min,
+                    clip_value_max=clip_max,
+                )
+                d_hat = discriminator(
+                    (source_concat, target_hat),
+                    padding_mask=mask_concat,
+                    source_memory=memory_concat,
+                    training=training_discriminator,
+                )
+                d_hat = tf.cast(d_hat, dtype=target_true.dtype)
+                y_diff = tf.reduce_mean(tf.abs(d_out - d_hat))
+            grad = tape.gradient(y_diff, adv_dir) + EPSILON  # non-zero gradient
+            # The direction is a constant for the discriminator update
+            adv_dir = tf.stop_gradient(grad / tf.norm(grad, axis=[1, 2], keepdims=True))
+
+        # Virtual adversarial direction
+        xi = tf.random.uniform(
+            shape=(tf.shape(target_concat)[0], 1, 1),
+            minval=SAMPLED_XI_MIN,
+            maxval=SAMPLED_XI_MAX,
+            dtype=target_true.dtype,
+        )
+        target_hat = tf.clip_by_value(
+            target_concat + xi * adv_dir,
+            clip_value_min=clip_min,
+            clip_value_max=clip_max,
+        )
+        return source_concat, target_hat, mask_concat, memory_concat
+
+    def _adversarial_lipschitz_term(
+        self, d_out, d_hat, target, target_hat, norm=None
+    ) -> tf.Tensor:
+        y_diff = tf.abs(d_out - d_hat)
+        x_diff = tf.norm(
+            tf.abs(target - target_hat) + EPSILON,  # non-zero difference
+            axis=[1, 2],
+        )
+
+        K = y_diff / x_diff[:, None]  # lipschitz constant
+        if self._lipschitz_penalty_strategy == "two-sided":
+            alp_term = tf.abs(K - LIPSCHITZ_CONSTANT)
+        else:
+            alp_term = tf.maximum(0.0, K - LIPSCHITZ_CONSTANT)
+        return self._weighted_mean(alp_term, norm=norm)
 
     @property
     def warmup_energy(self) -> float:
@@ -259,3 +404,11 @@ class WassersteinDistance(BaseLoss):
     @property
     def lipschitz_penalty_strategy(self) -> str:
         return self._lipschitz_penalty_strategy
+
+    @property
+    def virtual_direction_upds(self) -> int:
+        return self._virtual_direction_upds
+
+    @property
+    def lipschitz_penalty_interval(self) -> int:
+        return self._lipschitz_penalty_interval
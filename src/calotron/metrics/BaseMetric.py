@@ -6,9 +6,53 @@ class BaseMetric(keras.metrics.Metric):
     def __init__(self, name="metric", dtype=None) -> None:
         super().__init__(name, dtype)
         self._metric_values = self.add_weight(
-            name=f"{name}_values", initializer="zeros"
+            name=f"{name}_values",
+            initializer="zeros",
+            aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA,
         )
 
+    @staticmethod
+    def _gather_replicas(y_true, y_pred, sample_weight=None) -> tuple:
+        # Metrics are computed on the global batch, identical for all replicas
+        replica_ctx = tf.distribute.get_replica_context()
+        if replica_ctx is None or replica_ctx.num_replicas_in_sync == 1:
+            return y_true, y_pred, sample_weight
+
+        # Position of the local batch within the global one
+        batch_size = tf.shape(y_pred)[0]
+        batch_sizes = replica_ctx.all_reduce(
+            tf.distribute.ReduceOp.SUM,
+            tf.one_hot(
+                replica_ctx.replica_id_in_sync_group,
+                replica_ctx.num_replicas_in_sync,
+                dtype=tf.float32,
+            )
+            * tf.cast(batch_size, dtype=tf.float32),
+        )
+        batch_sizes = tf.cast(batch_sizes, dtype=tf.int32)
+        offset = tf.math.cumsum(batch_sizes, exclusive=True)[
+            replica_ctx.replica_id_in_sync_group
+        ]
+        global_size = tf.reduce_sum(batch_sizes)
+
+        # Zero-padded local batches summed up to the global one
+        gathered = list()
+        for values in [y_true, y_pred, sample_weight]:
+            if values is not None:
+                values = tf.convert_to_tensor(values)
+                paddings = tf.concat(
+                    [
+                        [[offset, global_size - offset - batch_size]],
+                        tf.zeros(shape=(tf.rank(values) - 1, 2), dtype=tf.int32),
+                    ],
+                    axis=0,
+                )
+                values = replica_ctx.all_reduce(
+                    tf.distribute.ReduceOp.SUM, tf.pad(values, paddings)
+                )
+            gathered.append(values)
+        return tuple(gathered)
+
     @staticmethod
     def _prepare_weights(sample_weight=None):
         if sample_weight is not None:
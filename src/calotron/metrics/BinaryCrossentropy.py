@@ -17,6 +17,9 @@ class BinaryCrossentropy(BaseMetric):
         )
 
     def update_state(self, y_true, y_pred, sample_weight=None) -> None:
+        y_true, y_pred, sample_weight = self._gather_replicas(
+            y_true, y_pred, sample_weight
+        )
         weights = self._prepare_weights(sample_weight)
         state = self._bce(tf.ones_like(y_pred), y_pred, sample_weight=weights)
         self._metric_values.assign(state)
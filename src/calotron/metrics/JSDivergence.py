@@ -10,6 +10,9 @@ class JSDivergence(BaseMetric):
         self._kl_div = keras.metrics.KLDivergence(name=name, dtype=dtype)
 
     def update_state(self, y_true, y_pred, sample_weight=None) -> None:
+        y_true, y_pred, sample_weight = self._gather_replicas(
+            y_true, y_pred, sample_weight
+        )
         dtype = self._kl_div(y_true, y_pred).dtype
         y_true = tf.cast(y_true, dtype)
         y_pred = tf.cast(y_pred, dtype)
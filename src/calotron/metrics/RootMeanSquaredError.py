@@ -10,6 +10,9 @@ class RootMeanSquaredError(BaseMetric):
         self._rmse = keras.metrics.RootMeanSquaredError(name=name, dtype=dtype)
 
     def update_state(self, y_true, y_pred, sample_weight=None):
+        y_true, y_pred, sample_weight = self._gather_replicas(
+            y_true, y_pred, sample_weight
+        )
         weights = self._prepare_weights(sample_weight)
         state = self._rmse(y_true, y_pred, sample_weight=weights)
         self._metric_values.assign(state)
@@ -8,6 +8,9 @@ class WassersteinDistance(BaseMetric):
         super().__init__(name, dtype)
 
     def update_state(self, y_true, y_pred, sample_weight=None) -> None:
+        y_true, y_pred, sample_weight = self._gather_replicas(
+            y_true, y_pred, sample_weight
+        )
         weights = self._prepare_weights(sample_weight)
         if weights is not None:
             state = tf.reduce_sum(weights[:, None] * (y_true - y_pred)) / tf.reduce_sum(
@@ -1,9 +1,20 @@
+from functools import partial
+
 import tensorflow as tf
 from tensorflow import keras
 
+from calotron.losses.AdvLoss import AdvLoss
 from calotron.models.discriminators import Discriminator
+from calotron.models.players import PretrainedEncoder
 from calotron.models.transformers import Transformer
 from calotron.utils.checks import checkLoss, checkMetrics, checkOptimizer
+from calotron.utils.training import (
+    getScaledLoss,
+    getUnscaledGradients,
+    prepareOptimizer,
+    replicaSum,
+    unpackData,
+)
 
 
 class Calotron(keras.Model):
@@ -26,6 +37,19 @@ class Calotron(keras.Model):
             )
         self._discriminator = discriminator
 
+        # Sequence lengths used for training (-1 means full length)
+        self._max_lengths = [
+            tf.Variable(
+                -1,
+                dtype=tf.int32,
+                trainable=False,
+                synchronization=tf.VariableSynchronization.ON_READ,
+                aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA,
+                name=f"{key}_max_length",
+            )
+            for key in ["source", "target"]
+        ]
+
     def call(self, inputs) -> tuple:
         source, target = inputs
         t_out = self._transformer((source, target))
@@ -46,9 +70,25 @@ class Calotron(keras.Model):
         discriminator_optimizer="rmsprop",
         transformer_upds_per_batch=1,
         discriminator_upds_per_batch=1,
+        transformer_accum_steps=1,
+        discriminator_accum_steps=1,
+        reuse_generated_batch=False,
+        replay_buffer_size=0,
+        replay_ratio=0.25,
     ) -> None:
         super().compile(weighted_metrics=[])
 
+        # Cached pretrained embeddings are appended to the shared source,
+        # so both players should expect them (or neither)
+        t_cached = self._uses_cached_embeddings(self._transformer)
+        d_cached = self._uses_cached_embeddings(self._discriminator)
+        if t_cached != d_cached:
+            raise ValueError(
+                "`transformer` and `discriminator` should both (or neither) "
+                "use the 'cached' `pretrained_encoder_mode`, instead only "
+                f"the {'transformer' if t_cached else 'discriminator'} does"
+            )
+
         # Loss metrics
         self._loss = checkLoss(loss)
         self._t_loss = keras.metrics.Mean(name="t_loss")
@@ -56,8 +96,12 @@ class Calotron(keras.Model):
         self._metrics = checkMetrics(metrics)
 
         # Optimizers
-        self._t_opt = checkOptimizer(transformer_optimizer)
-        self._d_opt = checkOptimizer(discriminator_optimizer)
+        self._t_opt = prepareOptimizer(
+            checkOptimizer(transformer_optimizer), model=self._transformer
+        )
+        self._d_opt = prepareOptimizer(
+            checkOptimizer(discriminator_optimizer), model=self._discriminator
+        )
 
         # Transformer updates per batch
         assert isinstance(transformer_upds_per_batch, (int, float))
@@ -69,106 +113,386 @@ class Calotron(keras.Model):
         assert discriminator_upds_per_batch >= 1
         self._d_upds_per_batch = int(discriminator_upds_per_batch)
 
+        # Transformer gradient accumulation steps
+        assert isinstance(transformer_accum_steps, (int, float))
+        assert transformer_accum_steps >= 1
+        self._t_accum_steps = int(transformer_accum_steps)
+
+        # Discriminator gradient accumulation steps
+        assert isinstance(discriminator_accum_steps, (int, float))
+        assert discriminator_accum_steps >= 1
+        self._d_accum_steps = int(discriminator_accum_steps)
+
+        # Replay buffer of recent generated batches
+        assert isinstance(replay_buffer_size, (int, float))
+        assert replay_buffer_size >= 0
+        self._replay_size = int(replay_buffer_size)
+        assert isinstance(replay_ratio, (int, float))
+        assert (replay_ratio >= 0.0) and (replay_ratio <= 1.0)
+        self._replay_ratio = float(replay_ratio)
+        if self._replay_size > 0:
+            self._replay_buffer = [
+                tf.Variable(
+                    tf.zeros(shape=(0,) * rank, dtype=self._transformer.dtype),
+                    shape=tf.TensorShape(None),
+                    trainable=False,
+                    synchronization=tf.VariableSynchronization.ON_READ,
+                    aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA,
+                )
+                for rank in [3, 3, 2, 3]  # source, target, sample_weight, output
+            ]
+        else:
+            self._replay_buffer = None
+
+        # Generated batch shared by the discriminator updates
+        assert isinstance(reuse_generated_batch, bool)
+        self._reuse_generated_batch = reuse_generated_batch or self._replay_size > 0
+
+        # Adversarial schedule (train functions cached per configuration)
+        self._adversarial_loss = True
+        self._train_functions = dict()
+
+    @staticmethod
+    def _uses_cached_embeddings(model) -> bool:
+        encoder = getattr(model, "_encoder", None)
+        if isinstance(encoder, PretrainedEncoder):
+            if encoder.pretrained_model_dir is not None:
+                return encoder.pretrained_mode == "cached"
+        return False
+
+    def set_adversarial_schedule(
+        self, discriminator_upds_per_batch=None, adversarial_loss=None
+    ) -> None:
+        prev_key = (self._d_upds_per_batch, self._adversarial_loss)
+        if self.train_function is not None:
+            self._train_functions.setdefault(prev_key, self.train_function)
+
+        # Discriminator updates per batch (0 to skip them)
+        if discriminator_upds_per_batch is not None:
+            assert isinstance(discriminator_upds_per_batch, (int, float))
+            assert discriminator_upds_per_batch >= 0
+            self._d_upds_per_batch = int(discriminator_upds_per_batch)
+
+        # Adversarial term of the transformer loss
+        if adversarial_loss is not None:
+            assert isinstance(adversarial_loss, bool)
+            if not adversarial_loss and not isinstance(self._loss, AdvLoss):
+                raise TypeError(
+                    "Only `AdvLoss` subclasses support reconstruction-only "
+                    f"training, instead {type(self._loss)} passed"
+                )
+            self._adversarial_loss = adversarial_loss
+
+        # Each configuration traced once, then reused by `fit()`
+        key = (self._d_upds_per_batch, self._adversarial_loss)
+        if key != prev_key:
+            if key in self._train_functions:
+                self.train_function = self._train_functions[key]
+            elif self.train_function is not None:
+                self.train_function = None
+                self._train_functions[key] = self.make_train_function()
+
+    def set_max_lengths(self, source_length=None, target_length=None) -> None:
+        lengths = list()
+        for length in [source_length, target_length]:
+            if length is None:
+                lengths.append(-1)
+            else:
+                assert isinstance(length, (int, float))
+                assert length >= 1
+                lengths.append(int(length))
+
+        changed = False
+        for variable, length in zip(self._max_lengths, lengths):
+            if int(variable.numpy()) != length:
+                variable.assign(length)
+                changed = True
+
+        # Replayed batches must share the current sequence lengths
+        if changed and getattr(self, "_replay_buffer", None) is not None:
+            for buffer in self._replay_buffer:
+                rank = len(buffer.value().shape)
+                buffer.assign(tf.zeros(shape=(0,) * rank, dtype=buffer.dtype))
+
+    def _truncate_data(self, source, target, sample_weight=None) -> tuple:
+        source_length, target_length = [
+            tf.where(variable > 0, variable, tf.shape(x)[1])
+            for variable, x in zip(self._max_lengths, [source, target])
+        ]
+        source = source[:, :source_length]
+        target = target[:, :target_length]
+        if sample_weight is not None:
+            sample_weight = sample_weight[:, :target_length]
+        return source, target, sample_weight
+
     def train_step(self, data) -> dict:
-        source, target, sample_weight = self._unpack_data(data)
+        source, target, sample_weight = unpackData(data)
+        source, target, sample_weight = self._truncate_data(
+            source, target, sample_weight
+        )
 
+        if self._reuse_generated_batch and self._d_upds_per_batch > 0:
+            d_source, d_target, d_weight, d_output = self._generate_fake_batch(
+                source, target, sample_weight
+            )
+        else:
+            d_source, d_target, d_weight, d_output = source, target, sample_weight, None
         for _ in range(self._d_upds_per_batch):
-            self._d_train_step(source, target, sample_weight)
+            self._d_train_step(
+                d_source, d_target, d_weight, transformer_output=d_output
+            )
         for _ in range(self._t_upds_per_batch):
             self._t_train_step(source, target, sample_weight)
 
         train_dict = dict(t_loss=self._t_loss.result(), d_loss=self._d_loss.result())
         if self._metrics is not None:
-            t_out = self._transformer((source, target), training=False)
-            source_concat = tf.concat([source, source], axis=0)
-            target_concat = tf.concat([target, t_out], axis=0)
-            if sample_weight is not None:
-                mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
-                mask_concat = tf.concat([mask, mask], axis=0)
-            else:
-                mask_concat = None
-            d_out = self._discriminator(
-                (source_concat, target_concat), padding_mask=mask_concat, training=False
-            )
-            y_true, y_pred = tf.split(d_out, 2, axis=0)
-            for metric in self._metrics:
-                metric.update_state(
-                    y_true=y_true, y_pred=y_pred, sample_weight=sample_weight
+            if self._adversarial_loss:
+                t_out = self._transformer((source, target), training=False)
+                source_concat = tf.concat([source, source], axis=0)
+                target_concat = tf.concat([target, t_out], axis=0)
+                if sample_weight is not None:
+                    mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
+                    mask_concat = tf.concat([mask, mask], axis=0)
+                else:
+                    mask_concat = None
+                d_out = self._discriminator(
+                    (source_concat, target_concat),
+                    padding_mask=mask_concat,
+                    training=False,
                 )
+                y_true, y_pred = tf.split(d_out, 2, axis=0)
+                for metric in self._metrics:
+                    metric.update_state(
+                        y_true=y_true, y_pred=y_pred, sample_weight=sample_weight
+                    )
+            # Metrics frozen during the reconstruction-only warm-up
+            for metric in self._metrics:
                 train_dict.update({metric.name: metric.result()})
         return train_dict
 
-    @staticmethod
-    def _unpack_data(data) -> tuple:
-        if len(data) == 3:
-            source, target, sample_weight = data
-        else:
-            source, target = data
-            sample_weight = None
-        return source, target, sample_weight
+    def _generate_fake_batch(self, source, target, sample_weight=None) -> tuple:
+        output = self._transformer((source, target), training=False)
+        output = tf.stop_gradient(tf.cast(output, dtype=target.dtype))
+        if self._replay_buffer is None:
+            return source, target, sample_weight, output
+
+        if sample_weight is None:
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
+        batch = [source, target, sample_weight, output]
+        mixed_batch = self._sample_from_buffer(batch)
+        self._push_to_buffer(batch)
+        return tuple(mixed_batch)
+
+    def _sample_from_buffer(self, batch) -> list:
+        batch_size = tf.shape(batch[0])[0]
+        buffer_size = tf.shape(self._replay_buffer[0])[0]
+        num_replays = tf.cast(
+            self._replay_ratio * tf.cast(batch_size, tf.float32), tf.int32
+        )
+        num_replays = tf.minimum(num_replays, buffer_size)
+        indices = tf.random.shuffle(tf.range(buffer_size))[:num_replays]
+
+        # Leading events replaced by past generated ones
+        mixed_batch = list()
+        for values, buffer in zip(batch, self._replay_buffer):
+            mixed = tf.cond(
+                num_replays > 0,
+                lambda: tf.concat(
+                    [
+                        tf.cast(tf.gather(buffer, indices), dtype=values.dtype),
+                        values[num_replays:],
+                    ],
+                    axis=0,
+                ),
+                lambda: values,
+            )
+            mixed.set_shape(values.shape)
+            mixed_batch.append(mixed)
+        return mixed_batch
+
+    def _push_to_buffer(self, batch) -> None:
+        buffer_size = tf.shape(self._replay_buffer[0])[0]
+        for values, buffer in zip(batch, self._replay_buffer):
+            values = tf.cast(values, dtype=buffer.dtype)
+            updated = tf.cond(
+                buffer_size > 0,
+                lambda: tf.concat([values, buffer], axis=0)[: self._replay_size],
+                lambda: values[: self._replay_size],
+            )
+            buffer.assign(updated)  # oldest events dropped first
 
     def _t_train_step(self, source, target, sample_weight=None) -> None:
-        with tf.GradientTape() as tape:
-            loss = self._loss.transformer_loss(
-                transformer=self._transformer,
-                discriminator=self._discriminator,
-                source=source,
-                target=target,
-                sample_weight=sample_weight,
-                training=True,
-            )
-        trainable_vars = self._transformer.trainable_variables
-        gradients = tape.gradient(loss, trainable_vars)
+        if self._adversarial_loss:
+            loss_fn = self._loss.transformer_loss
+        else:
+            loss_fn = partial(self._loss.transformer_loss, adversarial=False)
+        loss, gradients, trainable_vars = self._compute_gradients(
+            loss_fn=loss_fn,
+            player=self._transformer,
+            optimizer=self._t_opt,
+            accum_steps=self._t_accum_steps,
+            source=source,
+            target=target,
+            sample_weight=sample_weight,
+        )
         self._t_opt.apply_gradients(zip(gradients, trainable_vars))
-        self._t_loss.update_state(loss)
+        self._t_loss.update_state(replicaSum(loss))
 
     def _t_enc_train_step(self, source, target, sample_weight=None) -> None:
-        with tf.GradientTape() as tape:
-            loss = self._loss.transformer_loss(
-                transformer=self._transformer,
-                discriminator=self._discriminator,
-                source=source,
-                target=target,
-                sample_weight=sample_weight,
-                training=True,
-            )
-        trainable_vars = self._transformer._encoder.trainable_variables
-        gradients = tape.gradient(loss, trainable_vars)
+        loss, gradients, trainable_vars = self._compute_gradients(
+            loss_fn=self._loss.transformer_loss,
+            player=self._transformer._encoder,
+            optimizer=self._t_opt,
+            accum_steps=self._t_accum_steps,
+            source=source,
+            target=target,
+            sample_weight=sample_weight,
+        )
         self._t_opt.apply_gradients(zip(gradients, trainable_vars))
-        self._t_loss.update_state(loss)
+        self._t_loss.update_state(replicaSum(loss))
 
-    def _d_train_step(self, source, target, sample_weight=None) -> None:
-        with tf.GradientTape() as tape:
-            loss = self._loss.discriminator_loss(
-                transformer=self._transformer,
-                discriminator=self._discriminator,
-                source=source,
-                target=target,
-                sample_weight=sample_weight,
-                training=True,
-            )
-        trainable_vars = self._discriminator.trainable_variables
-        gradients = tape.gradient(loss, trainable_vars)
+    def _d_train_step(
+        self, source, target, sample_weight=None, transformer_output=None
+    ) -> None:
+        loss, gradients, trainable_vars = self._compute_gradients(
+            loss_fn=self._loss.discriminator_loss,
+            player=self._discriminator,
+            optimizer=self._d_opt,
+            accum_steps=self._d_accum_steps,
+            source=source,
+            target=target,
+            sample_weight=sample_weight,
+            transformer_output=transformer_output,
+        )
         self._d_opt.apply_gradients(zip(gradients, trainable_vars))
-        self._d_loss.update_state(loss)
+        self._loss.on_discriminator_update()
+        self._d_loss.update_state(replicaSum(loss))
 
-    def _d_enc_train_step(self, source, target, sample_weight=None) -> None:
+    def _d_enc_train_step(
+        self, source, target, sample_weight=None, transformer_output=None
+    ) -> None:
+        loss, gradients, trainable_vars = self._compute_gradients(
+            loss_fn=self._loss.discriminator_loss,
+            player=self._discriminator._encoder,
+            optimizer=self._d_opt,
+            accum_steps=self._d_accum_steps,
+            source=source,
+            target=target,
+            sample_weight=sample_weight,
+            transformer_output=transformer_output,
+        )
+        self._d_opt.apply_gradients(zip(gradients, trainable_vars))
+        self._loss.on_discriminator_update()
+        self._d_loss.update_state(replicaSum(loss))
+
+    def _compute_gradients(
+        self,
+        loss_fn,
+        player,
+        optimizer,
+        accum_steps,
+        source,
+        target,
+        sample_weight=None,
+        transformer_output=None,
+    ) -> tuple:
+        if accum_steps == 1:
+            loss, gradients = self._micro_batch_gradients(
+                loss_fn,
+                player,
+                optimizer,
+                source,
+                target,
+                sample_weight,
+                transformer_output=transformer_output,
+            )
+            trainable_vars = player.trainable_variables
+            gradients = getUnscaledGradients(optimizer, gradients)
+            return loss, gradients, trainable_vars
+
+        # Micro-batch losses weighted by their share of the global batch
+        # weights; each micro-batch loss is normalized by the weights summed
+        # over all the replicas, so its share must be replica-summed as well
+        batch_size = tf.shape(source)[0]
+        micro_batch_size = batch_size // accum_steps
+        if sample_weight is not None:
+            evt_weights = tf.reduce_sum(sample_weight, axis=-1)
+        else:
+            evt_weights = tf.ones(shape=(batch_size,), dtype=target.dtype)
+        evt_weights /= replicaSum(tf.reduce_sum(evt_weights))
+
+        loss = 0.0
+        gradients = list()
+        for step in range(accum_steps):
+            start = step * micro_batch_size
+            if step == accum_steps - 1:
+                stop = batch_size
+            else:
+                stop = start + micro_batch_size
+
+            # Micro-batches processed one at a time to bound memory
+            with tf.control_dependencies(gradients):
+                micro_loss, micro_gradients = self._micro_batch_gradients(
+                    loss_fn,
+                    player,
+                    optimizer,
+                    source[start:stop],
+                    target[start:stop],
+                    sample_weight[start:stop] if sample_weight is not None else None,
+                    micro_batch_weight=replicaSum(
+                        tf.reduce_sum(evt_weights[start:stop])
+                    ),
+                    transformer_output=transformer_output[start:stop]
+                    if transformer_output is not None
+                    else None,
+                )
+            if step == 0:
+                trainable_vars = player.trainable_variables
+                gradients = [
+                    tf.zeros_like(var) if grad is None else tf.convert_to_tensor(grad)
+                    for grad, var in zip(micro_gradients, trainable_vars)
+                ]
+            else:
+                gradients = [
+                    grad if micro_grad is None else grad + micro_grad
+                    for grad, micro_grad in zip(gradients, micro_gradients)
+                ]
+            loss += micro_loss
+
+        gradients = getUnscaledGradients(optimizer, gradients)
+        return loss, gradients, trainable_vars
+
+    def _micro_batch_gradients(
+        self,
+        loss_fn,
+        player,
+        optimizer,
+        source,
+        target,
+        sample_weight=None,
+        micro_batch_weight=1.0,
+        transformer_output=None,
+    ) -> tuple:
+        # Only the discriminator loss accepts a precomputed transformer output
+        loss_kwargs = dict()
+        if transformer_output is not None:
+            loss_kwargs.update(transformer_output=transformer_output)
         with tf.GradientTape() as tape:
-            loss = self._loss.discriminator_loss(
+            loss = micro_batch_weight * loss_fn(
                 transformer=self._transformer,
                 discriminator=self._discriminator,
                 source=source,
                 target=target,
                 sample_weight=sample_weight,
                 training=True,
+                **loss_kwargs,
             )
-        trainable_vars = self._discriminator._encoder.trainable_variables
-        gradients = tape.gradient(loss, trainable_vars)
-        self._d_opt.apply_gradients(zip(gradients, trainable_vars))
-        self._d_loss.update_state(loss)
+            scaled_loss = getScaledLoss(optimizer, loss)
+        gradients = tape.gradient(scaled_loss, player.trainable_variables)
+        return loss, gradients
 
     def test_step(self, data) -> dict:
-        source, target, sample_weight = self._unpack_data(data)
+        source, target, sample_weight = unpackData(data)
 
         t_loss = self._loss.transformer_loss(
             transformer=self._transformer,
@@ -178,7 +502,7 @@ class Calotron(keras.Model):
             sample_weight=sample_weight,
             training=False,
         )
-        self._t_loss.update_state(t_loss)
+        self._t_loss.update_state(replicaSum(t_loss))
 
         d_loss = self._loss.discriminator_loss(
             transformer=self._transformer,
@@ -188,7 +512,7 @@ class Calotron(keras.Model):
             sample_weight=sample_weight,
             training=False,
         )
-        self._d_loss.update_state(d_loss)
+        self._d_loss.update_state(replicaSum(d_loss))
 
         train_dict = dict(t_loss=self._t_loss.result(), d_loss=self._d_loss.result())
         if self._metrics is not None:
@@ -214,6 +538,16 @@ class Calotron(keras.Model):
     def get_start_token(self, target) -> tf.Tensor:
         return self._transformer.get_start_token(target)
 
+    @property
+    def source_max_length(self):  # TODO: add Union[int, None]
+        length = int(self._max_lengths[0].numpy())
+        return length if length > 0 else None
+
+    @property
+    def target_max_length(self):  # TODO: add Union[int, None]
+        length = int(self._max_lengths[1].numpy())
+        return length if length > 0 else None
+
     @property
     def transformer(self) -> Transformer:
         return self._transformer
@@ -244,3 +578,27 @@ class Calotron(keras.Model):
     @property
     def discriminator_upds_per_batch(self) -> int:
         return self._d_upds_per_batch
+
+    @property
+    def transformer_accum_steps(self) -> int:
+        return self._t_accum_steps
+
+    @property
+    def discriminator_accum_steps(self) -> int:
+        return self._d_accum_steps
+
+    @property
+    def reuse_generated_batch(self) -> bool:
+        return self._reuse_generated_batch
+
+    @property
+    def replay_buffer_size(self) -> int:
+        return self._replay_size
+
+    @property
+    def replay_ratio(self) -> float:
+        return self._replay_ratio
+
+    @property
+    def adversarial_loss(self) -> bool:
+        return self._adversarial_loss
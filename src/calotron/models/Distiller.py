@@ -0,0 +1,294 @@
+import tensorflow as tf
+from tensorflow import keras
+
+from calotron.models.discriminators import Discriminator
+from calotron.models.transformers import GigaGenerator, Transformer
+from calotron.utils.checks import checkLoss, checkOptimizer
+from calotron.utils.training import (
+    getScaledLoss,
+    getUnscaledGradients,
+    prepareOptimizer,
+    replicaSum,
+    unpackData,
+)
+
+
+class Distiller(keras.Model):
+    def __init__(
+        self, teacher, student, discriminator=None, name=None, dtype=None
+    ) -> None:
+        super().__init__(name=name, dtype=dtype)
+
+        # Teacher
+        if not isinstance(teacher, Transformer):
+            raise TypeError(
+                f"`teacher` should be a calotron's `Transformer`, "
+                f"instead {type(teacher)} passed"
+            )
+        self._teacher = teacher
+
+        # Student
+        if not isinstance(student, Transformer):
+            raise TypeError(
+                f"`student` should be a calotron's `Transformer`, "
+                f"instead {type(student)} passed"
+            )
+        if student.output_depth != teacher.output_depth:
+            raise ValueError(
+                "`student` and `teacher` output depths should match, "
+                f"instead {student.output_depth} and "
+                f"{teacher.output_depth} passed"
+            )
+        self._student = student
+
+        # Discriminator
+        if discriminator is not None:
+            if not isinstance(discriminator, Discriminator):
+                raise TypeError(
+                    f"`discriminator` should be a calotron's `Discriminator`, "
+                    f"instead {type(discriminator)} passed"
+                )
+        self._discriminator = discriminator
+
+        # Latent sample shared by GigaGenerator teacher and student
+        self._shared_latent = (
+            isinstance(teacher, GigaGenerator)
+            and isinstance(student, GigaGenerator)
+            and teacher.mapping_latent_dim == student.mapping_latent_dim
+        )
+
+    def call(self, inputs) -> tuple:
+        source, target = inputs
+        t_out = self._teacher((source, target))
+        s_out = self._student((source, target))
+        return t_out, s_out
+
+    def summary(self, **kwargs) -> None:
+        print("_" * 65)
+        self._teacher.summary(**kwargs)
+        self._student.summary(**kwargs)
+        if self._discriminator is not None:
+            self._discriminator.summary(**kwargs)
+
+    def compile(
+        self,
+        student_optimizer="rmsprop",
+        attention_weight=0.0,
+        adversarial_loss=None,
+        adversarial_weight=0.1,
+        discriminator_optimizer="rmsprop",
+    ) -> None:
+        super().compile(weighted_metrics=[])
+
+        # Loss metrics
+        self._s_loss = keras.metrics.Mean(name="s_loss")
+        self._d_loss = keras.metrics.Mean(name="d_loss")
+
+        # Attention maps matching
+        assert isinstance(attention_weight, (int, float))
+        assert attention_weight >= 0.0
+        self._attn_weight = float(attention_weight)
+
+        # Adversarial term
+        if self._discriminator is not None:
+            if adversarial_loss is None:
+                raise ValueError(
+                    "`adversarial_loss` is required to train the student "
+                    "against the `discriminator`"
+                )
+            self._adv_loss = checkLoss(adversarial_loss)
+        else:
+            self._adv_loss = None
+        assert isinstance(adversarial_weight, (int, float))
+        assert adversarial_weight >= 0.0
+        self._adv_weight = float(adversarial_weight)
+
+        # Optimizers
+        self._s_opt = prepareOptimizer(
+            checkOptimizer(student_optimizer), model=self._student
+        )
+        if self._discriminator is not None:
+            self._d_opt = prepareOptimizer(
+                checkOptimizer(discriminator_optimizer), model=self._discriminator
+            )
+        else:
+            self._d_opt = None
+
+    def train_step(self, data) -> dict:
+        source, target, sample_weight = unpackData(data)
+
+        if self._adv_loss is not None:
+            self._d_train_step(source, target, sample_weight)
+        self._s_train_step(source, target, sample_weight)
+
+        train_dict = dict(s_loss=self._s_loss.result())
+        if self._adv_loss is not None:
+            train_dict.update(d_loss=self._d_loss.result())
+        return train_dict
+
+    def _s_train_step(self, source, target, sample_weight=None) -> None:
+        with tf.GradientTape() as tape:
+            loss = self._student_loss(source, target, sample_weight, training=True)
+            scaled_loss = getScaledLoss(self._s_opt, loss)
+        trainable_vars = self._student.trainable_variables
+        gradients = tape.gradient(scaled_loss, trainable_vars)
+        gradients = getUnscaledGradients(self._s_opt, gradients)
+        self._s_opt.apply_gradients(zip(gradients, trainable_vars))
+        self._s_loss.update_state(replicaSum(loss))
+
+    def _d_train_step(self, source, target, sample_weight=None) -> None:
+        with tf.GradientTape() as tape:
+            loss = self._adv_loss.discriminator_loss(
+                transformer=self._student,
+                discriminator=self._discriminator,
+                source=source,
+                target=target,
+                sample_weight=sample_weight,
+                training=True,
+            )
+            scaled_loss = getScaledLoss(self._d_opt, loss)
+        trainable_vars = self._discriminator.trainable_variables
+        gradients = tape.gradient(scaled_loss, trainable_vars)
+        gradients = getUnscaledGradients(self._d_opt, gradients)
+        self._d_opt.apply_gradients(zip(gradients, trainable_vars))
+        self._adv_loss.on_discriminator_update()
+        self._d_loss.update_state(replicaSum(loss))
+
+    def _student_loss(
+        self, source, target, sample_weight=None, training=True
+    ) -> tf.Tensor:
+        loss = self.distillation_loss(source, target, sample_weight, training)
+        if self._adv_loss is not None and self._adv_weight > 0.0:
+            adv_loss = self._adv_loss.transformer_loss(
+                transformer=self._student,
+                discriminator=self._discriminator,
+                source=source,
+                target=target,
+                sample_weight=sample_weight,
+                training=training,
+            )
+            loss += self._adv_weight * adv_loss
+        return loss
+
+    def distillation_loss(
+        self, source, target, sample_weight=None, training=True
+    ) -> tf.Tensor:
+        t_out, s_out, t_attn, s_attn = self._teacher_forcing(
+            source, target, training=training
+        )
+
+        if sample_weight is None:
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
+        mask = tf.cast(sample_weight > 0.0, dtype=target.dtype)
+
+        # Teacher-forced outputs matching
+        out_loss = tf.reduce_mean(tf.square(s_out - t_out), axis=-1)
+        loss = self._weighted_mean(out_loss * mask, sample_weight)
+
+        # Attention maps matching, averaged over heads since
+        # teacher and student may have a different number of them
+        if self._attn_weight > 0.0:
+            t_attn = tf.reduce_mean(t_attn, axis=1)
+            s_attn = tf.reduce_mean(s_attn, axis=1)
+            attn_loss = tf.reduce_sum(tf.square(s_attn - t_attn), axis=-1)
+            loss += self._attn_weight * self._weighted_mean(
+                attn_loss * mask, sample_weight
+            )
+        return loss
+
+    def _teacher_forcing(self, source, target, training=True) -> tuple:
+        if self._shared_latent:
+            t_enc_out, t_map_in = self._teacher.encode_source(source, training=False)
+            s_enc_out, s_map_in = self._student.encode_source(source, training=training)
+            latent_sample = tf.random.normal(
+                shape=(tf.shape(source)[0], self._student.mapping_latent_dim),
+                dtype=target.dtype,
+            )
+            t_map_out = self._teacher.map_latent(
+                t_map_in, latent_sample=latent_sample, training=False
+            )
+            t_out = self._teacher.synthesize(
+                target, t_map_out, t_enc_out, training=False
+            )
+            t_attn = self._teacher.attention_weights
+            s_map_out = self._student.map_latent(
+                s_map_in, latent_sample=latent_sample, training=training
+            )
+            s_out = self._student.synthesize(
+                target, s_map_out, s_enc_out, training=training
+            )
+            s_attn = self._student.attention_weights
+        else:
+            t_out = self._teacher((source, target), training=False)
+            t_attn = self._teacher.attention_weights
+            s_out = self._student((source, target), training=training)
+            s_attn = self._student.attention_weights
+
+        t_out = tf.stop_gradient(tf.cast(t_out, dtype=target.dtype))
+        t_attn = tf.stop_gradient(tf.cast(t_attn, dtype=target.dtype))
+        s_out = tf.cast(s_out, dtype=target.dtype)
+        s_attn = tf.cast(s_attn, dtype=target.dtype)
+        return t_out, s_out, t_attn, s_attn
+
+    def _weighted_mean(self, values, weights) -> tf.Tensor:
+        # Normalization over the global batch
+        norm = replicaSum(tf.stop_gradient(tf.reduce_sum(weights)))
+        return tf.reduce_sum(weights * values) / norm
+
+    def test_step(self, data) -> dict:
+        source, target, sample_weight = unpackData(data)
+
+        s_loss = self._student_loss(source, target, sample_weight, training=False)
+        self._s_loss.update_state(replicaSum(s_loss))
+        test_dict = dict(s_loss=self._s_loss.result())
+
+        if self._adv_loss is not None:
+            d_loss = self._adv_loss.discriminator_loss(
+                transformer=self._student,
+                discriminator=self._discriminator,
+                source=source,
+                target=target,
+                sample_weight=sample_weight,
+                training=False,
+            )
+            self._d_loss.update_state(replicaSum(d_loss))
+            test_dict.update(d_loss=self._d_loss.result())
+        return test_dict
+
+    def get_start_token(self, target) -> tf.Tensor:
+        return self._student.get_start_token(target)
+
+    @property
+    def teacher(self) -> Transformer:
+        return self._teacher
+
+    @property
+    def student(self) -> Transformer:
+        return self._student
+
+    @property
+    def discriminator(self):  # TODO: add Union[Discriminator, None]
+        return self._discriminator
+
+    @property
+    def metrics(self) -> list:
+        reset_states = [self._s_loss]
+        if self._adv_loss is not None:
+            reset_states += [self._d_loss]
+        return reset_states
+
+    @property
+    def student_optimizer(self) -> keras.optimizers.Optimizer:
+        return self._s_opt
+
+    @property
+    def discriminator_optimizer(self):  # TODO: add Union[Optimizer, None]
+        return self._d_opt
+
+    @property
+    def attention_weight(self) -> float:
+        return self._attn_weight
+
+    @property
+    def adversarial_weight(self) -> float:
+        return self._adv_weight
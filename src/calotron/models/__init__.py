@@ -1 +1,2 @@
 from .Calotron import Calotron
+from .Distiller import Distiller
@@ -39,11 +39,11 @@ class Discriminator(keras.Model):
             hidden_units=deepsets_hidden_units,
             dropout_rate=dropout_rate,
             name="deepsets",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
         if self._enable_batch_norm:
             self._batch_norm = keras.layers.BatchNormalization(
-                name="batch_norm", dtype=self.dtype
+                name="batch_norm", dtype=self.dtype_policy
             )
 
         # Final layers
@@ -97,7 +97,10 @@ class Discriminator(keras.Model):
         )
         return final_layers
 
-    def call(self, inputs, padding_mask=None) -> tf.Tensor:
+    def encode_source(self, source, training=None):  # TODO: add Union[None, tf.Tensor]
+        return None  # condition-unaware discriminators ignore the source
+
+    def call(self, inputs, padding_mask=None, source_memory=None) -> tf.Tensor:
         _, target = inputs
         out = self._deep_sets(target, padding_mask=padding_mask)
         if self._enable_batch_norm:
@@ -22,8 +22,14 @@ class GigaDiscriminator(Discriminator):
         seq_ord_max_length=512,
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
+        encoder_token_keep_rate=1.0,
+        encoder_token_score="energy",
+        encoder_token_energy_index=2,
         output_activation=None,
         pretrained_encoder_dir=None,
+        pretrained_encoder_mode="trainable",
         additional_encoder_layers=None,
         name=None,
         dtype=None,
@@ -55,9 +61,15 @@ class GigaDiscriminator(Discriminator):
                 seq_ord_max_length=seq_ord_max_length,
                 seq_ord_normalization=seq_ord_normalization,
                 enable_res_smoothing=enable_res_smoothing,
+                recompute_layers=recompute_layers,
+                layer_drop_rate=layer_drop_rate,
+                token_keep_rate=encoder_token_keep_rate,
+                token_score=encoder_token_score,
+                token_energy_index=encoder_token_energy_index,
                 pretrained_model_dir=pretrained_encoder_dir,
+                pretrained_mode=pretrained_encoder_mode,
                 name="pretrain_encoder",
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         else:
             self._encoder = Encoder(
@@ -72,8 +84,13 @@ class GigaDiscriminator(Discriminator):
                 seq_ord_max_length=seq_ord_max_length,
                 seq_ord_normalization=seq_ord_normalization,
                 enable_res_smoothing=enable_res_smoothing,
+                recompute_layers=recompute_layers,
+                layer_drop_rate=layer_drop_rate,
+                token_keep_rate=encoder_token_keep_rate,
+                token_score=encoder_token_score,
+                token_energy_index=encoder_token_energy_index,
                 name="encoder",
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
 
         # Sequence order embedding
@@ -83,7 +100,7 @@ class GigaDiscriminator(Discriminator):
             normalization=seq_ord_normalization,
             dropout_rate=dropout_rate,
             name="seq_ord_embed",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Decoder
@@ -99,9 +116,11 @@ class GigaDiscriminator(Discriminator):
             seq_ord_max_length=seq_ord_max_length,
             seq_ord_normalization=seq_ord_normalization,
             enable_res_smoothing=enable_res_smoothing,
+            recompute_layers=recompute_layers,
+            layer_drop_rate=layer_drop_rate,
             autoregressive_mode=False,
             name="decoder",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Final layers
@@ -118,16 +137,25 @@ class GigaDiscriminator(Discriminator):
             dtype=self.dtype,
         )
 
-    def call(self, inputs, padding_mask=None) -> tf.Tensor:
+    def encode_source(self, source, training=None) -> tf.Tensor:
+        enc_out = self._encoder(source, training=training)
+        return self._seq_ord_embed(
+            enc_out,
+            positions=self._encoder._last_token_positions,
+            training=training,
+        )
+
+    def call(self, inputs, padding_mask=None, source_memory=None) -> tf.Tensor:
         source, target = inputs
         if padding_mask is not None:
+            padding_mask = tf.cast(padding_mask, dtype=target.dtype)
             padding_mask = tf.tile(
                 padding_mask[:, :, None], (1, 1, tf.shape(target)[2])
             )
             target *= padding_mask
-        enc_out = self._encoder(source)
-        enc_out = self._seq_ord_embed(enc_out)
-        dec_out = self._decoder((target, enc_out))
+        if source_memory is None:
+            source_memory = self.encode_source(source)
+        dec_out = self._decoder((target, source_memory))
         out_avg = self._avg_pool(dec_out)
         out_max = self._max_pool(dec_out)
         out = self._concat([out_avg, out_max])
@@ -219,6 +247,26 @@ class GigaDiscriminator(Discriminator):
     def enable_res_smoothing(self) -> bool:
         return self._encoder.enable_res_smoothing
 
+    @property
+    def recompute_layers(self) -> bool:
+        return self._encoder.recompute_layers
+
+    @property
+    def layer_drop_rate(self) -> float:
+        return self._encoder.layer_drop_rate
+
+    @property
+    def encoder_token_keep_rate(self) -> float:
+        return self._encoder.token_keep_rate
+
+    @property
+    def encoder_token_score(self) -> str:
+        return self._encoder.token_score
+
+    @property
+    def encoder_token_energy_index(self) -> int:
+        return self._encoder.token_energy_index
+
     @property
     def output_activation(self):  # TODO: add Union[str, Activation]
         return self._output_activation
@@ -227,6 +275,10 @@ class GigaDiscriminator(Discriminator):
     def pretrained_encoder_dir(self):  # TODO: add Union[str, None]
         return self._encoder.pretrained_model_dir
 
+    @property
+    def pretrained_encoder_mode(self):  # TODO: add Union[str, None]
+        return self._encoder.pretrained_mode
+
     @property
     def additional_encoder_layers(self) -> int:
         return self._encoder.num_layers
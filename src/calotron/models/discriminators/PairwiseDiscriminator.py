@@ -38,7 +38,7 @@ class PairwiseDiscriminator(Discriminator):
             strides=deepsets_conv_strides,
             dropout_rate=dropout_rate,
             name="deepsets",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Final layers
@@ -84,7 +84,7 @@ class PairwiseDiscriminator(Discriminator):
 
         return pairs, mask_pairs
 
-    def call(self, inputs, padding_mask=None) -> tf.Tensor:
+    def call(self, inputs, padding_mask=None, source_memory=None) -> tf.Tensor:
         _, target = inputs
         pairs, mask_pairs = self._prepare_trainset(target, padding_mask=padding_mask)
         out = self._deep_sets(pairs, padding_mask=mask_pairs)
@@ -59,7 +59,7 @@ class ConvDeepSets(keras.Model):
                     kernel_initializer="glorot_uniform",
                     bias_initializer="zeros",
                     name=f"conv1D_{i}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 )
             )
         self._seq.append(
@@ -69,14 +69,14 @@ class ConvDeepSets(keras.Model):
                 kernel_initializer="glorot_uniform",
                 bias_initializer="zeros",
                 name=f"dense_{self._num_conv_layers}" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         )
         self._seq.append(
             keras.layers.Dropout(
                 self._dropout_rate,
                 name=f"dropout_{self._num_conv_layers}" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         )
         self._seq.append(
@@ -86,7 +86,7 @@ class ConvDeepSets(keras.Model):
                 kernel_initializer="he_normal",
                 bias_initializer="zeros",
                 name="dense_out" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         )
 
@@ -101,6 +101,7 @@ class ConvDeepSets(keras.Model):
 
     def call(self, x, padding_mask=None) -> tf.Tensor:
         if padding_mask is not None:
+            padding_mask = tf.cast(padding_mask, dtype=x.dtype)
             padding_mask = tf.tile(padding_mask[:, :, None], (1, 1, tf.shape(x)[2]))
             x *= padding_mask
         for layer in self._seq:
@@ -2,6 +2,8 @@ import tensorflow as tf
 from tensorflow import keras
 
 from calotron.layers import DecoderLayer, SeqOrderEmbedding
+from calotron.utils.layerdrop import dropLayer, layerDropRates
+from calotron.utils.recompute import recomputeLayer
 
 
 class Decoder(keras.Model):
@@ -19,6 +21,8 @@ class Decoder(keras.Model):
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
         autoregressive_mode=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
         name=None,
         dtype=None,
     ) -> None:
@@ -33,6 +37,16 @@ class Decoder(keras.Model):
         assert isinstance(enable_res_smoothing, bool)
         self._enable_res_smoothing = enable_res_smoothing
 
+        # Activations recomputed in the backward pass
+        assert isinstance(recompute_layers, bool)
+        self._recompute_layers = recompute_layers
+
+        # Stochastic depth (layers skipped during training)
+        self._layer_drop_rate = float(layer_drop_rate)
+        self._layer_drop_rates = layerDropRates(
+            num_layers=self._num_layers, layer_drop_rate=layer_drop_rate
+        )
+
         # Sequence order embedding
         self._seq_ord_embed = SeqOrderEmbedding(
             latent_dim=seq_ord_latent_dim,
@@ -40,7 +54,7 @@ class Decoder(keras.Model):
             normalization=seq_ord_normalization,
             dropout_rate=dropout_rate,
             name="seq_ord_embed" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Smoothing layer
@@ -52,12 +66,12 @@ class Decoder(keras.Model):
                     kernel_initializer="glorot_normal",
                     bias_initializer="zeros",
                     name="res_smooth_dense" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dropout(
                     dropout_rate,
                     name="res_smooth_dropout" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
             ]
         else:
@@ -75,20 +89,34 @@ class Decoder(keras.Model):
                 dropout_rate=dropout_rate,
                 autoregressive_mode=autoregressive_mode,
                 name=f"dec_layer_{i}" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
             for i in range(self._num_layers)
         ]
         self._last_attn_scores = None
 
-    def call(self, inputs) -> tf.Tensor:
+    def call(self, inputs, training=None) -> tf.Tensor:
         x, condition = inputs
         out = self._seq_ord_embed(x)
         if self._smooth_seq is not None:
             for layer in self._smooth_seq:
                 out = layer(out)
         for i in range(self._num_layers):
-            out = self._dec_layers[i](out, condition)
+            if training and self._layer_drop_rates[i] > 0.0:
+                out = dropLayer(
+                    self._dec_layers[i],
+                    out,
+                    condition,
+                    drop_rate=self._layer_drop_rates[i],
+                    training=training,
+                    recompute=self._recompute_layers,
+                )
+            elif self._recompute_layers and training:
+                out = recomputeLayer(
+                    self._dec_layers[i], out, condition, training=training
+                )
+            else:
+                out = self._dec_layers[i](out, condition)
         self._last_attn_scores = self._dec_layers[-1]._attn_scores
         return out
 
@@ -140,6 +168,14 @@ class Decoder(keras.Model):
     def enable_res_smoothing(self) -> bool:
         return self._enable_res_smoothing
 
+    @property
+    def recompute_layers(self) -> bool:
+        return self._recompute_layers
+
+    @property
+    def layer_drop_rate(self) -> float:
+        return self._layer_drop_rate
+
     @property
     def autoregressive_mode(self) -> bool:
         return self._dec_layers[0]._autoregressive_mode
@@ -45,14 +45,14 @@ class DeepSets(keras.Model):
                     kernel_initializer="glorot_uniform",
                     bias_initializer="zeros",
                     name=f"dense_{i}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 )
             )
             self._seq.append(
                 keras.layers.Dropout(
                     self._dropout_rate,
                     name=f"dropout_{i}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 )
             )
         self._seq.append(
@@ -62,7 +62,7 @@ class DeepSets(keras.Model):
                 kernel_initializer="he_normal",
                 bias_initializer="zeros",
                 name="dense_out" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         )
 
@@ -77,6 +77,7 @@ class DeepSets(keras.Model):
 
     def call(self, x, padding_mask=None) -> tf.Tensor:
         if padding_mask is not None:
+            padding_mask = tf.cast(padding_mask, dtype=x.dtype)
             padding_mask = tf.tile(padding_mask[:, :, None], (1, 1, tf.shape(x)[2]))
             x *= padding_mask
         for layer in self._seq:
@@ -2,6 +2,10 @@ import tensorflow as tf
 from tensorflow import keras
 
 from calotron.layers import EncoderLayer, SeqOrderEmbedding
+from calotron.utils.layerdrop import dropLayer, layerDropRates
+from calotron.utils.recompute import recomputeLayer
+
+TOKEN_SCORES = ["energy", "learned"]
 
 
 class Encoder(keras.Model):
@@ -18,6 +22,11 @@ class Encoder(keras.Model):
         seq_ord_max_length=512,
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
+        token_keep_rate=1.0,
+        token_score="energy",
+        token_energy_index=2,
         name=None,
         dtype=None,
     ) -> None:
@@ -32,6 +41,43 @@ class Encoder(keras.Model):
         assert isinstance(enable_res_smoothing, bool)
         self._enable_res_smoothing = enable_res_smoothing
 
+        # Activations recomputed in the backward pass
+        assert isinstance(recompute_layers, bool)
+        self._recompute_layers = recompute_layers
+
+        # Stochastic depth (layers skipped during training)
+        self._layer_drop_rate = float(layer_drop_rate)
+        self._layer_drop_rates = layerDropRates(
+            num_layers=self._num_layers, layer_drop_rate=layer_drop_rate
+        )
+
+        # Token pruning between layers
+        assert isinstance(token_keep_rate, (int, float))
+        assert (token_keep_rate > 0.0) and (token_keep_rate <= 1.0)
+        self._token_keep_rate = float(token_keep_rate)
+        assert isinstance(token_score, str)
+        if token_score not in TOKEN_SCORES:
+            raise ValueError(
+                "`token_score` should be selected "
+                f"in {TOKEN_SCORES}, instead "
+                f"'{token_score}' passed"
+            )
+        self._token_score = token_score
+        assert isinstance(token_energy_index, (int, float))
+        self._token_energy_index = int(token_energy_index)
+        if self._token_keep_rate < 1.0 and self._token_score == "learned":
+            self._token_scorer = keras.layers.Dense(
+                units=1,
+                activation=None,
+                kernel_initializer="glorot_normal",
+                bias_initializer="zeros",
+                name="token_scorer" if name else None,
+                dtype=self.dtype_policy,
+            )
+        else:
+            self._token_scorer = None
+        self._last_token_positions = None
+
         # Sequence order embedding
         self._seq_ord_embed = SeqOrderEmbedding(
             latent_dim=seq_ord_latent_dim,
@@ -39,7 +85,7 @@ class Encoder(keras.Model):
             normalization=seq_ord_normalization,
             dropout_rate=dropout_rate,
             name="seq_ord_embed" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Smoothing layer
@@ -51,12 +97,12 @@ class Encoder(keras.Model):
                     kernel_initializer="glorot_normal",
                     bias_initializer="zeros",
                     name="res_smooth_dense" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dropout(
                     dropout_rate,
                     name="res_smooth_dropout" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
             ]
         else:
@@ -73,20 +119,75 @@ class Encoder(keras.Model):
                 mlp_units=mlp_units,
                 dropout_rate=dropout_rate,
                 name=f"enc_layer_{i}" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
             for i in range(self._num_layers)
         ]
 
-    def call(self, x) -> tf.Tensor:
+    def call(self, x, training=None) -> tf.Tensor:
         out = self._seq_ord_embed(x)
         if self._smooth_seq is not None:
             for layer in self._smooth_seq:
                 out = layer(out)
+        return self._call_enc_layers(x, out, training=training)
+
+    def _call_enc_layers(self, x, out, training=None) -> tf.Tensor:
+        positions = None
+        if self._token_keep_rate < 1.0:
+            # Padded tokens (all-zero inputs) are the first to be dropped
+            valid = tf.reduce_any(tf.not_equal(x, 0.0), axis=-1)
+            energy = tf.cast(x[:, :, self._token_energy_index], dtype=tf.float32)
+            positions = tf.tile(tf.range(tf.shape(x)[1])[None, :], (tf.shape(x)[0], 1))
         for i in range(self._num_layers):
-            out = self._enc_layers[i](out)
+            out = self._call_enc_layer(i, out, training=training)
+            if self._token_keep_rate < 1.0 and i < self._num_layers - 1:
+                out, valid, energy, positions = self._prune_tokens(
+                    out, valid, energy, positions
+                )
+
+        # Original positions of the surviving tokens, to be embedded
+        # in place of 0, ..., k-1 by the models reading the encoder output
+        self._last_token_positions = positions
         return out
 
+    def _prune_tokens(self, out, valid, energy, positions) -> tuple:
+        if self._token_scorer is not None:
+            scores = tf.cast(self._token_scorer(out)[:, :, 0], dtype=tf.float32)
+        else:
+            scores = energy
+        masked_scores = tf.where(valid, scores, tf.float32.min)
+
+        # Surviving tokens kept in their original (energy) order
+        length = tf.cast(tf.shape(out)[1], dtype=tf.float32)
+        k = tf.cast(tf.math.ceil(self._token_keep_rate * length), dtype=tf.int32)
+        _, indices = tf.math.top_k(masked_scores, k=tf.maximum(k, 1))
+        indices = tf.sort(indices, axis=-1)
+        out = tf.gather(out, indices, batch_dims=1)
+        valid = tf.gather(valid, indices, batch_dims=1)
+        energy = tf.gather(energy, indices, batch_dims=1)
+        positions = tf.gather(positions, indices, batch_dims=1)
+
+        if self._token_scorer is not None:
+            # Straight-through gate: unit value, gradient flowing to the scorer
+            scores = tf.gather(scores, indices, batch_dims=1)
+            gate = 1.0 + scores - tf.stop_gradient(scores)
+            out *= tf.cast(gate, dtype=out.dtype)[:, :, None]
+        return out, valid, energy, positions
+
+    def _call_enc_layer(self, i, x, training=None) -> tf.Tensor:
+        if training and self._layer_drop_rates[i] > 0.0:
+            return dropLayer(
+                self._enc_layers[i],
+                x,
+                drop_rate=self._layer_drop_rates[i],
+                training=training,
+                recompute=self._recompute_layers,
+            )
+        elif self._recompute_layers and training:
+            return recomputeLayer(self._enc_layers[i], x, training=training)
+        else:
+            return self._enc_layers[i](x)
+
     @property
     def output_depth(self) -> int:
         return self._enc_layers[0].output_depth
@@ -134,3 +235,23 @@ class Encoder(keras.Model):
     @property
     def enable_res_smoothing(self) -> bool:
         return self._enable_res_smoothing
+
+    @property
+    def recompute_layers(self) -> bool:
+        return self._recompute_layers
+
+    @property
+    def layer_drop_rate(self) -> float:
+        return self._layer_drop_rate
+
+    @property
+    def token_keep_rate(self) -> float:
+        return self._token_keep_rate
+
+    @property
+    def token_score(self) -> str:
+        return self._token_score
+
+    @property
+    def token_energy_index(self) -> int:
+        return self._token_energy_index
@@ -55,17 +55,21 @@ class MappingNet(keras.Model):
                     kernel_initializer="glorot_uniform",
                     bias_initializer="zeros",
                     name=f"dense_{i}" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 )
             )
             self._seq.append(
                 keras.layers.LeakyReLU(
-                    alpha=LEAKY_ALPHA, name=f"leaky_relu_{i}" if name else None
+                    alpha=LEAKY_ALPHA,
+                    name=f"leaky_relu_{i}" if name else None,
+                    dtype=self.dtype_policy,
                 )
             )
             self._seq.append(
                 keras.layers.Dropout(
-                    rate=self._dropout_rate, name=f"dropout_{i}" if name else None
+                    rate=self._dropout_rate,
+                    name=f"dropout_{i}" if name else None,
+                    dtype=self.dtype_policy,
                 )
             )
         self._seq.append(
@@ -75,12 +79,12 @@ class MappingNet(keras.Model):
                 kernel_initializer="glorot_uniform",
                 bias_initializer="zeros",
                 name="dense_out" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         )
 
-    def call(self, x) -> tf.Tensor:
-        x = self._prepare_input(x, seed=None)
+    def call(self, x, latent_sample=None) -> tf.Tensor:
+        x = self._prepare_input(x, seed=None, latent_sample=latent_sample)
         for layer in self._seq:
             x = layer(x)
         return x
@@ -92,14 +96,17 @@ class MappingNet(keras.Model):
             x = layer(x)
         return x
 
-    def _prepare_input(self, x, seed=None) -> tf.Tensor:
-        latent_sample = tf.random.normal(
-            shape=(tf.shape(x)[0], self._latent_dim),
-            mean=0.0,
-            stddev=1.0,
-            dtype=self.dtype,
-            seed=seed,
-        )
+    def _prepare_input(self, x, seed=None, latent_sample=None) -> tf.Tensor:
+        if latent_sample is None:
+            latent_sample = tf.random.normal(
+                shape=(tf.shape(x)[0], self._latent_dim),
+                mean=0.0,
+                stddev=1.0,
+                dtype=x.dtype,
+                seed=seed,
+            )
+        else:
+            latent_sample = tf.cast(latent_sample, dtype=x.dtype)
         x = tf.concat([x, latent_sample], axis=-1)
         return x
 
@@ -1,10 +1,15 @@
+import hashlib
 import os
 
+import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 
 from calotron.models.players.Encoder import Encoder
 
+PRETRAINED_MODES = ["trainable", "frozen", "cached"]
+HASH_CHUNK_SIZE = 10_000
+
 
 class PretrainedEncoder(Encoder):
     def __init__(
@@ -20,7 +25,13 @@ class PretrainedEncoder(Encoder):
         seq_ord_max_length=512,
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
+        token_keep_rate=1.0,
+        token_score="energy",
+        token_energy_index=2,
         pretrained_model_dir=None,
+        pretrained_mode="trainable",
         name=None,
         dtype=None,
     ) -> None:
@@ -36,6 +47,11 @@ class PretrainedEncoder(Encoder):
             seq_ord_max_length=seq_ord_max_length,
             seq_ord_normalization=seq_ord_normalization,
             enable_res_smoothing=enable_res_smoothing,
+            recompute_layers=recompute_layers,
+            layer_drop_rate=layer_drop_rate,
+            token_keep_rate=token_keep_rate,
+            token_score=token_score,
+            token_energy_index=token_energy_index,
             name=name,
             dtype=dtype,
         )
@@ -49,27 +65,105 @@ class PretrainedEncoder(Encoder):
                 )
             self._pretrained_model_dir = pretrained_model_dir
             self._pretrained_model = keras.models.load_model(pretrained_model_dir)
-            self._add = keras.layers.Add()
+            self._add = keras.layers.Add(dtype=self.dtype_policy)
         else:
             self._pretrained_model_dir = None
             self._pretrained_model = None
             self._add = None
 
-    def call(self, x) -> tf.Tensor:
+        # Pretrained model mode
+        assert isinstance(pretrained_mode, str)
+        if pretrained_mode not in PRETRAINED_MODES:
+            raise ValueError(
+                "`pretrained_mode` should be selected "
+                f"in {PRETRAINED_MODES}, instead "
+                f"'{pretrained_mode}' passed"
+            )
+        self._pretrained_mode = pretrained_mode
+        if self._pretrained_model is not None:
+            # Frozen (or cached) weights are excluded from the training
+            self._pretrained_model.trainable = pretrained_mode == "trainable"
+
+    def call(self, x, training=None) -> tf.Tensor:
         if self._pretrained_model is not None:
+            if self._pretrained_mode == "cached":
+                # Embeddings precomputed and appended to the raw source
+                pretrain_out = x[:, :, -self.output_depth :]
+                x = x[:, :, : -self.output_depth]
+            else:
+                pretrain_out = self._pretrained_model(x)
             out = self._seq_ord_embed(x)
             if self._smooth_seq is not None:
                 for layer in self._smooth_seq:
                     out = layer(out)
-            if self._pretrained_model is not None:
-                pretrain_out = self._pretrained_model(x)
-                out = self._add([out, pretrain_out])
-            for i in range(self._num_layers):
-                out = self._enc_layers[i](out)
-            return out
+            out = self._add([out, pretrain_out])
+            return self._call_enc_layers(x, out, training=training)
+        else:
+            return super().call(x, training=training)
+
+    def cache_source(self, source, cache_dir=None, batch_size=1024) -> np.ndarray:
+        if self._pretrained_model is None:
+            raise ValueError(
+                "No pretrained model available to compute the embeddings, "
+                "`pretrained_model_dir` should be passed"
+            )
+        assert isinstance(batch_size, (int, float))
+        assert batch_size >= 1
+        batch_size = int(batch_size)
+
+        if cache_dir is not None:
+            assert isinstance(cache_dir, str)
+            os.makedirs(cache_dir, exist_ok=True)
+            fname = (
+                f"{cache_dir}/pretrained_embeddings"
+                f"_{self._model_hash()[:16]}_{self._data_hash(source)[:16]}.npy"
+            )
+            if os.path.exists(fname):
+                return np.load(fname, mmap_mode="r")
+
+        # Raw source with the pretrained embeddings appended
+        shape = (*np.shape(source)[:2], np.shape(source)[2] + self.output_depth)
+        if cache_dir is not None:
+            tmp_fname = f"{fname[:-4]}_{os.getpid()}.tmp.npy"
+            cached = np.lib.format.open_memmap(
+                tmp_fname, mode="w+", dtype=np.float32, shape=shape
+            )
         else:
-            return super().call(x)
+            cached = np.empty(shape=shape, dtype=np.float32)
+        for start in range(0, shape[0], batch_size):
+            batch = np.asarray(source[start : start + batch_size], dtype=np.float32)
+            emb = self._pretrained_model(batch, training=False)
+            cached[start : start + batch_size] = np.concatenate(
+                [batch, np.asarray(emb, dtype=np.float32)], axis=-1
+            )
+
+        if cache_dir is not None:
+            cached.flush()
+            del cached
+            os.replace(tmp_fname, fname)  # no partially-written caches
+            return np.load(fname, mmap_mode="r")
+        return cached
+
+    def _model_hash(self) -> str:
+        model_hash = hashlib.sha256()
+        for var in self._pretrained_model.weights:
+            model_hash.update(var.name.encode())
+            model_hash.update(np.ascontiguousarray(var.numpy()).tobytes())
+        return model_hash.hexdigest()
+
+    @staticmethod
+    def _data_hash(source) -> str:
+        data_hash = hashlib.sha256()
+        data_hash.update(str(np.shape(source)).encode())
+        for start in range(0, len(source), HASH_CHUNK_SIZE):
+            chunk = np.asarray(source[start : start + HASH_CHUNK_SIZE], np.float32)
+            data_hash.update(np.ascontiguousarray(chunk).tobytes())
+        return data_hash.hexdigest()
 
     @property
     def pretrained_model_dir(self):  # TODO: add Union[str, None]
         return self._pretrained_model_dir
+
+    @property
+    def pretrained_mode(self) -> str:
+        return self._pretrained_mode
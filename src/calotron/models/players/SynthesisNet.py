@@ -2,6 +2,8 @@ import tensorflow as tf
 from tensorflow import keras
 
 from calotron.layers import SeqOrderEmbedding, SynthesisLayer
+from calotron.utils.layerdrop import dropLayer, layerDropRates
+from calotron.utils.recompute import recomputeLayer
 
 LN_EPSILON = 0.001
 ATTN_DROPOUT_RATE = 0.0
@@ -20,6 +22,8 @@ class SynthesisNet(keras.Model):
         seq_ord_max_length=512,
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
         name=None,
         dtype=None,
     ) -> None:
@@ -34,6 +38,16 @@ class SynthesisNet(keras.Model):
         assert isinstance(enable_res_smoothing, bool)
         self._enable_res_smoothing = enable_res_smoothing
 
+        # Activations recomputed in the backward pass
+        assert isinstance(recompute_layers, bool)
+        self._recompute_layers = recompute_layers
+
+        # Stochastic depth (layers skipped during training)
+        self._layer_drop_rate = float(layer_drop_rate)
+        self._layer_drop_rates = layerDropRates(
+            num_layers=self._num_layers, layer_drop_rate=layer_drop_rate
+        )
+
         # Sequence order embedding
         self._seq_ord_embed = SeqOrderEmbedding(
             latent_dim=seq_ord_latent_dim,
@@ -41,7 +55,7 @@ class SynthesisNet(keras.Model):
             normalization=seq_ord_normalization,
             dropout_rate=dropout_rate,
             name="seq_ord_embed" if name else None,
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Smoothing layer
@@ -53,12 +67,12 @@ class SynthesisNet(keras.Model):
                     kernel_initializer="glorot_normal",
                     bias_initializer="zeros",
                     name="res_smooth_dense" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
                 keras.layers.Dropout(
                     dropout_rate,
                     name="res_smooth_dropout" if name else None,
-                    dtype=self.dtype,
+                    dtype=self.dtype_policy,
                 ),
             ]
         else:
@@ -73,20 +87,35 @@ class SynthesisNet(keras.Model):
                 mlp_units=mlp_units,
                 dropout_rate=dropout_rate,
                 name=f"synth_layer_{i}" if name else None,
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
             for i in range(self._num_layers)
         ]
         self._last_attn_scores = None
 
-    def call(self, inputs) -> tf.Tensor:
+    def call(self, inputs, training=None) -> tf.Tensor:
         x, w, condition = inputs
         out = self._seq_ord_embed(x)
         if self._smooth_seq is not None:
             for layer in self._smooth_seq:
                 out = layer(out)
         for i in range(self._num_layers):
-            out = self._synth_layers[i](out, w, condition)
+            if training and self._layer_drop_rates[i] > 0.0:
+                out = dropLayer(
+                    self._synth_layers[i],
+                    out,
+                    w,
+                    condition,
+                    drop_rate=self._layer_drop_rates[i],
+                    training=training,
+                    recompute=self._recompute_layers,
+                )
+            elif self._recompute_layers and training:
+                out = recomputeLayer(
+                    self._synth_layers[i], out, w, condition, training=training
+                )
+            else:
+                out = self._synth_layers[i](out, w, condition)
         self._last_attn_scores = self._synth_layers[-1]._attn_scores
         return out
 
@@ -129,3 +158,11 @@ class SynthesisNet(keras.Model):
     @property
     def enable_res_smoothing(self) -> bool:
         return self._enable_res_smoothing
+
+    @property
+    def recompute_layers(self) -> bool:
+        return self._recompute_layers
+
+    @property
+    def layer_drop_rate(self) -> float:
+        return self._layer_drop_rate
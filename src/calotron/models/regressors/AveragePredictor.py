@@ -46,7 +46,7 @@ class AveragePredictor(keras.Model):
             seq_ord_normalization=seq_ord_normalization,
             enable_res_smoothing=enable_res_smoothing,
             name="encoder",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Final layers
@@ -26,9 +26,15 @@ class GigaGenerator(Transformer):
         seq_ord_max_length=512,
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
+        encoder_token_keep_rate=1.0,
+        encoder_token_score="energy",
+        encoder_token_energy_index=2,
         output_activations=None,
         start_token_initializer="ones",
         pretrained_encoder_dir=None,
+        pretrained_encoder_mode="trainable",
         additional_encoder_layers=None,
         name=None,
         dtype=None,
@@ -68,9 +74,15 @@ class GigaGenerator(Transformer):
                 seq_ord_max_length=seq_ord_max_length,
                 seq_ord_normalization=seq_ord_normalization,
                 enable_res_smoothing=enable_res_smoothing,
+                recompute_layers=recompute_layers,
+                layer_drop_rate=layer_drop_rate,
+                token_keep_rate=encoder_token_keep_rate,
+                token_score=encoder_token_score,
+                token_energy_index=encoder_token_energy_index,
                 pretrained_model_dir=pretrained_encoder_dir,
+                pretrained_mode=pretrained_encoder_mode,
                 name="pretrain_encoder",
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         else:
             self._encoder = Encoder(
@@ -85,14 +97,23 @@ class GigaGenerator(Transformer):
                 seq_ord_max_length=seq_ord_max_length,
                 seq_ord_normalization=seq_ord_normalization,
                 enable_res_smoothing=enable_res_smoothing,
+                recompute_layers=recompute_layers,
+                layer_drop_rate=layer_drop_rate,
+                token_keep_rate=encoder_token_keep_rate,
+                token_score=encoder_token_score,
+                token_energy_index=encoder_token_energy_index,
                 name="encoder",
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
 
         # MappingNet
-        self._avg_pool = keras.layers.GlobalAveragePooling1D(name="avg_pool")
-        self._max_pool = keras.layers.GlobalMaxPooling1D(name="max_pool")
-        self._concat = keras.layers.Concatenate(name="concat")
+        self._avg_pool = keras.layers.GlobalAveragePooling1D(
+            name="avg_pool", dtype=self.dtype_policy
+        )
+        self._max_pool = keras.layers.GlobalMaxPooling1D(
+            name="max_pool", dtype=self.dtype_policy
+        )
+        self._concat = keras.layers.Concatenate(name="concat", dtype=self.dtype_policy)
         self._map_net = MappingNet(
             output_dim=synthesis_depth,
             latent_dim=mapping_latent_dim,
@@ -101,7 +122,7 @@ class GigaGenerator(Transformer):
             dropout_rate=dropout_rate,
             output_activation=None,
             name="map_net",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Sequence order embedding
@@ -111,7 +132,7 @@ class GigaGenerator(Transformer):
             normalization=seq_ord_normalization,
             dropout_rate=dropout_rate,
             name="seq_ord_embed",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # SynthesisNet
@@ -126,8 +147,10 @@ class GigaGenerator(Transformer):
             seq_ord_max_length=seq_ord_max_length,
             seq_ord_normalization=seq_ord_normalization,
             enable_res_smoothing=enable_res_smoothing,
+            recompute_layers=recompute_layers,
+            layer_drop_rate=layer_drop_rate,
             name="synth_net",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Final layers
@@ -139,13 +162,29 @@ class GigaGenerator(Transformer):
 
     def call(self, inputs) -> tf.Tensor:
         source, target = inputs
-        target = self._prepare_input_target(target)
-        enc_out = self._encoder(source)
+        enc_out, map_in = self.encode_source(source)
+        map_out = self.map_latent(map_in)
+        out = self.synthesize(target, map_out, enc_out)
+        return out
+
+    def encode_source(self, source, training=None) -> tuple:
+        enc_out = self._encoder(source, training=training)
         enc_out_avg = self._avg_pool(enc_out)
         enc_out_max = self._max_pool(enc_out)
-        map_out = self._map_net(self._concat([enc_out_avg, enc_out_max]))
-        enc_out = self._seq_ord_embed(enc_out)
-        synth_out = self._synth_net((target, map_out, enc_out))
+        map_in = self._concat([enc_out_avg, enc_out_max])
+        enc_out = self._seq_ord_embed(
+            enc_out, positions=self._encoder._last_token_positions
+        )
+        return enc_out, map_in
+
+    def map_latent(self, map_input, latent_sample=None, training=None) -> tf.Tensor:
+        return self._map_net(map_input, latent_sample=latent_sample, training=training)
+
+    def synthesize(self, target, map_output, source_memory, training=None) -> tf.Tensor:
+        target = self._prepare_input_target(target)
+        synth_out = self._synth_net(
+            (target, map_output, source_memory), training=training
+        )
         out = self._output_layer(synth_out)
         if self._filter is not None:
             out = self._filter(out)
@@ -211,6 +250,26 @@ class GigaGenerator(Transformer):
     def enable_res_smoothing(self) -> bool:
         return self._encoder.enable_res_smoothing
 
+    @property
+    def recompute_layers(self) -> bool:
+        return self._encoder.recompute_layers
+
+    @property
+    def layer_drop_rate(self) -> float:
+        return self._encoder.layer_drop_rate
+
+    @property
+    def encoder_token_keep_rate(self) -> float:
+        return self._encoder.token_keep_rate
+
+    @property
+    def encoder_token_score(self) -> str:
+        return self._encoder.token_score
+
+    @property
+    def encoder_token_energy_index(self) -> int:
+        return self._encoder.token_energy_index
+
     @property
     def attention_weights(self) -> tf.Tensor:
         return self._synth_net._last_attn_scores
@@ -37,13 +37,13 @@ class OptionalTransformer(Transformer):
 
         # Encoder options
         assert isinstance(encoder_options, dict)
-        encoder_options.update(dict(name="encoder", dtype=self.dtype))
+        encoder_options.update(dict(name="encoder", dtype=self.dtype_policy))
         self._encoder_options = encoder_options
 
         # Decoder options
         assert isinstance(decoder_options, dict)
         decoder_options.update(
-            dict(autoregressive_mode=True, name="decoder", dtype=self.dtype)
+            dict(autoregressive_mode=True, name="decoder", dtype=self.dtype_policy)
         )
         self._decoder_options = decoder_options
 
@@ -76,7 +76,7 @@ class OptionalTransformer(Transformer):
             normalization=encoder_options["seq_ord_normalization"],
             dropout_rate=encoder_options["dropout_rate"],
             name="seq_ord_embed",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Decoder
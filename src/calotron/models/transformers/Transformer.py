@@ -23,9 +23,15 @@ class Transformer(keras.Model):
         seq_ord_max_length=512,
         seq_ord_normalization=10_000,
         enable_res_smoothing=True,
+        recompute_layers=False,
+        layer_drop_rate=0.0,
+        encoder_token_keep_rate=1.0,
+        encoder_token_score="energy",
+        encoder_token_energy_index=2,
         output_activations=None,
         start_token_initializer="ones",
         pretrained_encoder_dir=None,
+        pretrained_encoder_mode="trainable",
         additional_encoder_layers=None,
         name=None,
         dtype=None,
@@ -65,9 +71,15 @@ class Transformer(keras.Model):
                 seq_ord_max_length=seq_ord_max_length,
                 seq_ord_normalization=seq_ord_normalization,
                 enable_res_smoothing=enable_res_smoothing,
+                recompute_layers=recompute_layers,
+                layer_drop_rate=layer_drop_rate,
+                token_keep_rate=encoder_token_keep_rate,
+                token_score=encoder_token_score,
+                token_energy_index=encoder_token_energy_index,
                 pretrained_model_dir=pretrained_encoder_dir,
+                pretrained_mode=pretrained_encoder_mode,
                 name="pretrain_encoder",
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
         else:
             self._encoder = Encoder(
@@ -82,8 +94,13 @@ class Transformer(keras.Model):
                 seq_ord_max_length=seq_ord_max_length,
                 seq_ord_normalization=seq_ord_normalization,
                 enable_res_smoothing=enable_res_smoothing,
+                recompute_layers=recompute_layers,
+                layer_drop_rate=layer_drop_rate,
+                token_keep_rate=encoder_token_keep_rate,
+                token_score=encoder_token_score,
+                token_energy_index=encoder_token_energy_index,
                 name="encoder",
-                dtype=self.dtype,
+                dtype=self.dtype_policy,
             )
 
         # Sequence order embedding
@@ -93,7 +110,7 @@ class Transformer(keras.Model):
             normalization=seq_ord_normalization,
             dropout_rate=dropout_rate,
             name="seq_ord_embed",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Decoder
@@ -109,9 +126,11 @@ class Transformer(keras.Model):
             seq_ord_max_length=seq_ord_max_length,
             seq_ord_normalization=seq_ord_normalization,
             enable_res_smoothing=enable_res_smoothing,
+            recompute_layers=recompute_layers,
+            layer_drop_rate=layer_drop_rate,
             autoregressive_mode=True,
             name="decoder",
-            dtype=self.dtype,
+            dtype=self.dtype_policy,
         )
 
         # Final layers
@@ -148,7 +167,9 @@ class Transformer(keras.Model):
         source, target = inputs
         target = self._prepare_input_target(target)
         enc_out = self._encoder(source)
-        enc_out = self._seq_ord_embed(enc_out)
+        enc_out = self._seq_ord_embed(
+            enc_out, positions=self._encoder._last_token_positions
+        )
         dec_out = self._decoder((target, enc_out))
         out = self._output_layer(dec_out)
         if self._filter is not None:
@@ -157,10 +178,14 @@ class Transformer(keras.Model):
 
     def _prepare_input_target(self, target) -> tf.Tensor:
         if self._start_token_initializer == "zeros":
-            start_token = tf.zeros((tf.shape(target)[0], 1, tf.shape(target)[2]))
+            start_token = tf.zeros(
+                (tf.shape(target)[0], 1, tf.shape(target)[2]), dtype=target.dtype
+            )
         elif self._start_token_initializer == "ones":
-            zeros = tf.zeros((tf.shape(target)[0], 1, 2))
-            ones = tf.ones((tf.shape(target)[0], 1, tf.shape(target)[2] - 2))
+            zeros = tf.zeros((tf.shape(target)[0], 1, 2), dtype=target.dtype)
+            ones = tf.ones(
+                (tf.shape(target)[0], 1, tf.shape(target)[2] - 2), dtype=target.dtype
+            )
             start_token = tf.concat([zeros, ones], axis=-1)
         elif self._start_token_initializer == "means":
             start_token = tf.reduce_mean(target, axis=1)[:, None, :]
@@ -168,10 +193,14 @@ class Transformer(keras.Model):
 
     def get_start_token(self, target) -> tf.Tensor:
         if self._start_token_initializer == "zeros":
-            start_token = tf.zeros((tf.shape(target)[0], tf.shape(target)[2]))
+            start_token = tf.zeros(
+                (tf.shape(target)[0], tf.shape(target)[2]), dtype=target.dtype
+            )
         elif self._start_token_initializer == "ones":
-            zeros = tf.zeros((tf.shape(target)[0], 2))
-            ones = tf.ones((tf.shape(target)[0], tf.shape(target)[2] - 2))
+            zeros = tf.zeros((tf.shape(target)[0], 2), dtype=target.dtype)
+            ones = tf.ones(
+                (tf.shape(target)[0], tf.shape(target)[2] - 2), dtype=target.dtype
+            )
             start_token = tf.concat([zeros, ones], axis=-1)
         elif self._start_token_initializer == "means":  # TODO: fix it
             start_token = tf.reduce_mean(target, axis=(0, 1))
@@ -266,6 +295,26 @@ class Transformer(keras.Model):
     def enable_res_smoothing(self) -> bool:
         return self._encoder.enable_res_smoothing
 
+    @property
+    def recompute_layers(self) -> bool:
+        return self._encoder.recompute_layers
+
+    @property
+    def layer_drop_rate(self) -> float:
+        return self._encoder.layer_drop_rate
+
+    @property
+    def encoder_token_keep_rate(self) -> float:
+        return self._encoder.token_keep_rate
+
+    @property
+    def encoder_token_score(self) -> str:
+        return self._encoder.token_score
+
+    @property
+    def encoder_token_energy_index(self) -> int:
+        return self._encoder.token_energy_index
+
     @property
     def output_activations(self):  # TODO: add Union[list, None]
         return self._output_activations
@@ -278,6 +327,10 @@ class Transformer(keras.Model):
     def pretrained_encoder_dir(self):  # TODO: add Union[str, None]
         return self._encoder.pretrained_model_dir
 
+    @property
+    def pretrained_encoder_mode(self):  # TODO: add Union[str, None]
+        return self._encoder.pretrained_mode
+
     @property
     def additional_encoder_layers(self) -> int:
         return self._encoder.num_layers
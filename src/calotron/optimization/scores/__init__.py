@@ -1 +1,2 @@
 from .EMDistance import EMDistance
+from .KSDistance import KSDistance
@@ -0,0 +1,415 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from calotron.models.players import Encoder
+from calotron.models.transformers import GigaGenerator, OptionalTransformer, Transformer
+
+
+class TransformerPruner:
+    def __init__(self, transformer, validation_data) -> None:
+        # Transformer
+        if not isinstance(transformer, Transformer) or isinstance(
+            transformer, GigaGenerator
+        ):
+            raise TypeError(
+                "`transformer` should be a calotron's `Transformer` "
+                "or `OptionalTransformer`, instead "
+                f"{type(transformer)} passed"
+            )
+        if type(transformer._encoder) is not Encoder:
+            raise TypeError(
+                "Only `transformer` with a calotron's `Encoder` can be pruned, "
+                f"instead {type(transformer._encoder)} passed"
+            )
+        self._transformer = transformer
+
+        # Validation data
+        if not isinstance(validation_data, tf.data.Dataset):
+            raise TypeError(
+                "`validation_data` should be a TensorFlow `Dataset`, "
+                f"instead {type(validation_data)} passed"
+            )
+        self._val_data = validation_data
+
+        self._base_loss = None
+        self._head_scores = None
+        self._unit_scores = None
+        self._layer_scores = None
+
+    def score(self) -> None:
+        # Scores are validation loss increases when the block is removed
+        evaluate = self._build_evaluation(self._transformer)
+        self._base_loss = evaluate()
+        self._head_scores = self._score_heads(evaluate)
+        self._unit_scores = self._score_units()
+        self._layer_scores = self._score_layers()
+
+    def _score_heads(self, evaluate) -> dict:
+        head_scores = dict()
+        for key, attn_blocks in self._attention_blocks(self._transformer).items():
+            scores = np.zeros(shape=(len(attn_blocks), attn_blocks[0].num_heads))
+            for i, attn in enumerate(attn_blocks):
+                kernel = attn._mha._output_dense.kernel
+                kernel_value = kernel.numpy()
+                for h in range(attn.num_heads):
+                    # Zeroed output projection removes the head contribution
+                    masked_value = kernel_value.copy()
+                    masked_value[h] = 0.0
+                    kernel.assign(masked_value)
+                    scores[i, h] = evaluate() - self._base_loss
+                kernel.assign(kernel_value)
+            head_scores[key] = scores
+        return head_scores
+
+    def _score_units(self) -> dict:
+        # First-order estimate of the loss change when zeroing a hidden unit
+        mlp_blocks = self._mlp_blocks(self._transformer)
+        kernels = [
+            mlp._seq.layers[1].kernel
+            for blocks in mlp_blocks.values()
+            for mlp in blocks
+        ]
+        gradients = [tf.zeros_like(kernel) for kernel in kernels]
+        for source, target, sample_weight in self._iterate(self._val_data):
+            with tf.GradientTape() as tape:
+                loss = self._batch_loss(
+                    self._transformer, source, target, sample_weight
+                )
+            batch_gradients = tape.gradient(loss, kernels)
+            gradients = [g + bg for g, bg in zip(gradients, batch_gradients)]
+
+        unit_scores = dict()
+        idx = 0
+        for key, blocks in mlp_blocks.items():
+            scores = list()
+            for _ in blocks:
+                taylor = -tf.reduce_sum(gradients[idx] * kernels[idx], axis=-1)
+                scores.append(np.abs(taylor.numpy()))
+                idx += 1
+            unit_scores[key] = np.stack(scores)
+        return unit_scores
+
+    def _score_layers(self) -> dict:
+        layer_scores = dict()
+        for key in ["encoder", "decoder"]:
+            player = getattr(self._transformer, f"_{key}")
+            scores = np.full(shape=(player.num_layers,), fill_value=np.inf)
+            if player.num_layers > 1:
+                for i in range(player.num_layers):
+                    layers = [j for j in range(player.num_layers) if j != i]
+                    model = self._rewire(**{f"{key}_layers": layers})
+                    scores[i] = self._build_evaluation(model)() - self._base_loss
+            layer_scores[key] = scores
+        return layer_scores
+
+    def prune(
+        self,
+        encoder_num_layers=None,
+        encoder_num_heads=None,
+        encoder_mlp_units=None,
+        decoder_num_layers=None,
+        decoder_num_heads=None,
+        decoder_mlp_units=None,
+    ) -> OptionalTransformer:
+        if self._layer_scores is None:
+            self.score()
+
+        selection = dict()
+        for key, num_layers in zip(
+            ["encoder", "decoder"], [encoder_num_layers, decoder_num_layers]
+        ):
+            selection[f"{key}_layers"] = self._top_k(
+                self._layer_scores[key], num_layers
+            )
+
+        # Heads and units selected among the surviving layers, with the
+        # same number per layer as required by `Encoder` and `Decoder`
+        enc_layers = selection["encoder_layers"]
+        dec_layers = selection["decoder_layers"]
+        if encoder_num_heads is not None:
+            selection["encoder_heads"] = [
+                self._top_k(self._head_scores["encoder"][i], encoder_num_heads)
+                for i in enc_layers
+            ]
+        if decoder_num_heads is not None:
+            # Self- and cross-attention heads scored together
+            selection["decoder_heads"] = [
+                self._top_k(
+                    self._head_scores["decoder_self"][i]
+                    + self._head_scores["decoder_cross"][i],
+                    decoder_num_heads,
+                )
+                for i in dec_layers
+            ]
+        if encoder_mlp_units is not None:
+            selection["encoder_units"] = [
+                self._top_k(self._unit_scores["encoder"][i], encoder_mlp_units)
+                for i in enc_layers
+            ]
+        if decoder_mlp_units is not None:
+            selection["decoder_units"] = [
+                self._top_k(self._unit_scores["decoder"][i], decoder_mlp_units)
+                for i in dec_layers
+            ]
+        return self._rewire(**selection)
+
+    @staticmethod
+    def _top_k(scores, k=None) -> list:
+        if k is None:
+            return list(range(len(scores)))
+        assert isinstance(k, (int, float))
+        assert (k >= 1) and (k <= len(scores))
+        return sorted(np.argsort(-np.asarray(scores), kind="stable")[: int(k)])
+
+    def _rewire(
+        self,
+        encoder_layers=None,
+        encoder_heads=None,
+        encoder_units=None,
+        decoder_layers=None,
+        decoder_heads=None,
+        decoder_units=None,
+    ) -> OptionalTransformer:
+        src = self._transformer
+        enc_layers = encoder_layers or list(range(src._encoder.num_layers))
+        dec_layers = decoder_layers or list(range(src._decoder.num_layers))
+        enc_heads = encoder_heads or [
+            list(range(src._encoder.num_heads)) for _ in enc_layers
+        ]
+        dec_heads = decoder_heads or [
+            list(range(src._decoder.num_heads)) for _ in dec_layers
+        ]
+        enc_units = encoder_units or [
+            list(range(src._encoder.mlp_units)) for _ in enc_layers
+        ]
+        dec_units = decoder_units or [
+            list(range(src._decoder.mlp_units)) for _ in dec_layers
+        ]
+
+        model = OptionalTransformer(
+            output_depth=src.output_depth,
+            encoder_options=self._player_options(
+                src._encoder, len(enc_layers), len(enc_heads[0]), len(enc_units[0])
+            ),
+            decoder_options=self._player_options(
+                src._decoder, len(dec_layers), len(dec_heads[0]), len(dec_units[0])
+            ),
+            output_activations=src.output_activations,
+            start_token_initializer=src.start_token_initializer,
+            name=src.name,
+            dtype=src.dtype_policy,
+        )
+        source, target, _ = next(self._iterate(self._val_data.take(1)))
+        model((source[:1], target[:1]))
+
+        # Layers shared as they are
+        for layer_name in ["_seq_ord_embed", "_output_layer", "_filter"]:
+            src_layer = getattr(src, layer_name)
+            if src_layer is not None:
+                getattr(model, layer_name).set_weights(src_layer.get_weights())
+        for player_name in ["_encoder", "_decoder"]:
+            src_player = getattr(src, player_name)
+            dst_player = getattr(model, player_name)
+            dst_player._seq_ord_embed.set_weights(
+                src_player._seq_ord_embed.get_weights()
+            )
+            if src_player._smooth_seq is not None:
+                for src_layer, dst_layer in zip(
+                    src_player._smooth_seq, dst_player._smooth_seq
+                ):
+                    dst_layer.set_weights(src_layer.get_weights())
+
+        # Layers rewired on the selected heads and units
+        for j, i in enumerate(enc_layers):
+            src_layer = src._encoder._enc_layers[i]
+            dst_layer = model._encoder._enc_layers[j]
+            self._rewire_attention(
+                src_layer._self_attn, dst_layer._self_attn, enc_heads[j]
+            )
+            self._rewire_mlp(src_layer._mlp, dst_layer._mlp, enc_units[j])
+        for j, i in enumerate(dec_layers):
+            src_layer = src._decoder._dec_layers[i]
+            dst_layer = model._decoder._dec_layers[j]
+            self._rewire_attention(
+                src_layer._self_attn, dst_layer._self_attn, dec_heads[j]
+            )
+            self._rewire_attention(
+                src_layer._cross_attn, dst_layer._cross_attn, dec_heads[j]
+            )
+            self._rewire_mlp(src_layer._mlp, dst_layer._mlp, dec_units[j])
+        return model
+
+    @staticmethod
+    def _player_options(player, num_layers, num_heads, mlp_units) -> dict:
+        return dict(
+            output_depth=player.output_depth,
+            num_layers=num_layers,
+            num_heads=num_heads,
+            key_dim=player.key_dim,
+            admin_res_scale=player.admin_res_scale,
+            mlp_units=mlp_units,
+            dropout_rate=player.dropout_rate,
+            seq_ord_latent_dim=player.seq_ord_latent_dim,
+            seq_ord_max_length=player.seq_ord_max_length,
+            seq_ord_normalization=player.seq_ord_normalization,
+            enable_res_smoothing=player.enable_res_smoothing,
+        )
+
+    @staticmethod
+    def _rewire_attention(src_attn, dst_attn, heads) -> None:
+        for dense_name in ["_query_dense", "_key_dense", "_value_dense"]:
+            kernel, bias = getattr(src_attn._mha, dense_name).get_weights()
+            getattr(dst_attn._mha, dense_name).set_weights(
+                [kernel[:, heads], bias[heads]]
+            )
+        kernel, bias = src_attn._mha._output_dense.get_weights()
+        dst_attn._mha._output_dense.set_weights([kernel[heads], bias])
+        dst_attn._res.set_weights(src_attn._res.get_weights())
+        dst_attn._ln.set_weights(src_attn._ln.get_weights())
+
+    @staticmethod
+    def _rewire_mlp(src_mlp, dst_mlp, units) -> None:
+        kernel_in, bias_in = src_mlp._seq.layers[0].get_weights()
+        dst_mlp._seq.layers[0].set_weights([kernel_in[:, units], bias_in[units]])
+        kernel_out, bias_out = src_mlp._seq.layers[1].get_weights()
+        dst_mlp._seq.layers[1].set_weights([kernel_out[units], bias_out])
+        dst_mlp._res.set_weights(src_mlp._res.get_weights())
+        dst_mlp._ln.set_weights(src_mlp._ln.get_weights())
+
+    @staticmethod
+    def _attention_blocks(transformer) -> dict:
+        return dict(
+            encoder=[layer._self_attn for layer in transformer._encoder._enc_layers],
+            decoder_self=[
+                layer._self_attn for layer in transformer._decoder._dec_layers
+            ],
+            decoder_cross=[
+                layer._cross_attn for layer in transformer._decoder._dec_layers
+            ],
+        )
+
+    @staticmethod
+    def _mlp_blocks(transformer) -> dict:
+        return dict(
+            encoder=[layer._mlp for layer in transformer._encoder._enc_layers],
+            decoder=[layer._mlp for layer in transformer._decoder._dec_layers],
+        )
+
+    @staticmethod
+    def _iterate(dataset):
+        for data in dataset:
+            if len(data) == 3:
+                source, target, sample_weight = data
+            else:
+                source, target = data
+                sample_weight = None
+            yield source, target, sample_weight
+
+    @staticmethod
+    def _batch_loss(transformer, source, target, sample_weight=None) -> tf.Tensor:
+        output = transformer((source, target), training=False)
+        output = tf.cast(output, dtype=target.dtype)
+        if sample_weight is None:
+            sample_weight = tf.ones(shape=tf.shape(target)[:2], dtype=target.dtype)
+        mse = tf.reduce_mean(tf.square(target - output), axis=-1)
+        return tf.reduce_sum(sample_weight * mse) / tf.reduce_sum(sample_weight)
+
+    def _build_evaluation(self, transformer):
+        batch_loss = tf.function(
+            lambda s, t, w: self._batch_loss(transformer, s, t, w),
+            reduce_retracing=True,
+        )
+
+        def evaluate() -> float:
+            losses = [
+                float(batch_loss(source, target, sample_weight))
+                for source, target, sample_weight in self._iterate(self._val_data)
+            ]
+            return float(np.mean(losses))
+
+        return evaluate
+
+    def fine_tune(
+        self, transformer, train_data, epochs=1, optimizer="rmsprop", verbose=0
+    ) -> keras.callbacks.History:
+        assert isinstance(epochs, (int, float))
+        assert epochs >= 1
+        train_ds = train_data.map(
+            lambda *data: ((data[0], data[1]), *data[1:]),
+            num_parallel_calls=tf.data.AUTOTUNE,
+        )
+        transformer.compile(loss=keras.losses.MeanSquaredError(), optimizer=optimizer)
+        return transformer.fit(train_ds, epochs=int(epochs), verbose=verbose)
+
+    def report(self, transformers, names=None, num_repeats=3) -> tuple:
+        transformers = [self._transformer] + list(transformers)
+        if names is None:
+            names = [f"pruned_{i}" for i in range(len(transformers) - 1)]
+        names = ["original"] + list(names)
+        assert len(names) == len(transformers)
+
+        num_events = sum(
+            int(tf.shape(source)[0]) for source, _, _ in self._iterate(self._val_data)
+        )
+        rows = list()
+        for name, transformer in zip(names, transformers):
+            evaluate = self._build_evaluation(transformer)
+            loss = evaluate()  # tracing excluded from timing
+            start = time.perf_counter()
+            for _ in range(num_repeats):
+                evaluate()
+            latency = (time.perf_counter() - start) / (num_repeats * num_events)
+            rows.append(
+                dict(
+                    name=name,
+                    num_params=int(transformer.count_params()),
+                    latency_ms=1e3 * latency,
+                    val_loss=loss,
+                )
+            )
+
+        headers = ["Model", "Param #", "Latency [ms/event]", "Validation loss"]
+        heads_html = (
+            "<tr>\n" + "".join([f"<th>{h}</th>\n" for h in headers]) + "</tr>\n"
+        )
+        rows_html = ""
+        for row in rows:
+            cells = [
+                row["name"],
+                row["num_params"],
+                f"{row['latency_ms']:.4f}",
+                f"{row['val_loss']:.5f}",
+            ]
+            rows_html += (
+                "<tr>\n" + "".join([f"<td>{c}</td>\n" for c in cells]) + "</tr>\n"
+            )
+
+        table_html = '<table width="40%" border="1px solid black">\n \
+                      <thead>\n{}</thead>\n \
+                      <tbody>\n{}</tbody>\n \
+                      </table>'.format(heads_html, rows_html)
+
+        return table_html, rows
+
+    @property
+    def transformer(self) -> Transformer:
+        return self._transformer
+
+    @property
+    def base_loss(self):  # TODO: add Union[float, None]
+        return self._base_loss
+
+    @property
+    def head_scores(self):  # TODO: add Union[dict, None]
+        return self._head_scores
+
+    @property
+    def unit_scores(self):  # TODO: add Union[dict, None]
+        return self._unit_scores
+
+    @property
+    def layer_scores(self):  # TODO: add Union[dict, None]
+        return self._layer_scores
@@ -0,0 +1 @@
+from .TransformerPruner import TransformerPruner
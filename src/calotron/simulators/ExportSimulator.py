@@ -38,24 +38,14 @@ class ExportSimulator(tf.Module):
             ta_weight = ta_weight.write(index=idx, value=attn_weights)
             idx += 1
 
+        # (num_batches, batch_size, ...) -> (num_batches * batch_size, ...)
         out_target = ta_target.stack()
         out_target = tf.reshape(
-            out_target,
-            shape=(
-                idx * tf.shape(out_target)[1],
-                tf.shape(out_target)[2],
-                tf.shape(out_target)[3],
-            ),
+            out_target, shape=tf.concat([[-1], tf.shape(out_target)[2:]], axis=0)
         )
         attn_weights = ta_weight.stack()
         attn_weights = tf.reshape(
-            attn_weights,
-            shape=(
-                idx * tf.shape(attn_weights)[1],
-                tf.shape(attn_weights)[2],
-                tf.shape(attn_weights)[3],
-                tf.shape(attn_weights)[4],
-            ),
+            attn_weights, shape=tf.concat([[-1], tf.shape(attn_weights)[2:]], axis=0)
         )
         return out_target, attn_weights
 
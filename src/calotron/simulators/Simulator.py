@@ -1,11 +1,15 @@
 import numpy as np
 import tensorflow as tf
 
-from calotron.models.transformers import Transformer
+from calotron.models.transformers import GigaGenerator, Transformer
+
+MAX_SEED = 2**31 - 1
 
 
 class Simulator(tf.Module):
-    def __init__(self, transformer, start_token, name=None) -> None:
+    def __init__(
+        self, transformer, start_token, num_samples=1, seed=None, name=None
+    ) -> None:
         super().__init__(name=name)
 
         # Transformer
@@ -35,6 +39,23 @@ class Simulator(tf.Module):
             )
         self._start_token = start_token
 
+        # Number of samples per source
+        assert isinstance(num_samples, (int, float))
+        assert num_samples >= 1
+        self._num_samples = int(num_samples)
+        if self._num_samples > 1 and not isinstance(self._transformer, GigaGenerator):
+            raise ValueError(
+                "`num_samples` > 1 requires a calotron's `GigaGenerator` "
+                "as `transformer`, instead "
+                f"{type(self._transformer)} passed"
+            )
+
+        # Seed for the latent samples
+        if seed is not None:
+            assert isinstance(seed, (int, float))
+            seed = int(seed)
+        self._seed = seed
+
     def __call__(self, source, max_length) -> tf.Tensor:
         # Tensor conversions
         source = tf.convert_to_tensor(source, dtype=self._dtype)
@@ -54,6 +75,9 @@ class Simulator(tf.Module):
                     f"{start_token.shape[0]} passed"
                 )
 
+        if isinstance(self._transformer, GigaGenerator):
+            return self._giga_generation(source, start_token, max_length)
+
         ta_target = tf.TensorArray(dtype=self._dtype, size=0, dynamic_size=True)
         ta_target = ta_target.write(index=0, value=start_token)
         for i in tf.range(max_length):
@@ -65,9 +89,73 @@ class Simulator(tf.Module):
         out_target = out_target[:, 1:, :]
 
         self._transformer((source, out_target), training=False)
-        attention_weights = self._transformer.attention_weights
+        attention_weights = tf.cast(
+            self._transformer.attention_weights, dtype=self._dtype
+        )
         return out_target, attention_weights
 
+    def _giga_generation(self, source, start_token, max_length) -> tuple:
+        # Encode each source once, then share it among the samples
+        enc_out, map_in = self._transformer.encode_source(source, training=False)
+        batch_size = tf.shape(source)[0]
+        num_samples = self._num_samples
+        if num_samples > 1:
+            enc_out = tf.tile(enc_out, (num_samples, 1, 1))
+            map_in = tf.tile(map_in, (num_samples, 1))
+            start_token = tf.tile(start_token, (num_samples, 1))
+
+        # Latent codes from stateless per-sample seeds
+        map_out = self._transformer.map_latent(
+            map_in, latent_sample=self._latent_sample(batch_size), training=False
+        )
+
+        ta_target = tf.TensorArray(dtype=self._dtype, size=0, dynamic_size=True)
+        ta_target = ta_target.write(index=0, value=start_token)
+        for i in tf.range(max_length):
+            out_target = tf.transpose(ta_target.stack(), perm=[1, 0, 2])
+            predictions = self._transformer.synthesize(
+                out_target, map_out, enc_out, training=False
+            )
+            predictions = tf.cast(predictions, dtype=self._dtype)
+            ta_target = ta_target.write(index=i + 1, value=predictions[:, -1, :])
+
+        out_target = tf.transpose(ta_target.stack(), perm=[1, 0, 2])
+        out_target = out_target[:, 1:, :]
+
+        self._transformer.synthesize(out_target, map_out, enc_out, training=False)
+        attention_weights = tf.cast(
+            self._transformer.attention_weights, dtype=self._dtype
+        )
+
+        # (num_samples * batch_size, ...) -> (batch_size, num_samples, ...)
+        if num_samples > 1:
+            out_target = self._split_samples(out_target, batch_size)
+            attention_weights = self._split_samples(attention_weights, batch_size)
+        return out_target, attention_weights
+
+    def _latent_sample(self, batch_size) -> tf.Tensor:
+        if self._seed is not None:
+            base_seed = tf.constant([self._seed, 0], dtype=tf.int64)
+        else:
+            base_seed = tf.random.uniform(shape=(2,), maxval=MAX_SEED, dtype=tf.int64)
+        seeds = tf.random.experimental.stateless_split(base_seed, num=self._num_samples)
+        latent_dim = self._transformer.mapping_latent_dim
+        latent_sample = [
+            tf.random.stateless_normal(
+                shape=(batch_size, latent_dim), seed=seeds[i], dtype=self._dtype
+            )
+            for i in range(self._num_samples)
+        ]
+        return tf.concat(latent_sample, axis=0)
+
+    def _split_samples(self, x, batch_size) -> tf.Tensor:
+        x = tf.reshape(
+            x,
+            tf.concat([[self._num_samples, batch_size], tf.shape(x)[1:]], axis=0),
+        )
+        perm = [1, 0] + list(range(2, len(x.shape)))
+        return tf.transpose(x, perm=perm)
+
     @property
     def transformer(self) -> Transformer:
         return self._transformer
@@ -75,3 +163,11 @@ class Simulator(tf.Module):
     @property
     def start_token(self) -> np.ndarray:
         return self._start_token
+
+    @property
+    def num_samples(self) -> int:
+        return self._num_samples
+
+    @property
+    def seed(self):  # TODO: add Union[int, None]
+        return self._seed
@@ -19,14 +19,14 @@ METRIC_SHORTCUTS = [
     "wass_dist",
 ]
 CALOTRON_METRICS = [
-    Accuracy(),
-    BCE(),
-    KL_div(),
-    JS_div(),
-    MSE(),
-    RMSE(),
-    MAE(),
-    Wass_dist(),
+    Accuracy,
+    BCE,
+    KL_div,
+    JS_div,
+    MSE,
+    RMSE,
+    MAE,
+    Wass_dist,
 ]
 
 
@@ -43,7 +43,7 @@ def checkMetrics(metrics):  # TODO: add Union[list, None]
                             METRIC_SHORTCUTS, CALOTRON_METRICS
                         ):
                             if metric == str_metric:
-                                checked_metrics.append(calo_metric)
+                                checked_metrics.append(calo_metric())
                     else:
                         raise ValueError(
                             f"`metrics` elements should be selected in "
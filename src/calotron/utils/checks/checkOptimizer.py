@@ -2,9 +2,9 @@ from tensorflow import keras
 
 OPT_SHORTCUTS = ["sgd", "rmsprop", "adam"]
 TF_OPTIMIZERS = [
-    keras.optimizers.SGD(),
-    keras.optimizers.RMSprop(),
-    keras.optimizers.Adam(),
+    keras.optimizers.SGD,
+    keras.optimizers.RMSprop,
+    keras.optimizers.Adam,
 ]
 
 
@@ -13,7 +13,7 @@ def checkOptimizer(optimizer) -> keras.optimizers.Optimizer:
         if optimizer in OPT_SHORTCUTS:
             for opt, tf_opt in zip(OPT_SHORTCUTS, TF_OPTIMIZERS):
                 if optimizer == opt:
-                    return tf_opt
+                    return tf_opt()
         else:
             raise ValueError(
                 f"`optimizer` should be selected in {OPT_SHORTCUTS}, "
@@ -0,0 +1 @@
+from .dropLayer import dropLayer, layerDropRates
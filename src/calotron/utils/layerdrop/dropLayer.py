@@ -0,0 +1,48 @@
+import tensorflow as tf
+
+
+def layerDropRates(num_layers, layer_drop_rate=0.0) -> list:
+    assert isinstance(layer_drop_rate, (int, float))
+    assert (layer_drop_rate >= 0.0) and (layer_drop_rate < 1.0)
+
+    # The first and last layers are always kept (input projection and
+    # attention scores rely on them), so at least one droppable layer
+    # is needed in between
+    if layer_drop_rate > 0.0 and num_layers < 3:
+        raise ValueError(
+            "`layer_drop_rate` requires at least 3 layers since the first "
+            f"and last ones are never dropped, instead {num_layers} passed"
+        )
+
+    # Linear decay of the survival probability with depth
+    rates = list()
+    for i in range(num_layers):
+        if 0 < i < num_layers - 1:
+            rates.append(float(layer_drop_rate) * i / (num_layers - 1))
+        else:
+            rates.append(0.0)
+    return rates
+
+
+def dropLayer(layer, *inputs, drop_rate, training=None, recompute=False) -> tf.Tensor:
+    # Variables created outside the conditional branch
+    if not layer.built:
+        layer(*[x[:0] for x in inputs], training=False)
+
+    # The dropped branch skips the layer computation entirely, keeping
+    # only the (omega-scaled) residual path of its blocks
+    keep = tf.random.uniform(shape=()) >= drop_rate
+
+    def forward(*args) -> tf.Tensor:
+        return tf.cond(
+            keep,
+            lambda: layer(*args, training=training),
+            lambda: layer.skip(*args),
+        )
+
+    # Checkpoints can't be differentiated from within a conditional branch,
+    # so the whole conditional is recomputed (with the same `keep` draw);
+    # dropout masks would be resampled, so such layers aren't recomputed
+    if recompute and not (training and layer.dropout_rate > 0.0):
+        return tf.recompute_grad(forward)(*inputs)
+    return forward(*inputs)
@@ -0,0 +1,4 @@
+from .buildEvents import buildEvents
+from .computeMatchWeights import computeMatchWeights
+from .readRootChunks import readRootChunks
+from .mergeScalers import mergeScalers
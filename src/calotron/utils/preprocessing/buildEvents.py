@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def buildEvents(
+    data,
+    event_ids,
+    sort_keys,
+    max_length,
+    events=None,
+    descending=True,
+    padding_value=0.0,
+) -> tuple:
+    data = np.asarray(data)
+    event_ids = np.asarray(event_ids)
+    sort_keys = np.asarray(sort_keys)
+    assert data.ndim == 2
+    assert len(event_ids) == len(data)
+    assert len(sort_keys) == len(data)
+    assert isinstance(max_length, (int, float))
+    assert max_length >= 1
+    max_length = int(max_length)
+
+    # Rows sorted once by event and then by key (last key is the primary one)
+    keys = -sort_keys if descending else sort_keys
+    order = np.lexsort((keys, event_ids))
+    data, event_ids = data[order], event_ids[order]
+
+    # Events requested (e.g. the ones with clusters) define the output rows
+    if events is None:
+        events = np.unique(event_ids)
+    else:
+        events = np.asarray(events)
+    dtype = data.dtype if np.issubdtype(data.dtype, np.floating) else np.float64
+    if len(events) == 0:
+        padded = np.empty(shape=(0, max_length, data.shape[1]), dtype=dtype)
+        return events, padded, np.zeros(0, dtype=np.int64)
+    evt_order = np.argsort(events, kind="stable")
+    pos = np.searchsorted(events, event_ids, sorter=evt_order)
+    pos = np.minimum(pos, len(events) - 1)
+    found = events[evt_order[pos]] == event_ids
+    rows = evt_order[pos[found]]
+    data = data[found]
+
+    # Position of each row within its event from the group offsets
+    lengths = np.bincount(rows, minlength=len(events))
+    offsets = np.zeros(len(events), dtype=np.int64)
+    if len(rows) > 0:
+        starts = np.r_[0, np.flatnonzero(np.diff(rows)) + 1]
+        offsets[rows[starts]] = starts
+    ranks = np.arange(len(rows)) - offsets[rows]
+
+    # Rows scattered directly into the padded array
+    keep = ranks < max_length
+    padded = np.full(
+        shape=(len(events), max_length, data.shape[1]),
+        fill_value=padding_value,
+        dtype=dtype,
+    )
+    padded[rows[keep], ranks[keep]] = data[keep]
+    return events, padded, lengths
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def computeMatchWeights(
+    photons_xy,
+    clusters_xy,
+    cluster_mask=None,
+    max_match_distance=0.01,
+    chunk_size=1024,
+    num_workers=None,
+) -> np.ndarray:
+    photons_xy = np.asarray(photons_xy)
+    clusters_xy = np.asarray(clusters_xy)
+    assert photons_xy.ndim == 3 and clusters_xy.ndim == 3
+    assert len(photons_xy) == len(clusters_xy)
+    assert isinstance(max_match_distance, (int, float))
+    assert max_match_distance > 0.0
+    assert isinstance(chunk_size, (int, float))
+    assert chunk_size >= 1
+    chunk_size = int(chunk_size)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    assert isinstance(num_workers, (int, float))
+    assert num_workers >= 1
+
+    num_events = len(clusters_xy)
+    match_weights = np.empty(shape=clusters_xy.shape[:2], dtype=np.float64)
+
+    # Events processed at once shared among the workers, so that
+    # the memory footprint doesn't scale with the number of threads
+    chunk_size = max(chunk_size // int(num_workers), 1)
+
+    def process(start) -> None:
+        stop = min(start + chunk_size, num_events)
+        # Pairwise distances bounded to (chunk, clusters, photons)
+        diff = clusters_xy[start:stop, :, None, :] - photons_xy[start:stop, None, :, :]
+        min_distance = np.min(np.linalg.norm(diff, axis=-1), axis=-1)
+        match_weights[start:stop] = max_match_distance / np.maximum(
+            min_distance, max_match_distance
+        )
+
+    # NumPy releases the GIL, so chunks run in parallel on threads
+    starts = range(0, num_events, chunk_size)
+    with ThreadPoolExecutor(max_workers=int(num_workers)) as executor:
+        list(executor.map(process, starts))
+
+    if cluster_mask is not None:
+        match_weights *= np.asarray(cluster_mask)
+    return match_weights
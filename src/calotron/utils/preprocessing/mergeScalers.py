@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def mergeScalers(scalers) -> object:
+    # Optional dependency, only needed for data preparation
+    from sklearn.base import clone
+    from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+    # Scalers that never saw any data are ignored
+    scalers = [s for s in scalers if hasattr(s, "n_samples_seen_")]
+    assert len(scalers) >= 1
+    ref = scalers[0]
+    if not all(type(s) is type(ref) for s in scalers):
+        raise TypeError("`scalers` should all be instances of the same class")
+    n_samples = sum(np.asarray(s.n_samples_seen_) for s in scalers)
+
+    if isinstance(ref, MinMaxScaler):
+        # Extremes from the partial fits are enough to rebuild the scaler
+        data_min = np.min([s.data_min_ for s in scalers], axis=0)
+        data_max = np.max([s.data_max_ for s in scalers], axis=0)
+        merged = clone(ref).partial_fit(np.stack([data_min, data_max]))
+        merged.n_samples_seen_ = n_samples.item() if n_samples.ndim == 0 else n_samples
+        return merged
+
+    elif isinstance(ref, StandardScaler):
+        merged = clone(ref)
+        merged.n_samples_seen_ = n_samples.item() if n_samples.ndim == 0 else n_samples
+        merged.n_features_in_ = ref.n_features_in_
+        if ref.mean_ is None:
+            merged.mean_, merged.var_, merged.scale_ = None, None, None
+            return merged
+
+        # Pooled mean and variance of the partial fits (Chan et al.)
+        weights = [np.asarray(s.n_samples_seen_) / n_samples for s in scalers]
+        mean = sum(w * s.mean_ for w, s in zip(weights, scalers))
+        merged.mean_ = mean
+        if ref.var_ is None:
+            merged.var_, merged.scale_ = None, None
+        else:
+            var = sum(
+                w * (s.var_ + (s.mean_ - mean) ** 2) for w, s in zip(weights, scalers)
+            )
+            scale = np.sqrt(var)
+            merged.var_ = var
+            merged.scale_ = np.where(scale == 0.0, 1.0, scale)
+        return merged
+
+    else:
+        raise TypeError(
+            "`scalers` should be instances of MinMaxScaler or StandardScaler, "
+            f"instead {type(ref).__name__} passed"
+        )
@@ -0,0 +1,21 @@
+def readRootChunks(fnames, tree, branches, cut=None, step_size="100 MB"):
+    # Optional dependency, only needed for ROOT ingestion
+    import uproot
+
+    if isinstance(fnames, str):
+        fnames = [fnames]
+    assert isinstance(branches, (list, tuple))
+    assert len(branches) >= 1
+    if cut is not None:
+        assert isinstance(cut, str)
+
+    # Only the requested branches are read, in bounded-size chunks
+    files = [f"{fname}:{tree}" for fname in fnames]
+    for chunk in uproot.iterate(
+        files, expressions=list(branches), step_size=step_size, library="pd"
+    ):
+        if cut is not None:
+            chunk = chunk.query(cut)  # selection pushed down to the chunk
+        chunk = chunk.dropna()
+        if len(chunk) > 0:
+            yield chunk.reset_index(drop=True)
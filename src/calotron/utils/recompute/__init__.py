@@ -0,0 +1 @@
+from .recomputeLayer import recomputeLayer
@@ -0,0 +1,17 @@
+import tensorflow as tf
+
+
+def recomputeLayer(layer, *inputs, training=None) -> tf.Tensor:
+    # Variables created outside the checkpoint, at (almost) no cost
+    if not layer.built:
+        layer(*[x[:0] for x in inputs], training=False)
+
+    # Dropout masks would be resampled when recomputing, so layers with
+    # active dropout only recompute their (dropout-free) MLP blocks
+    if training and layer.dropout_rate > 0.0:
+        return layer(*inputs, training=training, recompute=True)
+
+    def forward(*args) -> tf.Tensor:
+        return layer(*args, training=training)
+
+    return tf.recompute_grad(forward)(*inputs)
@@ -1,2 +1,3 @@
+from .getFidelityReport import getFidelityReport
 from .getSummaryHTML import getSummaryHTML
 from .HPSingleton import initHPSingleton
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from calotron.optimization.scores import EMDistance, KSDistance
+from calotron.simulators import ExportSimulator, Simulator
+
+
+def getFidelityReport(
+    simulators,
+    source,
+    reference,
+    max_length=None,
+    weight=None,
+    names=None,
+    batch_size=256,
+    bins=100,
+    num_repeats=3,
+) -> tuple:
+    if isinstance(simulators, Simulator):
+        simulators = [simulators]
+    if names is None:
+        names = [sim.transformer.name for sim in simulators]
+    assert len(names) == len(simulators)
+
+    source = np.asarray(source, dtype=np.float32)
+    reference = np.asarray(reference, dtype=np.float32)
+
+    # Generated sequences compared position-wise with the reference ones
+    if max_length is None:
+        max_length = reference.shape[1]
+    if max_length != reference.shape[1]:
+        raise ValueError(
+            "`max_length` should match with the `reference` sequence length "
+            f"({reference.shape[1]}), instead {max_length} passed"
+        )
+    dataset = tf.data.Dataset.from_tensor_slices(source).batch(
+        batch_size, drop_remainder=True
+    )
+    num_events = (len(source) // batch_size) * batch_size
+    reference = reference[:num_events]
+    if weight is not None:
+        weight = np.asarray(weight, dtype=np.float32)[:num_events]
+    else:
+        weight = np.ones(shape=reference.shape[:2], dtype=np.float32)
+
+    ks_score = KSDistance()
+    emd_score = EMDistance()
+
+    rows = list()
+    for name, sim in zip(names, simulators):
+        exp_sim = ExportSimulator(sim, max_length=max_length)
+        output, _ = exp_sim(dataset)  # tracing excluded from timing
+
+        start = time.perf_counter()
+        for _ in range(num_repeats):
+            output, _ = exp_sim(dataset)
+        latency = (time.perf_counter() - start) / (num_repeats * num_events)
+
+        # Generated samples compared with the reference ones feature-wise
+        output = output.numpy()
+        if sim.num_samples > 1:
+            output = output.reshape(-1, *output.shape[2:])
+            weight_pred = np.repeat(weight, sim.num_samples, axis=0)
+        else:
+            weight_pred = weight
+        ks, emd = list(), list()
+        for i in range(reference.shape[-1]):
+            x_true = reference[:, :, i][weight > 0.0]
+            x_pred = output[:, :, i][weight_pred > 0.0]
+            x_range = (min(x_true.min(), x_pred.min()), max(x_true.max(), x_pred.max()))
+            ks.append(ks_score(x_true, x_pred, bins=bins, range=x_range, min_entries=1))
+            emd.append(
+                emd_score(x_true, x_pred, bins=bins, range=x_range, min_entries=1)
+            )
+
+        rows.append(
+            dict(
+                name=name,
+                num_params=int(sim.transformer.count_params()),
+                latency_ms=1e3 * latency,
+                ks_score=ks,
+                emd_score=emd,
+            )
+        )
+
+    headers = ["Model", "Param #", "Latency [ms/event]", "KS distance", "EMD"]
+    heads_html = "<tr>\n" + "".join([f"<th>{h}</th>\n" for h in headers]) + "</tr>\n"
+    rows_html = ""
+    for row in rows:
+        cells = [
+            row["name"],
+            row["num_params"],
+            f"{row['latency_ms']:.3f}",
+            ", ".join([f"{s:.4f}" for s in row["ks_score"]]),
+            ", ".join([f"{s:.4f}" for s in row["emd_score"]]),
+        ]
+        rows_html += "<tr>\n" + "".join([f"<td>{c}</td>\n" for c in cells]) + "</tr>\n"
+
+    table_html = '<table width="60%" border="1px solid black">\n \
+                  <thead>\n{}</thead>\n \
+                  <tbody>\n{}</tbody>\n \
+                  </table>'.format(heads_html, rows_html)
+
+    return table_html, rows
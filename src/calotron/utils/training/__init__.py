@@ -0,0 +1,3 @@
+from .prepareOptimizer import getScaledLoss, getUnscaledGradients, prepareOptimizer
+from .replicaSum import replicaSum
+from .unpackData import unpackData
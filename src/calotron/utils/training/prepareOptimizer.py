@@ -0,0 +1,22 @@
+import tensorflow as tf
+from tensorflow import keras
+
+
+def prepareOptimizer(optimizer, model) -> keras.optimizers.Optimizer:
+    # Loss scaling is required to avoid float16 gradient underflow
+    if model.dtype_policy.compute_dtype == "float16":
+        if not isinstance(optimizer, keras.mixed_precision.LossScaleOptimizer):
+            optimizer = keras.mixed_precision.LossScaleOptimizer(optimizer)
+    return optimizer
+
+
+def getScaledLoss(optimizer, loss) -> tf.Tensor:
+    if isinstance(optimizer, keras.mixed_precision.LossScaleOptimizer):
+        return optimizer.get_scaled_loss(loss)
+    return loss
+
+
+def getUnscaledGradients(optimizer, gradients) -> list:
+    if isinstance(optimizer, keras.mixed_precision.LossScaleOptimizer):
+        return optimizer.get_unscaled_gradients(gradients)
+    return gradients
@@ -0,0 +1,9 @@
+import tensorflow as tf
+
+
+def replicaSum(value) -> tf.Tensor:
+    # Each replica holds its share of the global-batch value
+    replica_ctx = tf.distribute.get_replica_context()
+    if replica_ctx is None or replica_ctx.num_replicas_in_sync == 1:
+        return value
+    return replica_ctx.all_reduce(tf.distribute.ReduceOp.SUM, value)
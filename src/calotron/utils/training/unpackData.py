@@ -0,0 +1,7 @@
+def unpackData(data) -> tuple:
+    if len(data) == 3:
+        source, target, sample_weight = data
+    else:
+        source, target = data
+        sample_weight = None
+    return source, target, sample_weight
@@ -0,0 +1,52 @@
+import pytest
+import tensorflow as tf
+
+
+@pytest.fixture
+def scheduler():
+    from calotron.callbacks.schedulers import SeqLengthCurriculum
+
+    sched = SeqLengthCurriculum(
+        boundaries=[5, 10],
+        source_lengths=[16, 32, None],
+        target_lengths=[8, 16, None],
+        verbose=True,
+    )
+    return sched
+
+
+###########################################################################
+
+
+def test_sched_configuration(scheduler):
+    from calotron.callbacks.schedulers import SeqLengthCurriculum
+
+    assert isinstance(scheduler, SeqLengthCurriculum)
+    assert isinstance(scheduler.name, str)
+    assert isinstance(scheduler.boundaries, list)
+    assert isinstance(scheduler.boundaries[0], int)
+    assert isinstance(scheduler.source_lengths, list)
+    assert isinstance(scheduler.source_lengths[0], int)
+    assert isinstance(scheduler.target_lengths, list)
+    assert isinstance(scheduler.target_lengths[0], int)
+    assert len(scheduler.boundaries) == len(scheduler.source_lengths)
+    assert isinstance(scheduler.verbose, bool)
+
+
+def test_sched_stages(scheduler):
+    assert scheduler._stage(0) == 0
+    assert scheduler._stage(5) == 1
+    assert scheduler._stage(9) == 1
+    assert scheduler._stage(100) == 2
+
+
+def test_sched_errors():
+    from calotron.callbacks.schedulers import SeqLengthCurriculum
+
+    with pytest.raises(ValueError):
+        SeqLengthCurriculum(boundaries=[5])
+
+    sched = SeqLengthCurriculum(boundaries=[5], source_lengths=[16, None])
+    sched.set_model(tf.keras.Sequential([tf.keras.layers.Dense(1)]))
+    with pytest.raises(TypeError):
+        sched.on_epoch_begin(0)
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+NUM_EVENTS = 256
+BATCH_SIZE = 32
+DELAY = 0.02
+
+x = np.random.normal(size=(NUM_EVENTS, 4)).astype(np.float32)
+y = np.random.normal(size=(NUM_EVENTS, 1)).astype(np.float32)
+
+
+def slow_map(x, y):
+    # Deliberately slow input pipeline to produce stalls
+    def sleep(x):
+        time.sleep(DELAY)
+        return x
+
+    x = tf.py_function(sleep, inp=[x], Tout=tf.float32)
+    x.set_shape([BATCH_SIZE, 4])
+    return x, y
+
+
+def slow_step(x):
+    # Deliberately slow training step, fed by a fast input pipeline
+    def sleep(x):
+        time.sleep(DELAY)
+        return x
+
+    out = tf.py_function(sleep, inp=[x], Tout=tf.float32)
+    out.set_shape(x.shape)
+    return out
+
+
+@pytest.fixture
+def monitor():
+    from calotron.data import InputStallMonitor
+
+    return InputStallMonitor()
+
+
+###########################################################################
+
+
+def test_monitor_configuration(monitor):
+    from calotron.data import InputStallMonitor
+
+    assert isinstance(monitor, InputStallMonitor)
+    assert isinstance(monitor.name, str)
+    assert isinstance(monitor.batches_per_step, int)
+    assert isinstance(monitor.stall_times, list)
+    assert isinstance(monitor.stall_fractions, list)
+
+
+def test_monitor_use(monitor):
+    from calotron.data import makePipeline
+
+    dataset = makePipeline((x, y), BATCH_SIZE, map_fn=slow_map, monitor=monitor)
+    model = tf.keras.Sequential([tf.keras.layers.Dense(1)])
+    model.compile(optimizer="sgd", loss="mse")
+    history = model.fit(dataset, epochs=2, callbacks=[monitor])
+    assert len(monitor.stall_times) == 2
+    assert all(stall > 0.0 for stall in monitor.stall_times)
+    assert all(0.0 <= frac <= 1.0 for frac in monitor.stall_fractions)
+    assert "data_stall" in history.history
+    assert "data_stall_frac" in history.history
+
+
+def test_monitor_fast_pipeline(monitor):
+    from calotron.data import makePipeline
+
+    dataset = makePipeline((x, y), BATCH_SIZE, monitor=monitor)
+    model = tf.keras.Sequential(
+        [tf.keras.layers.Lambda(slow_step), tf.keras.layers.Dense(1)]
+    )
+    model.compile(optimizer="sgd", loss="mse")
+    model.fit(dataset, epochs=2, callbacks=[monitor])
+    assert all(frac < 0.1 for frac in monitor.stall_fractions)
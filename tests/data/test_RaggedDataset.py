@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+
+NUM_EVENTS = 200
+MAX_LENGTH = 12
+BATCH_SIZE = 32
+
+here = os.path.dirname(__file__)
+data_dirs = [f"{here}/tmp/ragged_{i}" for i in range(2)]
+
+lengths = np.random.randint(0, MAX_LENGTH + 3, size=NUM_EVENTS)  # some truncated
+mask = np.arange(MAX_LENGTH)[None, :] < lengths[:, None]
+photon = np.random.normal(size=(NUM_EVENTS, MAX_LENGTH, 3)) * mask[:, :, None]
+weight = np.random.uniform(size=(NUM_EVENTS, MAX_LENGTH)) * mask
+
+
+@pytest.fixture(scope="module", autouse=True)
+def shards():
+    from calotron.data import writeRaggedDataset
+
+    half = NUM_EVENTS // 2
+    for i, data_dir in enumerate(data_dirs):
+        sl = slice(i * half, (i + 1) * half)
+        writeRaggedDataset(
+            data_dir,
+            padded={"photon": photon[sl], "weight": weight[sl]},
+            lengths={"photon": lengths[sl], "weight": lengths[sl]},
+        )
+    yield data_dirs
+
+
+@pytest.fixture
+def dataset():
+    from calotron.data import RaggedDataset
+
+    return RaggedDataset(data_dirs, dtype="float32")
+
+
+###########################################################################
+
+
+def test_dataset_configuration(dataset):
+    from calotron.data import RaggedDataset
+
+    assert isinstance(dataset, RaggedDataset)
+    assert isinstance(dataset.data_dirs, list)
+    assert isinstance(dataset.features, list)
+    assert isinstance(dataset.num_events, int)
+    assert isinstance(dataset.dtype, str)
+    assert isinstance(dataset.padding_value, float)
+    assert len(dataset) == NUM_EVENTS
+    assert dataset.padded_shape("photon") == (MAX_LENGTH, 3)
+    assert dataset.padded_shape("weight") == (MAX_LENGTH,)
+    assert np.all(dataset.lengths("photon") == np.minimum(lengths, MAX_LENGTH))
+
+
+def test_dataset_get_batch(dataset):
+    indices = np.random.permutation(NUM_EVENTS)[:BATCH_SIZE]  # across shards
+    batch = dataset.get_batch(indices)
+    assert batch["photon"].dtype == np.float32
+    assert np.allclose(batch["photon"], photon[indices])
+    assert np.allclose(batch["weight"], weight[indices])
+
+
+@pytest.mark.parametrize("drop_remainder", [True, False])
+def test_dataset_batches(dataset, drop_remainder):
+    indices = np.arange(NUM_EVENTS // 2)
+    batches = list(
+        dataset.batches(
+            BATCH_SIZE,
+            features=["photon"],
+            indices=indices,
+            drop_remainder=drop_remainder,
+        )
+    )
+    num_batches = len(indices) // BATCH_SIZE
+    if not drop_remainder:
+        num_batches += int(len(indices) % BATCH_SIZE > 0)
+    assert len(batches) == num_batches
+    assert all(len(batch) == 1 for batch in batches)
+    seen = np.concatenate([batch[0] for batch in batches])
+    if not drop_remainder:  # same events, in a different order
+        assert np.isclose(seen.sum(), photon[indices].sum())
+
+
+def test_dataset_tf(dataset):
+    tf_dataset = dataset.to_tf_dataset(BATCH_SIZE, drop_remainder=True, seed=42)
+    assert tf_dataset.element_spec[0].shape == (BATCH_SIZE, MAX_LENGTH, 3)
+    assert tf_dataset.element_spec[1].shape == (BATCH_SIZE, MAX_LENGTH)
+    epochs = [np.concatenate([w for _, w in tf_dataset]) for _ in range(2)]
+    assert epochs[0].shape == (NUM_EVENTS // BATCH_SIZE * BATCH_SIZE, MAX_LENGTH)
+    assert not np.allclose(epochs[0], epochs[1])  # reshuffled every epoch
+
+
+def test_dataset_wrong_feature(dataset):
+    with pytest.raises(ValueError):
+        dataset.padded_shape("cluster")
+    with pytest.raises(ValueError):
+        dataset.get_batch([0], features=["cluster"])
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+NUM_EVENTS = 200
+MAX_LENGTH = 12
+BATCH_SIZE = 32
+NUM_SHARDS = 4
+
+here = os.path.dirname(__file__)
+export_dir = f"{here}/tmp/tfrecords"
+
+lengths = np.random.randint(0, MAX_LENGTH + 3, size=NUM_EVENTS)  # some truncated
+mask = np.arange(MAX_LENGTH)[None, :] < lengths[:, None]
+photon = np.random.normal(size=(NUM_EVENTS, MAX_LENGTH, 3)) * mask[:, :, None]
+weight = np.random.uniform(size=(NUM_EVENTS, MAX_LENGTH)) * mask
+photon = photon.astype(np.float32)
+weight = weight.astype(np.float32)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def shards():
+    from calotron.data import writeTFRecords
+
+    schema = writeTFRecords(
+        export_dir,
+        padded={"photon": photon, "weight": weight},
+        lengths={"photon": lengths, "weight": lengths},
+        num_shards=NUM_SHARDS,
+    )
+    yield schema
+
+
+###########################################################################
+
+
+def test_writer_schema(shards):
+    assert shards["num_events"] == NUM_EVENTS
+    assert len(shards["shards"]) == NUM_SHARDS
+    assert sum(shards["shard_sizes"]) == NUM_EVENTS
+    assert shards["features"]["photon"]["inner_shape"] == [3]
+    assert shards["features"]["weight"]["inner_shape"] == []
+
+
+def test_reader_ordered():
+    from calotron.data import readTFRecords
+
+    dataset = readTFRecords(
+        export_dir, BATCH_SIZE, shuffle=False, cycle_length=1, deterministic=True
+    )
+    assert dataset.element_spec[0].shape[1:] == (MAX_LENGTH, 3)
+    assert dataset.element_spec[1].shape[1:] == (MAX_LENGTH,)
+    p = np.concatenate([batch[0] for batch in dataset])
+    w = np.concatenate([batch[1] for batch in dataset])
+    assert np.allclose(p, photon)
+    assert np.allclose(w, weight)
+
+
+@pytest.mark.parametrize("deterministic", [True, False])
+def test_reader_shuffled(deterministic):
+    from calotron.data import readTFRecords
+
+    dataset = readTFRecords(
+        export_dir,
+        BATCH_SIZE,
+        features="photon",
+        shuffle=True,
+        shuffle_buffer=16,
+        seed=42,
+        deterministic=deterministic,
+        drop_remainder=True,
+        dtype=tf.float64,
+    )
+    assert dataset.element_spec.shape == (BATCH_SIZE, MAX_LENGTH, 3)
+    assert dataset.element_spec.dtype == tf.float64
+    epochs = [np.concatenate([batch for batch in dataset]) for _ in range(2)]
+    assert len(epochs[0]) == NUM_EVENTS // BATCH_SIZE * BATCH_SIZE
+    assert not np.allclose(epochs[0], epochs[1])  # reshuffled every epoch
+
+
+def test_reader_all_events():
+    from calotron.data import readTFRecords
+
+    dataset = readTFRecords(export_dir, BATCH_SIZE, features="weight", seed=42)
+    w = np.concatenate([batch for batch in dataset])
+    order = np.argsort(w.sum(axis=-1))
+    ref_order = np.argsort(weight.sum(axis=-1))
+    assert np.allclose(w[order], weight[ref_order])
+
+
+def test_reader_wrong_feature():
+    from calotron.data import readTFRecords
+
+    with pytest.raises(ValueError):
+        readTFRecords(export_dir, BATCH_SIZE, features="cluster")
+
+
+def test_writer_list_input():
+    from calotron.data import readTFRecords, writeTFRecords
+
+    list_dir = f"{here}/tmp/tfrecords_list"
+    writeTFRecords(
+        list_dir,
+        padded={"weight": weight.tolist()},
+        lengths={"weight": lengths.tolist()},
+        num_shards=1,
+    )
+    dataset = readTFRecords(list_dir, BATCH_SIZE, features="weight", shuffle=False)
+    w = np.concatenate([batch for batch in dataset])
+    assert np.allclose(w, weight)
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+NUM_EVENTS = 1000
+MAX_LENGTH = 8
+BATCH_SIZE = 64
+
+here = os.path.dirname(__file__)
+data_dir = f"{here}/tmp/pipeline"
+
+lengths = np.random.randint(1, MAX_LENGTH + 1, size=NUM_EVENTS)
+mask = np.arange(MAX_LENGTH)[None, :] < lengths[:, None]
+photon = np.random.normal(size=(NUM_EVENTS, MAX_LENGTH, 3)) * mask[:, :, None]
+weight = np.random.uniform(size=(NUM_EVENTS, MAX_LENGTH)) * mask
+photon = photon.astype(np.float32)
+weight = weight.astype(np.float32)
+
+
+###########################################################################
+
+
+def test_pipeline_training():
+    from calotron.data import makePipeline
+
+    dataset = makePipeline((photon, weight), BATCH_SIZE, training=True, seed=42)
+    assert dataset.element_spec[0].shape == (BATCH_SIZE, MAX_LENGTH, 3)
+    epochs = [np.concatenate([w for _, w in dataset]) for _ in range(2)]
+    assert len(epochs[0]) == NUM_EVENTS // BATCH_SIZE * BATCH_SIZE
+    assert not np.allclose(epochs[0], epochs[1])  # reshuffled every epoch
+
+
+def test_pipeline_validation():
+    from calotron.data import makePipeline
+
+    dataset = makePipeline(
+        (photon, weight), BATCH_SIZE, training=False, deterministic=True
+    )
+    assert dataset.element_spec[0].shape == (None, MAX_LENGTH, 3)
+    w = np.concatenate([w for _, w in dataset])
+    assert np.allclose(w, weight)  # all the events, in order
+
+
+def test_pipeline_deterministic():
+    from calotron.data import makePipeline
+
+    epochs = list()
+    for _ in range(2):
+        dataset = makePipeline(
+            (photon, weight), batch_size=BATCH_SIZE, deterministic=True, seed=42
+        )
+        epochs.append(np.concatenate([w for _, w in dataset]))
+    assert np.allclose(epochs[0], epochs[1])
+
+
+def test_pipeline_cache_and_map(tmp_path):
+    from calotron.data import makePipeline
+
+    dataset = makePipeline(
+        (photon, weight),
+        BATCH_SIZE,
+        training=False,
+        cache_file=str(tmp_path / "cache"),
+        map_fn=lambda p, w: ((p, p), tf.ones_like(w)),
+    )
+    for _ in range(2):  # the second epoch is read from the cache file
+        (p1, p2), w = next(iter(dataset))
+        assert np.allclose(p1, p2)
+        assert np.all(w.numpy() == 1.0)
+
+
+def test_pipeline_ragged():
+    from calotron.data import RaggedDataset, makePipeline, writeRaggedDataset
+
+    writeRaggedDataset(
+        data_dir,
+        padded={"photon": photon, "weight": weight},
+        lengths={"photon": lengths, "weight": lengths},
+    )
+    ragged = RaggedDataset(data_dir)
+    indices = np.arange(NUM_EVENTS // 2)
+    dataset = makePipeline(
+        ragged, BATCH_SIZE, training=True, features=["photon"], indices=indices
+    )
+    assert dataset.element_spec[0].shape == (BATCH_SIZE, MAX_LENGTH, 3)
+    num_batches = sum([1 for _ in dataset])
+    assert num_batches == len(indices) // BATCH_SIZE
+
+    # Options not applying to the ragged format are rejected
+    with pytest.raises(ValueError):
+        makePipeline(ragged, BATCH_SIZE, shuffle_buffer=1024)
+    with pytest.raises(ValueError):
+        makePipeline(ragged, BATCH_SIZE, cache_file="")
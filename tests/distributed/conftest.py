@@ -0,0 +1,22 @@
+import pytest
+import tensorflow as tf
+
+NUM_REPLICAS = 2
+
+# Two logical CPUs allow to test data-parallel training on a single host;
+# devices can only be split before the TF runtime is initialized, so these
+# tests are run on their own (`pytest tests/distributed/`)
+cpus = tf.config.list_physical_devices("CPU")
+try:
+    tf.config.set_logical_device_configuration(
+        cpus[0], [tf.config.LogicalDeviceConfiguration()] * NUM_REPLICAS
+    )
+except RuntimeError:
+    pass  # runtime already initialized by the other test modules
+
+
+@pytest.fixture(scope="session")
+def strategy():
+    if len(tf.config.list_logical_devices("CPU")) < NUM_REPLICAS:
+        pytest.skip("logical CPUs not available, run `pytest tests/distributed/`")
+    return tf.distribute.MirroredStrategy([f"/cpu:{i}" for i in range(NUM_REPLICAS)])
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+CHUNK_SIZE = int(1e4)
+y_true = np.random.uniform(0.0, 1.0, size=(CHUNK_SIZE, 1))
+y_pred = np.random.uniform(0.0, 1.0, size=(CHUNK_SIZE, 1))
+weight = np.random.uniform(0.0, 1.0, size=(CHUNK_SIZE, 4))
+
+
+@pytest.fixture
+def metric():
+    from calotron.metrics import WassersteinDistance
+
+    metric_ = WassersteinDistance()
+    return metric_
+
+
+###########################################################################
+
+
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_gather_replicas(strategy, sample_weight):
+    from calotron.metrics.BaseMetric import BaseMetric
+
+    if sample_weight is not None:
+        slices = (y_true, y_pred, sample_weight)
+    else:
+        slices = (y_true, y_pred)
+    dataset = tf.data.Dataset.from_tensor_slices(slices).batch(CHUNK_SIZE)
+    batch = next(iter(strategy.experimental_distribute_dataset(dataset)))
+
+    @tf.function
+    def replica_fn(*args):
+        gathered = BaseMetric._gather_replicas(*args)
+        weights = BaseMetric._prepare_weights(gathered[2])
+        if weights is None:
+            weights = tf.ones_like(gathered[1][:, 0])
+        value = tf.reduce_sum(weights * (gathered[1] - gathered[0])[:, 0])
+        value /= tf.reduce_sum(weights)
+        return gathered[:2], value
+
+    # Every replica sees the whole global batch, in the original order
+    gathered, value = strategy.run(replica_fn, args=batch)
+    if sample_weight is not None:
+        ref_weights = sample_weight.mean(axis=1)
+    else:
+        ref_weights = np.ones(CHUNK_SIZE)
+    ref = np.sum(ref_weights * (y_pred - y_true)[:, 0]) / np.sum(ref_weights)
+    for replica_value in strategy.experimental_local_results(value):
+        assert abs(replica_value.numpy() - ref) < 1e-6
+    for values, ref_values in zip(gathered, [y_true, y_pred]):
+        for replica_values in strategy.experimental_local_results(values):
+            assert np.allclose(replica_values.numpy(), ref_values)
+
+
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_metric_distributed(strategy, metric, sample_weight):
+    from calotron.metrics import WassersteinDistance
+
+    metric.update_state(y_true, y_pred, sample_weight=sample_weight)
+    ref = metric.result().numpy()
+
+    with strategy.scope():
+        dist_metric = WassersteinDistance()
+    if sample_weight is not None:
+        slices = (y_true, y_pred, sample_weight)
+    else:
+        slices = (y_true, y_pred)
+    dataset = tf.data.Dataset.from_tensor_slices(slices).batch(CHUNK_SIZE)
+    batch = next(iter(strategy.experimental_distribute_dataset(dataset)))
+
+    @tf.function
+    def replica_fn(*args):
+        dist_metric.update_state(*args)
+
+    strategy.run(replica_fn, args=batch)
+    res = dist_metric.result().numpy()
+    assert abs(res - ref) < 1e-5
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from tensorflow.keras.optimizers import RMSprop
+
+from calotron.models.discriminators import Discriminator
+from calotron.models.transformers import Transformer
+
+CHUNK_SIZE = int(1e4)
+BATCH_SIZE = 500
+
+source = tf.random.normal(shape=(CHUNK_SIZE, 8, 5))
+target = tf.random.normal(shape=(CHUNK_SIZE, 4, 3))
+weight = tf.random.uniform(shape=(CHUNK_SIZE, target.shape[1]))
+
+
+def _deterministic_model():
+    # Dropout disabled to compare gradients computed on different splits
+    from calotron.models import Calotron
+
+    det_transf = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.0,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+    )
+    det_disc = Discriminator(
+        latent_dim=8,
+        output_units=1,
+        output_activation="sigmoid",
+        deepsets_num_layers=2,
+        deepsets_hidden_units=32,
+        dropout_rate=0.0,
+    )
+    calo = Calotron(transformer=det_transf, discriminator=det_disc)
+    calo((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+    return calo
+
+
+def _accumulated_gradients(model, player, accum_steps, batch):
+    from calotron.losses import MeanSquaredError
+
+    # Reconstruction-only transformer loss, since the scale of the mixed
+    # loss is rounded batch-wise and may differ between micro-batches
+    loss = MeanSquaredError(alpha=0.0, adversarial_metric="binary-crossentropy")
+    if player == "transformer":
+        loss_fn, player = loss.transformer_loss, model.transformer
+    else:
+        loss_fn, player = loss.discriminator_loss, model.discriminator
+    source, target, sample_weight = batch
+    _, gradients, trainable_vars = model._compute_gradients(
+        loss_fn=loss_fn,
+        player=player,
+        optimizer=RMSprop(learning_rate=0.001),
+        accum_steps=accum_steps,
+        source=source,
+        target=target,
+        sample_weight=sample_weight,
+    )
+    return [
+        tf.zeros_like(var) if grad is None else tf.convert_to_tensor(grad)
+        for grad, var in zip(gradients, trainable_vars)
+    ]
+
+
+###########################################################################
+
+
+@pytest.mark.parametrize("player", ["transformer", "discriminator"])
+@pytest.mark.parametrize("accum_steps", [1, 2])
+def test_model_grad_accumulation_distributed(strategy, player, accum_steps):
+    with strategy.scope():
+        model = _deterministic_model()
+    batch = (source[:BATCH_SIZE], target[:BATCH_SIZE], weight[:BATCH_SIZE])
+    full_grads = _accumulated_gradients(model, player, 1, batch)
+
+    # Global batch split across the replicas, gradients summed as in training
+    dist_batch = next(
+        iter(
+            strategy.experimental_distribute_dataset(
+                tf.data.Dataset.from_tensor_slices(batch).batch(BATCH_SIZE)
+            )
+        )
+    )
+    per_replica_grads = strategy.run(
+        lambda batch: _accumulated_gradients(model, player, accum_steps, batch),
+        args=(dist_batch,),
+    )
+    accum_grads = [
+        strategy.reduce(tf.distribute.ReduceOp.SUM, grad, axis=None)
+        for grad in per_replica_grads
+    ]
+    assert len(full_grads) == len(accum_grads)
+    for full_grad, accum_grad in zip(full_grads, accum_grads):
+        assert np.allclose(full_grad, accum_grad, rtol=1e-4, atol=1e-6)
+
+@pytest.mark.parametrize(
+    "adversarial_metrics", ["binary-crossentropy", "wasserstein-distance"]
+)
+def test_model_train_distributed(strategy, adversarial_metrics):
+    from calotron.losses import MeanSquaredError
+    from calotron.models import Calotron
+
+    with strategy.scope():
+        dist_transf = Transformer(
+            output_depth=target.shape[2],
+            encoder_depth=8,
+            decoder_depth=8,
+            num_layers=2,
+            num_heads=4,
+            key_dim=32,
+            seq_ord_max_length=max(source.shape[1], target.shape[1]),
+            output_activations="linear",
+        )
+        dist_disc = Discriminator(
+            latent_dim=8,
+            output_units=1,
+            output_activation="sigmoid",
+            deepsets_num_layers=2,
+            deepsets_hidden_units=32,
+        )
+        model = Calotron(transformer=dist_transf, discriminator=dist_disc)
+        loss = MeanSquaredError(alpha=0.5, adversarial_metric=adversarial_metrics)
+        model.compile(
+            loss=loss,
+            metrics=["bce"],
+            transformer_optimizer="rmsprop",
+            discriminator_optimizer="rmsprop",
+            discriminator_upds_per_batch=2,
+        )
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target, weight))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    model.fit(dataset, epochs=1)
+    for var in dist_disc.trainable_variables:
+        replicas = strategy.experimental_local_results(var)
+        assert len(replicas) == 2
+        assert tf.reduce_all(replicas[0] == replicas[1])
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+
+NUM_EVENTS = 256
+BATCH_SIZE = 32
+DELAY = 0.02
+
+x = np.random.normal(size=(NUM_EVENTS, 4)).astype(np.float32)
+y = np.random.normal(size=(NUM_EVENTS, 1)).astype(np.float32)
+
+
+def slow_step(x):
+    # Deliberately slow training step, fed by a fast input pipeline
+    def sleep(x):
+        time.sleep(DELAY)
+        return x
+
+    out = tf.py_function(sleep, inp=[x], Tout=tf.float32)
+    out.set_shape(x.shape)
+    return out
+
+
+###########################################################################
+
+
+def test_monitor_fast_pipeline_distributed(strategy):
+    from calotron.data import InputStallMonitor, makePipeline
+
+    # Batches prefetched to the devices during the previous step aren't stalls
+    monitor = InputStallMonitor()
+    dataset = makePipeline((x, y), BATCH_SIZE, monitor=monitor)
+    with strategy.scope():
+        model = tf.keras.Sequential(
+            [tf.keras.layers.Lambda(slow_step), tf.keras.layers.Dense(1)]
+        )
+        model.compile(optimizer="sgd", loss="mse")
+    model.fit(dataset, epochs=2, callbacks=[monitor])
+    assert len(monitor.stall_fractions) == 2
+    assert all(frac < 0.1 for frac in monitor.stall_fractions)
+
+
+def test_monitor_datasets_from_function(strategy):
+    from calotron.data import InputStallMonitor, makePipeline
+
+    # One batch per local replica consumed at each step
+    num_local_replicas = len(strategy.extended.worker_devices)
+    monitor = InputStallMonitor(batches_per_step=num_local_replicas)
+
+    def dataset_fn(input_context):
+        dataset = makePipeline(
+            (x, y),
+            input_context.get_per_replica_batch_size(BATCH_SIZE),
+            seed=0,
+            monitor=monitor,
+        )
+        return dataset.repeat()
+
+    dataset = strategy.distribute_datasets_from_function(dataset_fn)
+    with strategy.scope():
+        model = tf.keras.Sequential(
+            [tf.keras.layers.Lambda(slow_step), tf.keras.layers.Dense(1)]
+        )
+        model.compile(optimizer="sgd", loss="mse")
+    model.fit(
+        dataset, epochs=2, steps_per_epoch=NUM_EVENTS // BATCH_SIZE, callbacks=[monitor]
+    )
+    assert len(monitor.stall_fractions) == 2
+    assert all(frac < 0.1 for frac in monitor.stall_fractions)
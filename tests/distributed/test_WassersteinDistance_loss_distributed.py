@@ -0,0 +1,68 @@
+import pytest
+import tensorflow as tf
+
+from calotron.models.discriminators import Discriminator
+from calotron.models.transformers import Transformer
+
+CHUNK_SIZE = int(1e4)
+source = tf.random.normal(shape=(CHUNK_SIZE, 8, 5))
+target = tf.random.normal(shape=(CHUNK_SIZE, 4, 3))
+weight = tf.random.uniform(shape=(CHUNK_SIZE, target.shape[1]))
+
+transf = Transformer(
+    output_depth=target.shape[2],
+    encoder_depth=8,
+    decoder_depth=8,
+    num_layers=2,
+    num_heads=4,
+    key_dim=32,
+    seq_ord_max_length=max(source.shape[1], target.shape[1]),
+    output_activations="linear",
+)
+
+disc = Discriminator(
+    output_units=1,
+    latent_dim=8,
+    deepsets_num_layers=2,
+    deepsets_hidden_units=32,
+    output_activation=None,
+)
+
+
+@pytest.fixture
+def loss():
+    from calotron.losses import WassersteinDistance
+
+    loss_ = WassersteinDistance(
+        lipschitz_regularizer="alp",
+        lipschitz_penalty=100.0,
+        lipschitz_penalty_strategy="one-sided",
+        warmup_energy=1e-8,
+    )
+    return loss_
+
+
+###########################################################################
+
+
+def test_loss_distributed(strategy, loss):
+    dataset = tf.data.Dataset.from_tensor_slices((source, target, weight)).batch(
+        CHUNK_SIZE
+    )
+    batch = next(iter(strategy.experimental_distribute_dataset(dataset)))
+
+    @tf.function
+    def replica_fn(source, target, weight):
+        return loss.transformer_loss(
+            transformer=transf,
+            discriminator=disc,
+            source=source,
+            target=target,
+            sample_weight=weight,
+            training=False,
+        )
+
+    out = strategy.run(replica_fn, args=batch)
+    out = strategy.reduce(tf.distribute.ReduceOp.SUM, out, axis=None)
+    ref = replica_fn(source, target, weight)
+    assert abs(out.numpy() - ref.numpy()) < 1e-5 * max(1.0, abs(ref.numpy()))
@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from calotron.finetuning.FineTuner import FINETUNING_COMPONENTS
+from calotron.models.transformers import Transformer
+
+CHUNK_SIZE = int(1e3)
+BATCH_SIZE = 250
+
+here = os.path.dirname(__file__)
+export_dir = f"{here}/tmp/transformer"
+
+source = tf.random.normal(shape=(CHUNK_SIZE, 8, 5))
+target = tf.random.normal(shape=(CHUNK_SIZE, 4, 3))
+
+dataset = (
+    tf.data.Dataset.from_tensor_slices(((source, target), target))
+    .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+    .cache()
+)
+
+
+def get_transformer() -> Transformer:
+    model = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=16,
+        admin_res_scale="O(n)",
+        mlp_units=32,
+        dropout_rate=0.0,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        start_token_initializer="ones",
+    )
+    model((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+    return model
+
+
+@pytest.fixture
+def finetuner():
+    from calotron.finetuning import FineTuner
+
+    ft = FineTuner(
+        model=get_transformer(),
+        trainable_components=FINETUNING_COMPONENTS,
+        adapter_units=4,
+    )
+    return ft
+
+
+###########################################################################
+
+
+def test_finetuner_configuration(finetuner):
+    from calotron.finetuning import FineTuner
+
+    assert isinstance(finetuner, FineTuner)
+    assert isinstance(finetuner.model, Transformer)
+    assert isinstance(finetuner.trainable_components, list)
+    assert isinstance(finetuner.adapter_units, int)
+    assert isinstance(finetuner.num_trainable_params, int)
+
+
+def test_finetuner_errors():
+    from calotron.finetuning import FineTuner
+
+    with pytest.raises(TypeError):
+        FineTuner(model=tf.keras.Sequential())
+    with pytest.raises(ValueError):
+        FineTuner(model=get_transformer(), trainable_components=["encoder"])
+
+
+@pytest.mark.parametrize("components", [["adapters"], ["omegas"], ["output"]])
+def test_finetuner_prepare(components):
+    from calotron.finetuning import FineTuner
+
+    finetuner = FineTuner(
+        model=get_transformer(), trainable_components=components, adapter_units=4
+    )
+    num_params = finetuner.num_trainable_params
+    values = {var.ref(): var.numpy() for var in finetuner.model.weights}
+    model = finetuner.prepare()
+    assert finetuner.num_trainable_params > 0
+    assert finetuner.num_trainable_params < num_params
+
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
+
+    # Frozen weights left untouched by the fine-tuning
+    trainable = {var.ref() for var in model.trainable_variables}
+    for var in model.weights:
+        if var.ref() in values and var.ref() not in trainable:
+            assert np.allclose(var.numpy(), values[var.ref()])
+
+
+def test_finetuner_warm_start():
+    from calotron.finetuning import FineTuner
+
+    pretrained = get_transformer()
+    tf.keras.models.save_model(pretrained, export_dir, save_format="tf")
+    output = pretrained((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+
+    # Zero-initialized adapters leave the pretrained outputs unchanged
+    finetuner = FineTuner(
+        model=get_transformer(),
+        trainable_components=["adapters", "omegas"],
+        adapter_units=4,
+    )
+    finetuner.warm_start(export_dir)
+    model = finetuner.prepare()
+    output_ft = model((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+    assert tf.reduce_max(tf.abs(output - output_ft)) < 1e-5
+
+
+def test_finetuner_omegas_in_place():
+    from calotron.finetuning import FineTuner
+    from calotron.layers import AdminResidual
+
+    model = get_transformer()
+    num_weights = len(model.weights)
+    layers = [
+        layer
+        for layer in model._flatten_layers(include_self=False)
+        if isinstance(layer, AdminResidual)
+    ]
+    omegas = [layer._omega for layer in layers]
+    trainable = {var.ref() for var in model.trainable_variables}
+    assert all(omega.ref() not in trainable for omega in omegas)
+
+    # Fixed omegas released without replacing the checkpointed variables
+    finetuner = FineTuner(model=model, trainable_components=["omegas"])
+    model = finetuner.prepare()
+    assert len(model.weights) == num_weights
+    trainable = {var.ref() for var in model.trainable_variables}
+    for layer, omega in zip(layers, omegas):
+        assert layer._omega is omega
+        assert layer.omega_trainable
+        assert omega.ref() in trainable
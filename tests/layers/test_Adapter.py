@@ -0,0 +1,29 @@
+import pytest
+import tensorflow as tf
+
+
+@pytest.fixture
+def layer():
+    from calotron.layers import Adapter
+
+    adapter = Adapter(embed_dim=24, adapter_units=4)
+    return adapter
+
+
+###########################################################################
+
+
+def test_layer_configuration(layer):
+    from calotron.layers import Adapter
+
+    assert isinstance(layer, Adapter)
+    assert isinstance(layer.embed_dim, int)
+    assert isinstance(layer.adapter_units, int)
+
+
+def test_layer_use(layer):
+    x = tf.random.normal(shape=(100, 16, 24))
+    output = layer(x)
+    assert output.shape == x.shape
+    # Zero-initialized up-projection gives the identity
+    assert tf.reduce_max(tf.abs(output - x)) < 1e-6
@@ -37,3 +37,15 @@ def test_layer_use(output_change_scale):
     test_shape = list(x.shape)
     test_shape[-1] = layer.embed_dim
     assert output.shape == tuple(test_shape)
+
+
+@pytest.mark.parametrize("output_change_scale", OUTPUT_CHANGE_SCALES)
+def test_layer_skip(output_change_scale):
+    from calotron.layers import AdminResidual
+
+    layer = AdminResidual(
+        embed_dim=24, num_res_layers=5, output_change_scale=output_change_scale
+    )
+    x = tf.random.normal(shape=(100, 16, 24))
+    output = layer([x, tf.zeros_like(x)])
+    assert tf.reduce_max(tf.abs(layer.skip(x) - output)) < 1e-6
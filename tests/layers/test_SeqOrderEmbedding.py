@@ -31,3 +31,15 @@ def test_layer_use(layer):
     test_shape = list(input.shape)
     test_shape[-1] = layer.latent_dim
     assert output.shape == tuple(test_shape)
+
+
+def test_layer_positions(layer):
+    input = tf.random.normal(shape=(100, 16, 5))
+    output = layer(input, training=False)
+
+    # Tokens of a pruned sequence embedded at their original positions
+    positions = tf.tile(tf.constant([[1, 4, 9, 15]]), (100, 1))
+    pruned = tf.gather(input, positions, batch_dims=1)
+    pruned_output = layer(pruned, positions=positions, training=False)
+    ref_output = tf.gather(output, positions, batch_dims=1)
+    assert tf.reduce_max(tf.abs(pruned_output - ref_output)) < 1e-6
@@ -1,7 +1,7 @@
 import pytest
 import tensorflow as tf
 
-from calotron.models.discriminators import Discriminator
+from calotron.models.discriminators import Discriminator, GigaDiscriminator
 from calotron.models.transformers import Transformer
 
 CHUNK_SIZE = int(1e4)
@@ -36,6 +36,19 @@ disc = Discriminator(
     dropout_rate=0.1,
 )
 
+giga_disc = GigaDiscriminator(
+    output_units=1,
+    encoder_depth=8,
+    decoder_depth=8,
+    num_layers=1,
+    num_heads=2,
+    key_dim=8,
+    mlp_units=16,
+    dropout_rate=0.1,
+    seq_ord_max_length=max(source.shape[1], target.shape[1]),
+    output_activation="sigmoid",
+)
+
 
 @pytest.fixture
 def loss():
@@ -97,3 +110,63 @@ def test_loss_use(from_logits, sample_weight):
         training=False,
     )
     assert out.numpy() + 1e-12
+
+
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_loss_condition_aware(loss, sample_weight):
+    assert giga_disc.condition_aware
+    with tf.GradientTape() as tape:
+        out = loss.discriminator_loss(
+            transformer=transf,
+            discriminator=giga_disc,
+            source=source[:256],
+            target=target[:256],
+            sample_weight=sample_weight[:256] if sample_weight is not None else None,
+            training=True,
+        )
+    grads = tape.gradient(out, giga_disc.trainable_variables)
+    assert out.shape == ()
+    assert all(grad is not None for grad in grads)
+
+
+@pytest.mark.parametrize("dropout_player", ["transformer", "discriminator"])
+def test_loss_training_players(dropout_player):
+    from calotron.losses import BinaryCrossentropy
+
+    # Dropout active only in the player under training, i.e. the discriminator
+    dropout_rates = {"transformer": 0.0, "discriminator": 0.0}
+    dropout_rates[dropout_player] = 0.5
+    transf_ = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        dropout_rate=dropout_rates["transformer"],
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+    )
+    disc_ = Discriminator(
+        output_units=1,
+        latent_dim=8,
+        deepsets_num_layers=2,
+        deepsets_hidden_units=32,
+        output_activation=None,
+        dropout_rate=dropout_rates["discriminator"],
+    )
+    loss = BinaryCrossentropy(injected_noise_stddev=0.0, from_logits=True)
+    outs = [
+        loss.discriminator_loss(
+            transformer=transf_,
+            discriminator=disc_,
+            source=source[:256],
+            target=target[:256],
+            training=True,
+        ).numpy()
+        for _ in range(2)
+    ]
+    if dropout_player == "discriminator":
+        assert abs(outs[0] - outs[1]) > 1e-6
+    else:
+        assert abs(outs[0] - outs[1]) < 1e-6
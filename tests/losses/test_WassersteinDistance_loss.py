@@ -5,7 +5,7 @@ from calotron.losses.WassersteinDistance import (
     LIPSCHITZ_REGULARIZERS,
     PENALTY_STRATEGIES,
 )
-from calotron.models.discriminators import Discriminator
+from calotron.models.discriminators import Discriminator, GigaDiscriminator
 from calotron.models.transformers import Transformer
 
 CHUNK_SIZE = int(1e4)
@@ -40,6 +40,19 @@ disc = Discriminator(
     dropout_rate=0.1,
 )
 
+giga_disc = GigaDiscriminator(
+    output_units=1,
+    encoder_depth=8,
+    decoder_depth=8,
+    num_layers=1,
+    num_heads=2,
+    key_dim=8,
+    mlp_units=16,
+    dropout_rate=0.1,
+    seq_ord_max_length=max(source.shape[1], target.shape[1]),
+    output_activation="sigmoid",
+)
+
 
 @pytest.fixture
 def loss():
@@ -64,6 +77,8 @@ def test_loss_configuration(loss):
     assert isinstance(loss.lipschitz_regularizer, str)
     assert isinstance(loss.lipschitz_penalty, float)
     assert isinstance(loss.lipschitz_penalty_strategy, str)
+    assert isinstance(loss.virtual_direction_upds, int)
+    assert isinstance(loss.lipschitz_penalty_interval, int)
     assert isinstance(loss.warmup_energy, float)
     assert isinstance(loss.name, str)
 
@@ -99,3 +114,72 @@ def test_loss_use(lp_regularizer, lp_strategy, sample_weight):
         training=False,
     )
     assert out.numpy() + 1e-12
+
+
+@pytest.mark.parametrize("virtual_direction_upds", [0, 2])
+def test_loss_virtual_direction(virtual_direction_upds):
+    from calotron.losses import WassersteinDistance
+
+    loss = WassersteinDistance(
+        lipschitz_regularizer="alp",
+        lipschitz_penalty=100.0,
+        lipschitz_penalty_strategy="two-sided",
+        virtual_direction_upds=virtual_direction_upds,
+        warmup_energy=1e-8,
+    )
+    with tf.GradientTape() as tape:
+        out = loss.discriminator_loss(
+            transformer=transf,
+            discriminator=disc,
+            source=source,
+            target=target,
+            sample_weight=weight,
+            training=False,
+        )
+    grads = tape.gradient(out, disc.trainable_variables)
+    assert out.shape == ()
+    assert all(grad is not None for grad in grads)
+
+
+@pytest.mark.parametrize("lp_regularizer", LIPSCHITZ_REGULARIZERS)
+def test_loss_lazy_regularization(lp_regularizer):
+    from calotron.losses import WassersteinDistance
+
+    loss = WassersteinDistance(
+        lipschitz_regularizer=lp_regularizer,
+        lipschitz_penalty=100.0,
+        lipschitz_penalty_strategy="two-sided",
+        lipschitz_penalty_interval=3,
+        warmup_energy=1e-8,
+    )
+    args = dict(transformer=transf, discriminator=disc, source=source, target=target)
+    outs = list()
+    for _ in range(4):
+        outs.append(loss.discriminator_loss(**args, training=True).numpy())
+        loss.on_discriminator_update()
+    assert loss._lipschitz_step.numpy() == 4
+    assert outs[0] - outs[1] > 1.0  # penalty computed at the 1st step
+    assert abs(outs[1] - outs[2]) < 0.1  # skipped at the 2nd and 3rd
+    assert outs[3] - outs[2] > 1.0  # and computed again at the 4th
+
+    # The step only advances with the discriminator updates
+    out = loss.discriminator_loss(**args, training=True).numpy()
+    assert loss._lipschitz_step.numpy() == 4
+    assert abs(out - outs[2]) < 0.1  # skipped at the 5th
+
+
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_loss_condition_aware(loss, sample_weight):
+    assert giga_disc.condition_aware
+    with tf.GradientTape() as tape:
+        out = loss.discriminator_loss(
+            transformer=transf,
+            discriminator=giga_disc,
+            source=source[:256],
+            target=target[:256],
+            sample_weight=sample_weight[:256] if sample_weight is not None else None,
+            training=True,
+        )
+    grads = tape.gradient(out, giga_disc.trainable_variables)
+    assert out.shape == ()
+    assert all(grad is not None for grad in grads)
@@ -73,6 +73,9 @@ def test_model_configuration(model):
     assert isinstance(model.encoder_seq_ord_normalization, float)
     assert isinstance(model.decoder_seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
+    assert isinstance(model.encoder_token_keep_rate, float)
     # assert isinstance(model.output_activation, str)
     assert isinstance(model.condition_aware, bool)
     # assert isinstance(model.pretrained_encoder_dir, str)
@@ -139,3 +142,94 @@ def test_model_train(model):
     bce = tf.keras.losses.BinaryCrossentropy(from_logits=False)
     model.compile(optimizer=adam, loss=bce)
     model.fit(dataset, epochs=1)
+
+
+@pytest.mark.parametrize("padding_mask", [weight, None])
+def test_model_mixed_precision(padding_mask):
+    from calotron.models.discriminators import GigaDiscriminator
+
+    model = GigaDiscriminator(
+        output_units=1,
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        admin_res_scale="O(n)",
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_latent_dim=16,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        seq_ord_normalization=10_000,
+        enable_res_smoothing=True,
+        output_activation="sigmoid",
+        pretrained_encoder_dir=None,
+        additional_encoder_layers=None,
+        dtype="mixed_bfloat16",
+    )
+    output = model((source, target), padding_mask=padding_mask)
+    assert model.compute_dtype == "bfloat16"
+    assert output.dtype == tf.float32
+    test_shape = [target.shape[0]]
+    test_shape.append(model.output_units)
+    assert output.shape == tuple(test_shape)
+
+
+@pytest.mark.parametrize("padding_mask", [weight, None])
+def test_model_source_memory(model, padding_mask):
+    output = model((source, target), padding_mask=padding_mask, training=False)
+    memory = model.encode_source(source, training=False)
+    assert memory.shape == (
+        source.shape[0],
+        source.shape[1],
+        model.encoder_output_depth,
+    )
+    output_mem = model(
+        (source, target),
+        padding_mask=padding_mask,
+        source_memory=memory,
+        training=False,
+    )
+    assert tf.reduce_max(tf.abs(output - output_mem)) < 1e-5
+    perm = tf.random.shuffle(tf.range(source.shape[0]))
+    output_perm = model(
+        (tf.gather(source, perm), target),
+        padding_mask=padding_mask,
+        training=False,
+    )
+    output_mem_perm = model(
+        (tf.gather(source, perm), target),
+        padding_mask=padding_mask,
+        source_memory=tf.gather(memory, perm),
+        training=False,
+    )
+    assert tf.reduce_max(tf.abs(output_perm - output_mem_perm)) < 1e-5
+
+
+def test_model_recompute_layers():
+    from calotron.models.discriminators import GigaDiscriminator
+
+    model = GigaDiscriminator(
+        output_units=1,
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activation="sigmoid",
+        recompute_layers=True,
+    )
+    assert model.recompute_layers
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(((source, target), labels))
+        .batch(batch_size=512, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    bce = tf.keras.losses.BinaryCrossentropy(from_logits=False)
+    model.compile(optimizer=adam, loss=bce)
+    model.fit(dataset, epochs=1)
@@ -50,6 +50,8 @@ def test_model_configuration(model):
     assert isinstance(model.seq_ord_max_length, int)
     assert isinstance(model.seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
     assert isinstance(model.autoregressive_mode, bool)
 
 
@@ -96,3 +98,56 @@ def test_model_train(model):
     mse = tf.keras.losses.MeanSquaredError()
     model.compile(optimizer=adam, loss=mse)
     model.fit(dataset, epochs=1)
+
+
+def test_model_recompute_layers():
+    from calotron.models.players import Decoder
+
+    model = Decoder(
+        output_depth=target.shape[-1],
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_max_length=512,
+        recompute_layers=True,
+    )
+    assert model.recompute_layers
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(((target, source), target))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
+
+
+def test_model_layer_drop():
+    from calotron.models.players import Decoder
+
+    model = Decoder(
+        output_depth=target.shape[-1],
+        num_layers=4,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_max_length=512,
+        recompute_layers=True,
+        layer_drop_rate=0.5,
+    )
+    assert model.layer_drop_rate == 0.5
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(((target, source), target))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
@@ -4,6 +4,7 @@ import pytest
 import tensorflow as tf
 
 from calotron.layers.AdminResidual import OUTPUT_CHANGE_SCALES
+from calotron.models.players.Encoder import TOKEN_SCORES
 
 CHUNK_SIZE = int(1e4)
 BATCH_SIZE = 500
@@ -54,6 +55,8 @@ def test_model_configuration(model):
     assert isinstance(model.seq_ord_max_length, int)
     assert isinstance(model.seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
 
 
 @pytest.mark.parametrize("admin_res_scale", OUTPUT_CHANGE_SCALES)
@@ -130,3 +133,177 @@ def test_model_export(enable_res_smoothing):
     output_reloaded = reloaded(source[:BATCH_SIZE])
     comparison = output.numpy() == output_reloaded.numpy()
     assert comparison.all()
+
+
+@pytest.mark.parametrize("dropout_rate", [0.0, 0.1])
+def test_model_recompute_layers(dropout_rate):
+    from calotron.models.players import Encoder
+
+    model = Encoder(
+        output_depth=target.shape[-1],
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=dropout_rate,
+        seq_ord_max_length=512,
+        recompute_layers=True,
+    )
+    assert model.recompute_layers
+    model(source[:BATCH_SIZE])
+
+    # Recomputed activations give the same gradients
+    if dropout_rate == 0.0:
+        gradients = list()
+        for recompute_layers in [True, False]:
+            model._recompute_layers = recompute_layers
+            with tf.GradientTape() as tape:
+                output = model(source[:BATCH_SIZE], training=True)
+                loss = tf.reduce_mean(tf.square(output - target[:BATCH_SIZE]))
+            gradients.append(tape.gradient(loss, model.trainable_variables))
+        for grad_rec, grad in zip(*gradients):
+            assert tf.reduce_max(tf.abs(grad_rec - grad)) < 1e-5
+        model._recompute_layers = True
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
+
+
+@pytest.mark.parametrize("recompute_layers", [True, False])
+def test_model_layer_drop(recompute_layers):
+    from calotron.models.players import Encoder
+
+    model = Encoder(
+        output_depth=target.shape[-1],
+        num_layers=4,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.0,
+        seq_ord_max_length=512,
+        recompute_layers=recompute_layers,
+        layer_drop_rate=0.5,
+    )
+    assert model.layer_drop_rate == 0.5
+    assert model._layer_drop_rates[0] == 0.0
+    assert model._layer_drop_rates[-1] == 0.0
+    model(source[:BATCH_SIZE])
+
+    # Inference is deterministic
+    output_1 = model(source[:BATCH_SIZE], training=False)
+    output_2 = model(source[:BATCH_SIZE], training=False)
+    assert tf.reduce_max(tf.abs(output_1 - output_2)) < 1e-6
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
+
+
+@pytest.mark.parametrize("num_layers", [1, 2])
+def test_model_layer_drop_too_shallow(num_layers):
+    from calotron.models.players import Encoder
+
+    with pytest.raises(ValueError):
+        Encoder(
+            output_depth=target.shape[-1],
+            num_layers=num_layers,
+            num_heads=4,
+            key_dim=32,
+            layer_drop_rate=0.5,
+        )
+
+
+@pytest.mark.parametrize("token_score", TOKEN_SCORES)
+def test_model_token_pruning(token_score):
+    from calotron.models.players import Encoder
+
+    model = Encoder(
+        output_depth=target.shape[-1],
+        num_layers=3,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.0,
+        seq_ord_max_length=512,
+        token_keep_rate=0.5,
+        token_score=token_score,
+        token_energy_index=2,
+    )
+    assert model.token_keep_rate == 0.5
+    assert model.token_score == token_score
+    assert model.token_energy_index == 2
+
+    # Trailing padded photons
+    padded_source = tf.concat(
+        [source[:BATCH_SIZE, :6], tf.zeros_like(source[:BATCH_SIZE, :2])], axis=1
+    )
+    output = model(padded_source)
+    assert output.shape == (BATCH_SIZE, 2, target.shape[-1])
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target[:, :2]))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
+    if token_score == "learned":
+        assert len(model._token_scorer.trainable_weights) > 0
+
+
+@pytest.mark.parametrize("token_score", TOKEN_SCORES)
+def test_model_token_pruning_order(token_score):
+    from calotron.models.players import Encoder
+
+    model = Encoder(
+        output_depth=target.shape[-1],
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.0,
+        seq_ord_max_length=512,
+        token_keep_rate=0.5,
+        token_score=token_score,
+        token_energy_index=2,
+    )
+
+    # Padded photons at positions 1 and 4, zero-energy ones at 2 and 6
+    photons = tf.abs(source[:BATCH_SIZE]) + 0.1
+    valid = tf.constant([1.0, 0.0, 1.0, 1.0, 0.0, 1.0, 1.0, 1.0])
+    photons *= valid[None, :, None]
+    energy_mask = tf.constant([1.0, 1.0, 0.0, 1.0, 1.0, 1.0, 0.0, 1.0])
+    photons = tf.concat(
+        [
+            photons[:, :, :2],
+            photons[:, :, 2:3] * energy_mask[None, :, None],
+            photons[:, :, 3:],
+        ],
+        axis=-1,
+    )
+    output = model(photons)
+    assert output.shape == (BATCH_SIZE, 4, target.shape[-1])
+
+    # Surviving photons with their original positions, in order
+    positions = model._last_token_positions.numpy()
+    assert not (positions == 1).any() and not (positions == 4).any()
+    if token_score == "energy":
+        assert (positions == [0, 3, 5, 7]).all()
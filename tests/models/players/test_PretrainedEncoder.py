@@ -1,9 +1,11 @@
 import os
 
+import numpy as np
 import pytest
 import tensorflow as tf
 
 from calotron.layers.AdminResidual import OUTPUT_CHANGE_SCALES
+from calotron.models.players.PretrainedEncoder import PRETRAINED_MODES
 
 CHUNK_SIZE = int(1e4)
 BATCH_SIZE = 500
@@ -56,6 +58,7 @@ def test_model_configuration(model):
     assert isinstance(model.seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
     assert isinstance(model.pretrained_model_dir, str)
+    assert isinstance(model.pretrained_mode, str)
 
 
 @pytest.mark.parametrize("admin_res_scale", OUTPUT_CHANGE_SCALES)
@@ -111,3 +114,61 @@ def test_model_train(model):
     mse = tf.keras.losses.MeanSquaredError()
     model.compile(optimizer=adam, loss=mse)
     model.fit(dataset, epochs=1)
+
+
+@pytest.mark.parametrize("pretrained_mode", PRETRAINED_MODES)
+def test_model_pretrained_mode(pretrained_mode):
+    from calotron.models.players import PretrainedEncoder
+
+    model = PretrainedEncoder(
+        output_depth=target.shape[-1],
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        dropout_rate=0.1,
+        seq_ord_max_length=source.shape[1],
+        enable_res_smoothing=True,
+        pretrained_model_dir=f"{encoder_dir}_with_smoothing",
+        pretrained_mode=pretrained_mode,
+    )
+    inputs = model.cache_source(source) if pretrained_mode == "cached" else source
+    output = model(inputs)
+    assert output.shape == (*source.shape[:2], model.output_depth)
+    num_pretrained_vars = len(model._pretrained_model.trainable_variables)
+    if pretrained_mode == "trainable":
+        assert num_pretrained_vars > 0
+    else:
+        assert num_pretrained_vars == 0
+
+
+def test_model_cached_source(tmp_path):
+    from calotron.models.players import PretrainedEncoder
+
+    options = dict(
+        output_depth=target.shape[-1],
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        dropout_rate=0.1,
+        seq_ord_max_length=source.shape[1],
+        enable_res_smoothing=True,
+        pretrained_model_dir=f"{encoder_dir}_with_smoothing",
+    )
+    cached_model = PretrainedEncoder(pretrained_mode="cached", **options)
+    cached = cached_model.cache_source(
+        source, cache_dir=str(tmp_path), batch_size=BATCH_SIZE
+    )
+    assert isinstance(cached, np.memmap)
+    assert cached.shape == (*source.shape[:2], source.shape[2] + target.shape[2])
+    assert np.allclose(cached[:, :, : source.shape[2]], source.numpy())
+    cached_again = cached_model.cache_source(source, cache_dir=str(tmp_path))
+    assert cached_again.filename == cached.filename
+    assert len(os.listdir(tmp_path)) == 1
+
+    frozen_model = PretrainedEncoder(pretrained_mode="frozen", **options)
+    frozen_model(source[:BATCH_SIZE])
+    cached_model(cached[:BATCH_SIZE])
+    frozen_model.set_weights(cached_model.get_weights())
+    out_frozen = frozen_model(source[:BATCH_SIZE], training=False)
+    out_cached = cached_model(cached[:BATCH_SIZE], training=False)
+    assert np.allclose(out_frozen, out_cached, atol=1e-5)
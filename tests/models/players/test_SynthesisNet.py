@@ -45,6 +45,8 @@ def test_model_configuration(model):
     assert isinstance(model.seq_ord_max_length, int)
     assert isinstance(model.seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
 
 
 @pytest.mark.parametrize("enable_res_smoothing", [True, False])
@@ -87,3 +89,30 @@ def test_model_train(model):
     mse = tf.keras.losses.MeanSquaredError()
     model.compile(optimizer=adam, loss=mse)
     model.fit(dataset, epochs=1)
+
+
+def test_model_recompute_layers():
+    from calotron.models.players import SynthesisNet
+
+    model = SynthesisNet(
+        output_depth=target.shape[-1],
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_max_length=512,
+        recompute_layers=True,
+    )
+    assert model.recompute_layers
+    latent = tf.random.normal(shape=(source.shape[0], target.shape[-1]))
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(((target, latent, source), target))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
@@ -1,3 +1,6 @@
+import os
+
+import numpy as np
 import pytest
 import tensorflow as tf
 from tensorflow.keras.optimizers import Optimizer, RMSprop
@@ -8,6 +11,9 @@ from calotron.models.transformers import Transformer
 CHUNK_SIZE = int(1e4)
 BATCH_SIZE = 500
 
+here = os.path.dirname(__file__)
+encoder_dir = f"{here}/players/tmp/encoder_with_smoothing"
+
 source = tf.random.normal(shape=(CHUNK_SIZE, 8, 5))
 target = tf.random.normal(shape=(CHUNK_SIZE, 4, 3))
 weight = tf.random.uniform(shape=(CHUNK_SIZE, target.shape[1]))
@@ -76,6 +82,55 @@ def test_model_use(model):
     assert d_output_pred.shape == tuple(test_d_shape)
 
 
+@pytest.mark.parametrize(
+    "cached_players",
+    [["transformer"], ["discriminator"], ["transformer", "discriminator"]],
+)
+def test_model_cached_embeddings(cached_players):
+    from calotron.losses import MeanSquaredError
+    from calotron.models import Calotron
+    from calotron.models.discriminators import GigaDiscriminator
+
+    options = dict(
+        encoder_depth=10,
+        decoder_depth=10,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        seq_ord_latent_dim=8,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        enable_res_smoothing=True,
+        pretrained_encoder_dir=encoder_dir,
+    )
+    cached_transf = Transformer(
+        output_depth=target.shape[2],
+        output_activations="linear",
+        pretrained_encoder_mode="cached"
+        if "transformer" in cached_players
+        else "frozen",
+        **options,
+    )
+    cached_disc = GigaDiscriminator(
+        output_units=1,
+        output_activation="sigmoid",
+        pretrained_encoder_mode="cached"
+        if "discriminator" in cached_players
+        else "frozen",
+        **options,
+    )
+    model = Calotron(transformer=cached_transf, discriminator=cached_disc)
+    compile_options = dict(
+        loss=MeanSquaredError(alpha=0.5),
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+    )
+    if len(cached_players) == 1:
+        with pytest.raises(ValueError):
+            model.compile(**compile_options)
+    else:
+        model.compile(**compile_options)
+
+
 @pytest.mark.parametrize("metrics", [["bce"], None])
 def test_model_compilation(model, metrics):
     from calotron.losses import MeanSquaredError
@@ -90,12 +145,16 @@ def test_model_compilation(model, metrics):
         discriminator_optimizer=d_opt,
         transformer_upds_per_batch=1,
         discriminator_upds_per_batch=1,
+        transformer_accum_steps=1,
+        discriminator_accum_steps=1,
     )
     assert isinstance(model.metrics, list)
     assert isinstance(model.transformer_optimizer, Optimizer)
     assert isinstance(model.discriminator_optimizer, Optimizer)
     assert isinstance(model.transformer_upds_per_batch, int)
     assert isinstance(model.discriminator_upds_per_batch, int)
+    assert isinstance(model.transformer_accum_steps, int)
+    assert isinstance(model.discriminator_accum_steps, int)
 
 
 @pytest.mark.parametrize(
@@ -129,6 +188,264 @@ def test_model_train(model, adversarial_metrics, sample_weight):
     model.fit(dataset, epochs=2)
 
 
+def test_model_train_tfrecords(model, tmp_path):
+    from calotron.data import readTFRecords, writeTFRecords
+    from calotron.losses import MeanSquaredError
+
+    writeTFRecords(
+        str(tmp_path),
+        padded={"source": source, "target": target, "weight": weight},
+        lengths={
+            "source": [source.shape[1]] * CHUNK_SIZE,
+            "target": [target.shape[1]] * CHUNK_SIZE,
+            "weight": [target.shape[1]] * CHUNK_SIZE,
+        },
+        num_shards=4,
+    )
+    dataset = readTFRecords(
+        str(tmp_path), batch_size=BATCH_SIZE, deterministic=False, drop_remainder=True
+    )
+    loss = MeanSquaredError(alpha=0.5, adversarial_metric="binary-crossentropy")
+    model.compile(
+        loss=loss,
+        metrics=None,
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+    )
+    model.fit(dataset, epochs=2)
+
+
+def _deterministic_model():
+    # Dropout disabled to compare gradients computed on different splits
+    from calotron.models import Calotron
+
+    det_transf = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.0,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+    )
+    det_disc = Discriminator(
+        latent_dim=8,
+        output_units=1,
+        output_activation="sigmoid",
+        deepsets_num_layers=2,
+        deepsets_hidden_units=32,
+        dropout_rate=0.0,
+    )
+    calo = Calotron(transformer=det_transf, discriminator=det_disc)
+    calo((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+    return calo
+
+
+def _accumulated_gradients(model, player, accum_steps, batch):
+    from calotron.losses import MeanSquaredError
+
+    # Reconstruction-only transformer loss, since the scale of the mixed
+    # loss is rounded batch-wise and may differ between micro-batches
+    loss = MeanSquaredError(alpha=0.0, adversarial_metric="binary-crossentropy")
+    if player == "transformer":
+        loss_fn, player = loss.transformer_loss, model.transformer
+    else:
+        loss_fn, player = loss.discriminator_loss, model.discriminator
+    source, target, sample_weight = batch
+    _, gradients, trainable_vars = model._compute_gradients(
+        loss_fn=loss_fn,
+        player=player,
+        optimizer=RMSprop(learning_rate=0.001),
+        accum_steps=accum_steps,
+        source=source,
+        target=target,
+        sample_weight=sample_weight,
+    )
+    return [
+        tf.zeros_like(var) if grad is None else tf.convert_to_tensor(grad)
+        for grad, var in zip(gradients, trainable_vars)
+    ]
+
+
+@pytest.mark.parametrize("player", ["transformer", "discriminator"])
+@pytest.mark.parametrize("accum_steps", [2, 4])
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_model_grad_accumulation(player, accum_steps, sample_weight):
+    model = _deterministic_model()
+    batch = (
+        source[:BATCH_SIZE],
+        target[:BATCH_SIZE],
+        sample_weight[:BATCH_SIZE] if sample_weight is not None else None,
+    )
+    full_grads = _accumulated_gradients(model, player, 1, batch)
+    accum_grads = _accumulated_gradients(model, player, accum_steps, batch)
+    assert len(full_grads) == len(accum_grads)
+    for full_grad, accum_grad in zip(full_grads, accum_grads):
+        assert np.allclose(full_grad, accum_grad, rtol=1e-4, atol=1e-6)
+
+
+@pytest.mark.parametrize("accum_steps", [1, 2])
+def test_model_lazy_regularization(model, accum_steps):
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target))
+        .take(4 * BATCH_SIZE)
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    from calotron.losses import MeanSquaredError
+
+    loss = MeanSquaredError(
+        alpha=0.5,
+        adversarial_metric="wasserstein-distance",
+        wass_options={
+            "lipschitz_regularizer": "gp",
+            "lipschitz_penalty": 100.0,
+            "lipschitz_penalty_strategy": "one-sided",
+            "lipschitz_penalty_interval": 2,
+        },
+    )
+    model.compile(
+        loss=loss,
+        metrics=None,
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+        transformer_upds_per_batch=1,
+        discriminator_upds_per_batch=2,
+        discriminator_accum_steps=accum_steps,
+    )
+    model.fit(dataset, epochs=1)
+    # One step per discriminator update, whatever the micro-batches
+    num_d_upds = model.discriminator_optimizer.iterations.numpy()
+    assert num_d_upds == 8
+    assert loss._adv_loss._lipschitz_step.numpy() == num_d_upds
+
+
+@pytest.mark.parametrize("replay_buffer_size", [0, 2 * BATCH_SIZE])
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_model_train_generated_batch_reuse(model, replay_buffer_size, sample_weight):
+    if sample_weight is not None:
+        slices = (source, target, weight)
+    else:
+        slices = (source, target)
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(slices)
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    from calotron.losses import MeanSquaredError
+
+    loss = MeanSquaredError(alpha=0.5, adversarial_metric="binary-crossentropy")
+    model.compile(
+        loss=loss,
+        metrics=None,
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_upds_per_batch=3,
+        discriminator_accum_steps=2,
+        reuse_generated_batch=True,
+        replay_buffer_size=replay_buffer_size,
+        replay_ratio=0.5,
+    )
+    assert model.reuse_generated_batch
+    assert model.replay_buffer_size == replay_buffer_size
+    assert model.replay_ratio == 0.5
+    model.fit(dataset, epochs=1)
+    if replay_buffer_size > 0:
+        for buffer in model._replay_buffer:
+            assert tf.shape(buffer)[0] == replay_buffer_size
+
+
+@pytest.mark.parametrize("replay_buffer_size", [0, 2 * BATCH_SIZE])
+def test_model_train_seq_length_curriculum(model, replay_buffer_size):
+    from calotron.callbacks.schedulers import SeqLengthCurriculum
+    from calotron.losses import MeanSquaredError
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target, weight))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    loss = MeanSquaredError(alpha=0.5, adversarial_metric="binary-crossentropy")
+    model.compile(
+        loss=loss,
+        metrics=["bce"],
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+        replay_buffer_size=replay_buffer_size,
+    )
+    curriculum = SeqLengthCurriculum(
+        boundaries=[1, 2],
+        source_lengths=[4, 6, None],
+        target_lengths=[2, 3, None],
+        verbose=True,
+    )
+    history = model.fit(dataset, epochs=3, callbacks=[curriculum])
+    assert history.history["source_length"] == [4, 6]
+    assert history.history["target_length"] == [2, 3]
+    assert model.source_max_length is None
+    assert model.target_max_length is None
+
+    model.set_max_lengths(source_length=4, target_length=2)
+    assert model.source_max_length == 4
+    assert model.target_max_length == 2
+    model.set_max_lengths()
+
+
+@pytest.mark.parametrize("warmup_steps", [0, 5])
+def test_model_train_adaptive_upds(model, warmup_steps):
+    from calotron.callbacks.schedulers import AdvAdaptiveUpdates
+    from calotron.losses import MeanSquaredError
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target, weight))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    loss = MeanSquaredError(alpha=0.5, adversarial_metric="binary-crossentropy")
+    model.compile(
+        loss=loss,
+        metrics=["bce"],
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_upds_per_batch=2,
+    )
+    scheduler = AdvAdaptiveUpdates(
+        d_loss_bounds=[0.5, 0.68],
+        min_upds=0,
+        max_upds=3,
+        check_every=5,
+        warmup_steps=warmup_steps,
+        verbose=True,
+    )
+    history = model.fit(dataset, epochs=2, callbacks=[scheduler])
+    for upds in history.history["d_upds"]:
+        assert (upds >= 0) and (upds <= 3)
+    assert model.discriminator_upds_per_batch == 2
+    assert model.adversarial_loss
+
+
+def test_model_adversarial_schedule(model):
+    from calotron.losses import KLDivergence
+
+    model.compile(
+        loss=KLDivergence(),
+        metrics=None,
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+    )
+    model.set_adversarial_schedule(discriminator_upds_per_batch=0)
+    assert model.discriminator_upds_per_batch == 0
+    with pytest.raises(TypeError):
+        model.set_adversarial_schedule(adversarial_loss=False)
+
+
 @pytest.mark.parametrize("sample_weight", [weight, None])
 def test_model_eval(model, sample_weight):
     from calotron.losses import MeanSquaredError
@@ -145,3 +462,75 @@ def test_model_eval(model, sample_weight):
         discriminator_upds_per_batch=1,
     )
     model.evaluate(source, target, sample_weight=sample_weight)
+
+
+@pytest.mark.parametrize(
+    "adversarial_metrics", ["binary-crossentropy", "wasserstein-distance"]
+)
+def test_model_train_mixed_precision(adversarial_metrics):
+    from calotron.losses import MeanSquaredError
+    from calotron.models import Calotron
+
+    mp_transf = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        dtype="mixed_bfloat16",
+    )
+    mp_disc = Discriminator(
+        latent_dim=8,
+        output_units=1,
+        output_activation="sigmoid",
+        deepsets_num_layers=2,
+        deepsets_hidden_units=32,
+        dtype="mixed_bfloat16",
+    )
+    model = Calotron(transformer=mp_transf, discriminator=mp_disc)
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target, weight))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    loss = MeanSquaredError(alpha=0.5, adversarial_metric=adversarial_metrics)
+    model.compile(
+        loss=loss,
+        metrics=["bce"],
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+    )
+    model.fit(dataset, epochs=1)
+    assert mp_transf.trainable_variables[0].dtype == tf.float32
+
+
+def test_model_loss_scaling():
+    from tensorflow.keras.mixed_precision import LossScaleOptimizer
+
+    from calotron.losses import MeanSquaredError
+    from calotron.models import Calotron
+
+    mp_transf = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        dtype="mixed_float16",
+    )
+    model = Calotron(transformer=mp_transf, discriminator=disc)
+    model.compile(
+        loss=MeanSquaredError(alpha=0.5),
+        metrics=None,
+        transformer_optimizer=RMSprop(learning_rate=0.001),
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+    )
+    assert isinstance(model.transformer_optimizer, LossScaleOptimizer)
+    assert not isinstance(model.discriminator_optimizer, LossScaleOptimizer)
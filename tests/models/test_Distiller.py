@@ -0,0 +1,167 @@
+import pytest
+import tensorflow as tf
+from tensorflow.keras.optimizers import Optimizer, RMSprop
+
+from calotron.models.discriminators import Discriminator
+from calotron.models.transformers import GigaGenerator, Transformer
+
+CHUNK_SIZE = int(1e4)
+BATCH_SIZE = 500
+
+source = tf.random.normal(shape=(CHUNK_SIZE, 8, 5))
+target = tf.random.normal(shape=(CHUNK_SIZE, 4, 3))
+weight = tf.random.uniform(shape=(CHUNK_SIZE, target.shape[1]))
+
+
+def build_transformer(num_layers, num_heads, key_dim, mlp_units):
+    return Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=num_layers,
+        num_heads=num_heads,
+        key_dim=key_dim,
+        mlp_units=mlp_units,
+        dropout_rate=0.1,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        start_token_initializer="ones",
+    )
+
+
+def build_giga_generator(num_layers, num_heads, key_dim, mlp_units):
+    return GigaGenerator(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        mapping_latent_dim=16,
+        synthesis_depth=8,
+        num_layers=num_layers,
+        num_heads=num_heads,
+        key_dim=key_dim,
+        mlp_units=mlp_units,
+        dropout_rate=0.1,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        start_token_initializer="ones",
+    )
+
+
+teacher = build_transformer(num_layers=2, num_heads=4, key_dim=32, mlp_units=128)
+student = build_transformer(num_layers=1, num_heads=2, key_dim=16, mlp_units=32)
+
+disc = Discriminator(
+    latent_dim=8,
+    output_units=1,
+    output_activation="sigmoid",
+    deepsets_num_layers=2,
+    deepsets_hidden_units=32,
+    dropout_rate=0.1,
+)
+
+
+@pytest.fixture
+def model():
+    from calotron.models import Distiller
+
+    dist = Distiller(teacher=teacher, student=student)
+    return dist
+
+
+###########################################################################
+
+
+def test_model_configuration(model):
+    from calotron.models import Distiller
+
+    assert isinstance(model, Distiller)
+    assert isinstance(model.teacher, Transformer)
+    assert isinstance(model.student, Transformer)
+    assert model.discriminator is None
+
+
+def test_model_use(model):
+    t_output, s_output = model((source, target))
+    model.summary()
+    test_shape = list(target.shape)
+    test_shape[-1] = model.student.output_depth
+    assert t_output.shape == tuple(test_shape)
+    assert s_output.shape == tuple(test_shape)
+
+
+def test_model_compilation(model):
+    model.compile(student_optimizer=RMSprop(learning_rate=0.001), attention_weight=1.0)
+    assert isinstance(model.metrics, list)
+    assert isinstance(model.student_optimizer, Optimizer)
+    assert model.discriminator_optimizer is None
+    assert isinstance(model.attention_weight, float)
+    assert isinstance(model.adversarial_weight, float)
+
+
+@pytest.mark.parametrize("attention_weight", [0.0, 1.0])
+@pytest.mark.parametrize("sample_weight", [weight, None])
+def test_model_train(model, attention_weight, sample_weight):
+    if sample_weight is not None:
+        slices = (source, target, weight)
+    else:
+        slices = (source, target)
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(slices)
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    model.compile(
+        student_optimizer=RMSprop(learning_rate=0.001),
+        attention_weight=attention_weight,
+    )
+    teacher_weights = [w.numpy() for w in model.teacher.weights]
+    model.fit(dataset, epochs=2, validation_data=dataset)
+    for w_before, w_after in zip(teacher_weights, model.teacher.weights):
+        assert (w_before == w_after.numpy()).all()
+
+
+def test_model_train_adversarial():
+    from calotron.losses import BinaryCrossentropy
+    from calotron.models import Distiller
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target, weight))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    model = Distiller(teacher=teacher, student=student, discriminator=disc)
+    with pytest.raises(ValueError):
+        model.compile(student_optimizer=RMSprop(learning_rate=0.001))
+    model.compile(
+        student_optimizer=RMSprop(learning_rate=0.001),
+        attention_weight=1.0,
+        adversarial_loss=BinaryCrossentropy(),
+        adversarial_weight=0.1,
+        discriminator_optimizer=RMSprop(learning_rate=0.001),
+    )
+    assert isinstance(model.discriminator, Discriminator)
+    assert isinstance(model.discriminator_optimizer, Optimizer)
+    history = model.fit(dataset, epochs=1)
+    assert "d_loss" in history.history.keys()
+
+
+def test_model_train_giga_generator():
+    from calotron.models import Distiller
+
+    dataset = (
+        tf.data.Dataset.from_tensor_slices((source, target, weight))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    giga_teacher = build_giga_generator(
+        num_layers=2, num_heads=4, key_dim=32, mlp_units=128
+    )
+    giga_student = build_giga_generator(
+        num_layers=1, num_heads=2, key_dim=16, mlp_units=32
+    )
+    model = Distiller(teacher=giga_teacher, student=giga_student)
+    assert model._shared_latent
+    model.compile(student_optimizer=RMSprop(learning_rate=0.001), attention_weight=1.0)
+    model.fit(dataset, epochs=1)
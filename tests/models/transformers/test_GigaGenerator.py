@@ -77,6 +77,9 @@ def test_model_configuration(model):
     assert isinstance(model.encoder_seq_ord_normalization, float)
     assert isinstance(model.synthesis_seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
+    assert isinstance(model.encoder_token_keep_rate, float)
     # assert isinstance(model.output_activations, str)
     assert isinstance(model.start_token_initializer, str)
     # assert isinstance(model.pretrained_encoder_dir, str)
@@ -179,3 +182,35 @@ def test_model_train(model):
     mse = tf.keras.losses.MeanSquaredError()
     model.compile(optimizer=adam, loss=mse)
     model.fit(dataset, epochs=1)
+
+
+def test_model_mixed_precision():
+    from calotron.models.transformers import GigaGenerator
+
+    model = GigaGenerator(
+        output_depth=target.shape[-1],
+        encoder_depth=8,
+        mapping_latent_dim=16,
+        synthesis_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        admin_res_scale="O(n)",
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_latent_dim=16,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        seq_ord_normalization=10_000,
+        enable_res_smoothing=True,
+        output_activations="linear",
+        start_token_initializer="ones",
+        pretrained_encoder_dir=None,
+        additional_encoder_layers=None,
+        dtype="mixed_bfloat16",
+    )
+    output = model((source, target))
+    assert model.compute_dtype == "bfloat16"
+    assert output.dtype == tf.float32
+    test_shape = list(target.shape)
+    test_shape[-1] = model.output_depth
+    assert output.shape == tuple(test_shape)
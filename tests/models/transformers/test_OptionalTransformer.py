@@ -86,6 +86,9 @@ def test_model_configuration(model):
     assert isinstance(model.encoder_seq_ord_normalization, float)
     assert isinstance(model.decoder_seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
+    assert isinstance(model.encoder_token_keep_rate, float)
     # assert isinstance(model.output_activations, str)
     assert isinstance(model.start_token_initializer, str)
     # assert isinstance(model.pretrained_encoder_dir, str)
@@ -72,6 +72,11 @@ def test_model_configuration(model):
     assert isinstance(model.encoder_seq_ord_normalization, float)
     assert isinstance(model.decoder_seq_ord_normalization, float)
     assert isinstance(model.enable_res_smoothing, bool)
+    assert isinstance(model.recompute_layers, bool)
+    assert isinstance(model.layer_drop_rate, float)
+    assert isinstance(model.encoder_token_keep_rate, float)
+    assert isinstance(model.encoder_token_score, str)
+    assert isinstance(model.encoder_token_energy_index, int)
     # assert isinstance(model.output_activations, str)
     assert isinstance(model.start_token_initializer, str)
     # assert isinstance(model.pretrained_encoder_dir, str)
@@ -172,3 +177,65 @@ def test_model_train(model):
     mse = tf.keras.losses.MeanSquaredError()
     model.compile(optimizer=adam, loss=mse)
     model.fit(dataset, epochs=1)
+
+
+def test_model_token_pruning():
+    from calotron.models.transformers import Transformer
+
+    model = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=3,
+        num_heads=4,
+        key_dim=32,
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        encoder_token_keep_rate=0.5,
+        encoder_token_score="learned",
+    )
+    output = model((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+    assert output.shape == (BATCH_SIZE, target.shape[1], target.shape[2])
+    dataset = (
+        tf.data.Dataset.from_tensor_slices(((source, target), target))
+        .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    adam = tf.keras.optimizers.Adam(learning_rate=0.001)
+    mse = tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer=adam, loss=mse)
+    model.fit(dataset, epochs=1)
+
+
+@pytest.mark.parametrize("start_token_initializer", START_TOKEN_INITIALIZERS)
+def test_model_mixed_precision(start_token_initializer):
+    from calotron.models.transformers import Transformer
+
+    model = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        admin_res_scale="O(logn)",
+        mlp_units=128,
+        dropout_rate=0.1,
+        seq_ord_latent_dim=16,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        seq_ord_normalization=10_000,
+        enable_res_smoothing=True,
+        output_activations="linear",
+        start_token_initializer=start_token_initializer,
+        pretrained_encoder_dir=None,
+        additional_encoder_layers=None,
+        dtype="mixed_bfloat16",
+    )
+    output = model((source, target))
+    assert model.compute_dtype == "bfloat16"
+    assert model.dtype == "float32"
+    assert output.dtype == tf.float32
+    start_token = model.get_start_token(target[:BATCH_SIZE])
+    assert start_token.dtype == target.dtype
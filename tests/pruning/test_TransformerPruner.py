@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from calotron.models.transformers import OptionalTransformer, Transformer
+
+CHUNK_SIZE = int(1e3)
+BATCH_SIZE = 250
+
+source = tf.random.normal(shape=(CHUNK_SIZE, 8, 5))
+target = tf.random.normal(shape=(CHUNK_SIZE, 4, 3))
+weight = tf.random.uniform(shape=(CHUNK_SIZE, target.shape[1]))
+
+dataset = (
+    tf.data.Dataset.from_tensor_slices((source, target, weight))
+    .batch(batch_size=BATCH_SIZE, drop_remainder=True)
+    .cache()
+)
+
+model = Transformer(
+    output_depth=target.shape[2],
+    encoder_depth=8,
+    decoder_depth=8,
+    num_layers=2,
+    num_heads=4,
+    key_dim=16,
+    admin_res_scale="O(n)",
+    mlp_units=32,
+    dropout_rate=0.1,
+    seq_ord_latent_dim=16,
+    seq_ord_max_length=max(source.shape[1], target.shape[1]),
+    seq_ord_normalization=10_000,
+    enable_res_smoothing=True,
+    output_activations="linear",
+    start_token_initializer="ones",
+)
+model((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+
+
+@pytest.fixture(scope="module")
+def pruner():
+    from calotron.pruning import TransformerPruner
+
+    prn = TransformerPruner(transformer=model, validation_data=dataset)
+    prn.score()
+    return prn
+
+
+###########################################################################
+
+
+def test_pruner_configuration(pruner):
+    from calotron.pruning import TransformerPruner
+
+    assert isinstance(pruner, TransformerPruner)
+    assert isinstance(pruner.transformer, Transformer)
+    assert isinstance(pruner.base_loss, float)
+    assert pruner.head_scores["encoder"].shape == (2, 4)
+    assert pruner.head_scores["decoder_self"].shape == (2, 4)
+    assert pruner.head_scores["decoder_cross"].shape == (2, 4)
+    assert pruner.unit_scores["encoder"].shape == (2, 32)
+    assert pruner.unit_scores["decoder"].shape == (2, 32)
+    assert pruner.layer_scores["encoder"].shape == (2,)
+    assert pruner.layer_scores["decoder"].shape == (2,)
+
+
+def test_pruner_identity(pruner):
+    pruned = pruner.prune()
+    assert isinstance(pruned, OptionalTransformer)
+    output = model((source[:BATCH_SIZE], target[:BATCH_SIZE]), training=False)
+    output_pruned = pruned((source[:BATCH_SIZE], target[:BATCH_SIZE]), training=False)
+    assert np.allclose(output.numpy(), output_pruned.numpy(), atol=1e-5)
+
+
+def test_pruner_use(pruner):
+    pruned = pruner.prune(
+        encoder_num_layers=1,
+        encoder_num_heads=2,
+        encoder_mlp_units=16,
+        decoder_num_layers=2,
+        decoder_num_heads=3,
+        decoder_mlp_units=8,
+    )
+    assert pruned.encoder_num_layers == 1
+    assert pruned.encoder_num_heads == 2
+    assert pruned.encoder_mlp_units == 16
+    assert pruned.decoder_num_layers == 2
+    assert pruned.decoder_num_heads == 3
+    assert pruned.decoder_mlp_units == 8
+    assert pruned.count_params() < model.count_params()
+    output = pruned((source[:BATCH_SIZE], target[:BATCH_SIZE]))
+    assert output.shape == (BATCH_SIZE, target.shape[1], target.shape[2])
+
+    history = pruner.fine_tune(pruned, dataset, epochs=1)
+    assert "loss" in history.history.keys()
+    table_html, rows = pruner.report([pruned], names=["pruned"], num_repeats=1)
+    assert isinstance(table_html, str)
+    assert [row["name"] for row in rows] == ["original", "pruned"]
+    assert rows[1]["num_params"] < rows[0]["num_params"]
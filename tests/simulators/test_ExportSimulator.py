@@ -76,3 +76,33 @@ def test_export_simulator_use(export_simulator):
     assert comparison.all()
     comparison = attn_weights.numpy() == attn_weights_reloaded.numpy()
     assert comparison.all()
+
+
+def test_export_simulator_multi_sample():
+    from calotron.models.transformers import GigaGenerator
+    from calotron.simulators import ExportSimulator
+
+    giga_model = GigaGenerator(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        mapping_latent_dim=16,
+        synthesis_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        start_token_initializer="ones",
+    )
+    giga_simulator = Simulator(
+        transformer=giga_model, start_token=[0, 0, 1], num_samples=3, seed=42
+    )
+    export_simulator = ExportSimulator(
+        simulator=giga_simulator, max_length=target.shape[1]
+    )
+    output, attn_weights = export_simulator(dataset)
+    test_shape = list(target.shape)
+    test_shape[0] = BATCH_SIZE
+    test_shape.insert(1, 3)
+    assert output.shape == tuple(test_shape)
+    assert attn_weights.shape[:2] == (BATCH_SIZE, 3)
@@ -2,7 +2,7 @@ import numpy as np
 import pytest
 import tensorflow as tf
 
-from calotron.models.transformers import Transformer
+from calotron.models.transformers import GigaGenerator, Transformer
 
 CHUNK_SIZE = int(1e4)
 BATCH_SIZE = 100
@@ -28,6 +28,21 @@ model = Transformer(
     start_token_initializer="ones",
 )
 
+giga_model = GigaGenerator(
+    output_depth=target.shape[2],
+    encoder_depth=8,
+    mapping_latent_dim=16,
+    synthesis_depth=8,
+    num_layers=2,
+    num_heads=4,
+    key_dim=32,
+    mlp_units=128,
+    dropout_rate=0.1,
+    seq_ord_max_length=max(source.shape[1], target.shape[1]),
+    output_activations="linear",
+    start_token_initializer="ones",
+)
+
 start_token_tf = model.get_start_token(target[:BATCH_SIZE])
 start_token_np = np.array([0, 0, 1])
 
@@ -49,6 +64,7 @@ def test_simulator_configuration(simulator):
     assert isinstance(simulator, Simulator)
     assert isinstance(simulator.transformer, Transformer)
     assert isinstance(simulator.start_token, np.ndarray)
+    assert isinstance(simulator.num_samples, int)
 
 
 @pytest.mark.parametrize("start_token", [start_token_tf, start_token_np])
@@ -67,3 +83,67 @@ def test_simulator_use(start_token, source):
     test_shape.append(target.shape[1])
     test_shape.append(source.shape[1])
     assert attn_weights.shape == tuple(test_shape)
+
+
+def test_simulator_mixed_precision():
+    from calotron.simulators import Simulator
+
+    mp_model = Transformer(
+        output_depth=target.shape[2],
+        encoder_depth=8,
+        decoder_depth=8,
+        num_layers=2,
+        num_heads=4,
+        key_dim=32,
+        seq_ord_max_length=max(source.shape[1], target.shape[1]),
+        output_activations="linear",
+        start_token_initializer="ones",
+        dtype="mixed_bfloat16",
+    )
+    sim = Simulator(transformer=mp_model, start_token=start_token_np)
+    output, attn_weights = sim(source=source[:BATCH_SIZE], max_length=target.shape[1])
+    assert output.dtype == tf.float32
+    assert attn_weights.dtype == tf.float32
+    test_shape = list(target.shape)
+    test_shape[0] = BATCH_SIZE
+    assert output.shape == tuple(test_shape)
+
+
+@pytest.mark.parametrize("num_samples", [1, 3])
+def test_simulator_multi_sample(num_samples):
+    from calotron.simulators import Simulator
+
+    sim = Simulator(
+        transformer=giga_model,
+        start_token=start_token_np,
+        num_samples=num_samples,
+        seed=42,
+    )
+    output, attn_weights = sim(source=source[:BATCH_SIZE], max_length=target.shape[1])
+    test_shape = list(target.shape)
+    test_shape[0] = BATCH_SIZE
+    if num_samples > 1:
+        test_shape.insert(1, num_samples)
+    assert output.shape == tuple(test_shape)
+    test_shape = list()
+    test_shape.append(BATCH_SIZE)
+    if num_samples > 1:
+        test_shape.append(num_samples)
+    test_shape.append(giga_model.synthesis_num_heads)
+    test_shape.append(target.shape[1])
+    test_shape.append(source.shape[1])
+    assert attn_weights.shape == tuple(test_shape)
+
+
+def test_simulator_multi_sample_seeds():
+    from calotron.simulators import Simulator
+
+    sim = Simulator(
+        transformer=giga_model, start_token=start_token_np, num_samples=2, seed=42
+    )
+    output_1, _ = sim(source=source[:BATCH_SIZE], max_length=target.shape[1])
+    output_2, _ = sim(source=source[:BATCH_SIZE], max_length=target.shape[1])
+    assert np.allclose(output_1.numpy(), output_2.numpy())
+    assert not np.allclose(output_1[:, 0].numpy(), output_1[:, 1].numpy())
+    with pytest.raises(ValueError):
+        Simulator(transformer=model, start_token=start_token_np, num_samples=2)
@@ -31,7 +31,7 @@ def test_checker_use_strings(metrics):
         assert isinstance(r, BaseMetric)
 
 
-@pytest.mark.parametrize("metrics", [[c] for c in CALOTRON_METRICS])
+@pytest.mark.parametrize("metrics", [[c()] for c in CALOTRON_METRICS])
 def test_checker_use_classes(metrics):
     from calotron.utils.checks import checkMetrics
 
@@ -43,7 +43,7 @@ def test_checker_use_classes(metrics):
 
 
 def test_checker_use_mixture(checker):
-    res = checker(METRIC_SHORTCUTS + CALOTRON_METRICS)
+    res = checker(METRIC_SHORTCUTS + [c() for c in CALOTRON_METRICS])
     assert isinstance(res, list)
     assert len(res) == len(METRIC_SHORTCUTS) + len(CALOTRON_METRICS)
     for r in res:
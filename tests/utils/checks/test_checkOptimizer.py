@@ -14,7 +14,7 @@ def test_checker_use_strings(optimizer):
     assert isinstance(res, Optimizer)
 
 
-@pytest.mark.parametrize("optimizer", TF_OPTIMIZERS)
+@pytest.mark.parametrize("optimizer", [opt() for opt in TF_OPTIMIZERS])
 def test_checker_use_classes(optimizer):
     from calotron.utils.checks import checkOptimizer
 
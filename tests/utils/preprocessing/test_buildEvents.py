@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+NUM_ROWS = 1000
+NUM_EVENTS = 50
+MAX_LENGTH = 16
+
+event_ids = np.random.randint(0, NUM_EVENTS, size=NUM_ROWS)
+sort_keys = np.random.exponential(5.0, size=NUM_ROWS)
+data = np.c_[np.random.normal(size=(NUM_ROWS, 2)), sort_keys]
+
+
+def reference(events, max_length):
+    padded = np.zeros(shape=(len(events), max_length, data.shape[1]))
+    for i, event in enumerate(events):
+        rows = data[event_ids == event]
+        rows = rows[np.argsort(-rows[:, -1], kind="stable")][:max_length]
+        padded[i, : len(rows)] = rows
+    return padded
+
+
+###########################################################################
+
+
+@pytest.mark.parametrize("max_length", [1, MAX_LENGTH, NUM_ROWS])
+def test_builder_use(max_length):
+    from calotron.utils.preprocessing import buildEvents
+
+    events, padded, lengths = buildEvents(
+        data=data, event_ids=event_ids, sort_keys=sort_keys, max_length=max_length
+    )
+    assert np.all(events == np.unique(event_ids))
+    assert padded.shape == (len(events), max_length, data.shape[1])
+    assert np.all(lengths == np.bincount(event_ids, minlength=NUM_EVENTS)[events])
+    assert np.allclose(padded, reference(events, max_length))
+
+
+def test_builder_requested_events():
+    from calotron.utils.preprocessing import buildEvents
+
+    # Unsorted events, including one without rows
+    events = np.array([7, NUM_EVENTS + 1, 3, 0])
+    out_events, padded, lengths = buildEvents(
+        data=data,
+        event_ids=event_ids,
+        sort_keys=sort_keys,
+        max_length=MAX_LENGTH,
+        events=events,
+    )
+    assert np.all(out_events == events)
+    assert lengths[1] == 0
+    assert np.all(padded[1] == 0.0)
+    assert np.allclose(padded, reference(events, MAX_LENGTH))
+
+
+@pytest.mark.parametrize("num_rows", [0, NUM_ROWS])
+def test_builder_no_events(num_rows):
+    from calotron.utils.preprocessing import buildEvents
+
+    events, padded, lengths = buildEvents(
+        data=data[:num_rows],
+        event_ids=event_ids[:num_rows],
+        sort_keys=sort_keys[:num_rows],
+        max_length=MAX_LENGTH,
+        events=[] if num_rows > 0 else None,
+    )
+    assert len(events) == 0
+    assert padded.shape == (0, MAX_LENGTH, data.shape[1])
+    assert len(lengths) == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+NUM_EVENTS = 100
+MAX_MATCH_DISTANCE = 0.01
+
+photons = np.random.uniform(-0.4, 0.4, size=(NUM_EVENTS, 12, 2))
+clusters = np.random.uniform(-0.4, 0.4, size=(NUM_EVENTS, 8, 2))
+clusters[:, :4] = photons[:, :4] + np.random.normal(0.0, 0.01, size=(NUM_EVENTS, 4, 2))
+mask = (np.random.uniform(size=(NUM_EVENTS, 8)) > 0.2).astype(np.float64)
+
+
+def reference():
+    photons_xy = np.tile(photons[:, None, :, :], (1, clusters.shape[1], 1, 1))
+    clusters_xy = np.tile(clusters[:, :, None, :], (1, 1, photons.shape[1], 1))
+    distance = np.min(np.linalg.norm(clusters_xy - photons_xy, axis=-1), axis=-1)
+    weights = MAX_MATCH_DISTANCE / np.maximum(distance, MAX_MATCH_DISTANCE)
+    return weights * mask
+
+
+###########################################################################
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 2 * NUM_EVENTS])
+@pytest.mark.parametrize("num_workers", [1, 4])
+def test_matching_use(chunk_size, num_workers):
+    from calotron.utils.preprocessing import computeMatchWeights
+
+    weights = computeMatchWeights(
+        photons_xy=photons,
+        clusters_xy=clusters,
+        cluster_mask=mask,
+        max_match_distance=MAX_MATCH_DISTANCE,
+        chunk_size=chunk_size,
+        num_workers=num_workers,
+    )
+    assert weights.shape == (NUM_EVENTS, clusters.shape[1])
+    assert np.all(weights == reference())
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+NUM_ROWS = 1000
+NUM_PARTS = 4
+
+data = np.random.normal(3.0, 2.0, size=(NUM_ROWS, 3))
+parts = np.array_split(data, NUM_PARTS)
+
+
+###########################################################################
+
+
+def test_merge_minmax():
+    from sklearn.preprocessing import MinMaxScaler
+
+    from calotron.utils.preprocessing import mergeScalers
+
+    scalers = [MinMaxScaler().fit(part) for part in parts]
+    merged = mergeScalers(scalers + [MinMaxScaler()])  # unfitted one ignored
+    ref = MinMaxScaler().fit(data)
+    assert merged.n_samples_seen_ == NUM_ROWS
+    assert np.allclose(merged.transform(data), ref.transform(data))
+
+
+@pytest.mark.parametrize("with_mean", [True, False])
+@pytest.mark.parametrize("with_std", [True, False])
+def test_merge_standard(with_mean, with_std):
+    from sklearn.preprocessing import StandardScaler
+
+    from calotron.utils.preprocessing import mergeScalers
+
+    scalers = [
+        StandardScaler(with_mean=with_mean, with_std=with_std).fit(part)
+        for part in parts
+    ]
+    merged = mergeScalers(scalers)
+    ref = StandardScaler(with_mean=with_mean, with_std=with_std).fit(data)
+    assert merged.n_samples_seen_ == NUM_ROWS
+    assert np.allclose(merged.transform(data), ref.transform(data))
+
+
+def test_merge_mixed():
+    from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+    from calotron.utils.preprocessing import mergeScalers
+
+    with pytest.raises(TypeError):
+        mergeScalers([MinMaxScaler().fit(data), StandardScaler().fit(data)])
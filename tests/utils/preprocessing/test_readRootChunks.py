@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pytest
+
+uproot = pytest.importorskip("uproot")
+
+NUM_ROWS = 1000
+
+here = os.path.dirname(__file__)
+fname = f"{here}/tmp/chunks.root"
+
+energy = np.random.exponential(1000.0, size=NUM_ROWS)
+x = np.random.normal(size=NUM_ROWS)
+y = np.random.normal(size=NUM_ROWS)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def root_file():
+    os.makedirs(f"{here}/tmp", exist_ok=True)
+    with uproot.recreate(fname) as file:
+        file["tree"] = {"E": energy, "x": x, "y": y}
+    yield fname
+
+
+###########################################################################
+
+
+@pytest.mark.parametrize("cut", ["E > 1500", None])
+def test_reader_use(cut):
+    from calotron.utils.preprocessing import readRootChunks
+
+    chunks = list(
+        readRootChunks(fname, "tree", branches=["E", "x"], cut=cut, step_size=100)
+    )
+    assert len(chunks) >= 1
+    df = np.concatenate([chunk.values for chunk in chunks])
+    assert all(list(chunk.columns) == ["E", "x"] for chunk in chunks)
+    mask = energy > 1500 if cut is not None else np.ones(NUM_ROWS, dtype=bool)
+    assert df.shape == (mask.sum(), 2)
+    assert np.allclose(df[:, 0], energy[mask])
+    assert np.allclose(df[:, 1], x[mask])
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from calotron.models.transformers import Transformer
+from calotron.simulators import Simulator
+
+CHUNK_SIZE = 512
+BATCH_SIZE = 128
+
+source = np.random.normal(size=(CHUNK_SIZE, 8, 5)).astype(np.float32)
+target = np.random.normal(size=(CHUNK_SIZE, 4, 3)).astype(np.float32)
+
+transf = Transformer(
+    output_depth=target.shape[2],
+    encoder_depth=8,
+    decoder_depth=8,
+    num_layers=1,
+    num_heads=2,
+    key_dim=8,
+    mlp_units=16,
+    seq_ord_max_length=max(source.shape[1], target.shape[1]),
+    output_activations="linear",
+    start_token_initializer="ones",
+)
+sim = Simulator(transf, start_token=np.zeros(target.shape[2], dtype=np.float32))
+
+
+###########################################################################
+
+
+@pytest.mark.parametrize("max_length", [None, target.shape[1]])
+def test_report_use(max_length):
+    from calotron.utils.reports import getFidelityReport
+
+    table_html, rows = getFidelityReport(
+        simulators=sim,
+        source=source,
+        reference=target,
+        max_length=max_length,
+        batch_size=BATCH_SIZE,
+        num_repeats=1,
+    )
+    assert isinstance(table_html, str)
+    assert len(rows) == 1
+    assert len(rows[0]["ks_score"]) == target.shape[2]
+    assert len(rows[0]["emd_score"]) == target.shape[2]
+
+
+def test_report_max_length_mismatch():
+    from calotron.utils.reports import getFidelityReport
+
+    with pytest.raises(ValueError):
+        getFidelityReport(
+            simulators=sim,
+            source=source,
+            reference=target,
+            max_length=target.shape[1] + 1,
+            batch_size=BATCH_SIZE,
+        )